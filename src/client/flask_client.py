@@ -7,10 +7,20 @@ Flask客户端 - 线缆测试系统双向测试接口
 
 import requests
 import json
+import os
+import sys
 import time
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils import json_codec
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -29,30 +39,160 @@ class ExperimentConfig:
             config['test_points'] = self.test_points
         return config
 
+class RequestThrottle:
+    """
+    并发请求节流器
+    
+    限制在途请求数，并按固定间隔依次放行请求，避免并发查询瞬间涌向服务端。
+    并发上限按延迟自适应调整（AIMD）：窗口内p95延迟超过基线两倍时减半，否则逐步加一恢复。
+    """
+    
+    def __init__(self, max_inflight: int, pacing_interval_s: float = 0.0, latency_window: int = 50):
+        self.max_inflight = max(1, max_inflight)
+        self.capacity = self.max_inflight
+        self.pacing_interval_s = pacing_interval_s
+        self._inflight = 0
+        self._next_release = 0.0
+        self._condition = threading.Condition()
+        self._latencies = deque(maxlen=latency_window)
+        self._baseline_p95: Optional[float] = None
+    
+    @contextmanager
+    def slot(self):
+        """占用一个在途请求名额，退出时记录本次请求延迟"""
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(time.perf_counter() - start)
+    
+    def _acquire(self):
+        with self._condition:
+            while self._inflight >= self.capacity:
+                self._condition.wait()
+            self._inflight += 1
+            now = time.monotonic()
+            release_at = max(now, self._next_release)
+            self._next_release = release_at + self.pacing_interval_s
+        
+        if release_at > now:
+            time.sleep(release_at - now)
+    
+    def _release(self, latency: float):
+        with self._condition:
+            self._inflight -= 1
+            self._latencies.append(latency)
+            if len(self._latencies) == self._latencies.maxlen:
+                self._adjust_capacity()
+            self._condition.notify_all()
+    
+    def _adjust_capacity(self):
+        """每满一个延迟窗口评估一次p95延迟并调整并发上限"""
+        window = sorted(self._latencies)
+        self._latencies.clear()
+        p95 = window[int(len(window) * 0.95) - 1]
+        
+        if self._baseline_p95 is None:
+            self._baseline_p95 = p95
+        elif p95 > 2 * self._baseline_p95:
+            self.capacity = max(1, self.capacity // 2)
+            logger.warning(f"请求p95延迟升至{p95 * 1000:.1f}ms，并发上限降为{self.capacity}")
+        elif self.capacity < self.max_inflight:
+            self.capacity += 1
+
 class FlaskTestClient:
     """Flask测试客户端"""
     
-    def __init__(self, server_url: str = "http://localhost:5000"):
+    def __init__(self, server_url: str = "http://localhost:5000", max_workers: int = 8,
+                 max_inflight: Optional[int] = None, pacing_interval_s: float = 0.0):
         self.server_url = server_url
         self.session = requests.Session()
         self.session.headers.update({
             'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'Accept-Encoding': 'gzip, deflate',
             'User-Agent': 'CableTestClient/1.0'
         })
+        
+        # 连接池大小与并发查询线程数一致，避免并发请求时反复建立TCP连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 在途请求上限默认与连接池大小一致，可通过环境变量CLIENT_MAX_INFLIGHT调整
+        if max_inflight is None:
+            max_inflight = int(os.getenv('CLIENT_MAX_INFLIGHT', str(max_workers)))
+        self._throttle = RequestThrottle(max_inflight, pacing_interval_s)
+        # 条件GET缓存：(接口, 参数) -> (ETag, 已解析的响应)，服务端状态未变时返回304直接复用
+        self._etag_cache: Dict[Tuple[str, Tuple], Tuple[str, Dict[str, Any]]] = {}
+    
+    def close(self):
+        """释放线程池与HTTP连接"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def fetch_concurrently(self, *calls: Callable[[], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并发执行多个互不依赖的查询，结果顺序与参数顺序一致
+        
+        每个查询的往返延迟相互重叠，一轮多个查询的总耗时约等于最慢的一次。
+        """
+        if len(calls) <= 1:
+            return [call() for call in calls]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='flask-client')
+        futures = [self._executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+    
+    def get_round_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """并发获取一轮测试规划所需的服务端状态快照"""
+        system_info, summary, unconfirmed = self.fetch_concurrently(
+            self.get_system_info,
+            self.get_relationship_summary,
+            self.get_unconfirmed_pairs
+        )
+        return {
+            'system_info': system_info,
+            'summary': summary,
+            'unconfirmed': unconfirmed
+        }
     
     def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict[str, Any]:
         """发送HTTP请求"""
         url = f"{self.server_url}{endpoint}"
         try:
             if method.upper() == 'GET':
-                response = self.session.get(url, params=data)
+                cache_key = (endpoint, tuple(sorted(data.items())) if data else ())
+                cached = self._etag_cache.get(cache_key)
+                headers = {'If-None-Match': cached[0]} if cached else None
+                with self._throttle.slot():
+                    response = self.session.get(url, params=data, headers=headers)
+                if response.status_code == 304 and cached:
+                    return cached[1]
+                response.raise_for_status()
+                result = json_codec.loads(response.content)
+                # 只缓存成功的响应；失败结果即使带有ETag也不复用，下次请求重新获取
+                etag = response.headers.get('ETag')
+                if etag and result.get('success', True):
+                    self._etag_cache[cache_key] = (etag, result)
+                return result
             elif method.upper() == 'POST':
-                response = self.session.post(url, json=data)
+                with self._throttle.slot():
+                    response = self.session.post(url, data=json_codec.dumps(data) if data is not None else None)
             else:
                 raise ValueError(f"不支持的HTTP方法: {method}")
             
             response.raise_for_status()
-            return response.json()
+            return json_codec.loads(response.content)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"请求失败: {str(e)}")
@@ -109,6 +249,21 @@ class FlaskTestClient:
         
         return self._make_request('POST', '/api/experiment', experiment_config.to_dict())
     
+    def run_experiments(self, experiment_configs: List[ExperimentConfig]) -> List[Dict[str, Any]]:
+        """一次请求执行多个指定实验，结果顺序与配置顺序一致
+        
+        服务端按顺序逐个执行，继电器状态的连续性与逐个提交相同，但只需一次网络往返。
+        """
+        if not experiment_configs:
+            return []
+        logger.info(f"批量提交 {len(experiment_configs)} 个指定实验")
+        
+        payload = {'experiments': [config.to_dict() for config in experiment_configs]}
+        result = self._make_request('POST', '/api/experiment/batch', payload)
+        if not result.get('success'):
+            return [result] * len(experiment_configs)
+        return result['data']['results']
+    
     def run_batch_experiments(self, test_count: int = 5, max_points_per_test: int = 100) -> Dict[str, Any]:
         """运行批量实验"""
         logger.info(f"运行批量实验: {test_count} 个测试，每个最多 {max_points_per_test} 个点位")
@@ -125,6 +280,23 @@ class FlaskTestClient:
         logger.info("查询系统信息...")
         return self._make_request('GET', '/api/system/info')
     
+    def _fetch_point_statuses(self, point_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """获取一组点位的状态，结果格式与get_point_status(point_id)一致
+        
+        多个点位时只查询一次全部点位状态并在本地按点位取出；快照不可用时退回逐个查询。
+        """
+        if len(point_ids) > 1:
+            snapshot = self._make_request('GET', '/api/points/status')
+            states = snapshot.get('data') if snapshot.get('success') else None
+            if isinstance(states, list):
+                by_id = {state.get('point_id'): state for state in states}
+                return {
+                    point_id: {'success': True, 'data': by_id[point_id]} if point_id in by_id
+                    else {'success': False, 'error': f'点位 {point_id} 不存在'}
+                    for point_id in point_ids
+                }
+        return {point_id: self.get_point_status(point_id) for point_id in point_ids}
+    
     def monitor_point_status(self, point_ids: List[int], interval: float = 1.0, duration: float = 60.0):
         """监控指定点位的状态变化"""
         logger.info(f"开始监控点位 {point_ids}，间隔 {interval} 秒，持续 {duration} 秒")
@@ -136,8 +308,9 @@ class FlaskTestClient:
             current_time = time.time()
             logger.info(f"监控检查 - {time.strftime('%H:%M:%S', time.localtime(current_time))}")
             
+            point_results = self._fetch_point_statuses(point_ids)
             for point_id in point_ids:
-                result = self.get_point_status(point_id)
+                result = point_results[point_id]
                 if result.get('success'):
                     current_state = result['data']
                     point_key = f"point_{point_id}"
@@ -11,9 +11,13 @@ import json
 from typing import List, Dict, Set, Tuple, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
+import bisect
 import logging
 import sys
 import os
+import uuid
+
+import numpy as np
 
 # 添加性能计时器
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -23,6 +27,14 @@ from utils.performance_timer import get_timer, time_step
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 点对观测标志位：_pair_flags矩阵中每个元素按位记录该点对的观测情况
+PAIR_COTESTED = 1       # 两点曾同时出现在某次测试的激活点位中
+PAIR_COTEST_LINKED = 2  # 同测时观察到二者之间存在连接
+PAIR_DETECTED = 4       # 任意测试中检测到二者导通
+
+# 检测矩阵写入日志的容量（占N*N的比例）；超出后丢弃最早的条目，过旧的同步令牌需重新获取完整矩阵
+MATRIX_CHANGE_LOG_FRACTION = 0.25
+
 class RelayState(Enum):
     """继电器状态枚举"""
     OFF = 0  # 关闭
@@ -85,6 +97,11 @@ class CableTestSystem:
         # 以(min(a,b), max(a,b))的二元组形式存储
         self.true_pairs: Set[Tuple[int, int]] = set()
         self.test_history = []
+        # 状态版本：进程内唯一的实例标识 + 点对观测版本号（配合矩阵版本号生成ETag）
+        self._state_epoch = uuid.uuid4().hex[:12]
+        self._observation_version = 0
+        # 由测试历史增量维护的N*N点对观测矩阵（uint8位标志），替代逐对回扫测试历史
+        self._reset_pair_observations()
         
         # 每轮实验后确认的关系总数历史记录
         # 存储每轮实验后的导通关系 + 不导通关系总数
@@ -106,6 +123,12 @@ class CableTestSystem:
             self.relationship_matrix[i][i] = 1
             self.true_relationship_matrix[i][i] = 1
         
+        # 矩阵版本号：检测/真实矩阵每次写入后递增，用于复用矩阵对比统计
+        self._matrix_version = 0
+        self._comparison_cache: Optional[Tuple[Tuple, Tuple[int, ...]]] = None
+        # 检测矩阵的单元写入日志，供客户端按版本增量同步（矩阵重建时清空）
+        self._reset_matrix_changes()
+        
         # 兼容旧参数，但不再以"集群大小"生成；仅保留配置占位（无实际含义）
         try:
             m1 = int(min_cluster_size)
@@ -245,26 +268,33 @@ class CableTestSystem:
                     self.true_relationship_matrix[point_id][target_point] = 1
                     logger.debug(f"创建连接: 点位 {point_id} -> 点位 {target_point}")
         
-        # 确保对角线为1，其他未设置的位置为-1
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i == j:
-                    self.true_relationship_matrix[i][j] = 1  # 对角线始终为1
-                elif self.true_relationship_matrix[i][j] != 1:
-                    # 如果还没有设置为导通，则设置为不导通
-                    self.true_relationship_matrix[i][j] = -1
+        # 确保对角线为1，其他未设置的位置为-1，并输出导通分布统计
+        self._finalize_true_relationship_matrix()
+        
+        # 矩阵全部生成后再推进版本：并发读取者不会以新版本（ETag、比较缓存）持有生成中途的矩阵
+        self._matrix_version += 1
+        self._reset_matrix_changes()
+    
+    def _finalize_true_relationship_matrix(self):
+        """
+        补全真实关系矩阵并输出导通分布统计：对角线置1，未设置为导通的位置置-1。
+        使用NumPy整体计算，避免N*N的Python双重循环；结果原地写回列表形式的矩阵。
+        """
+        matrix = np.array(self.true_relationship_matrix, dtype=np.int8)
+        matrix = np.where(matrix == 1, 1, -1).astype(np.int8)
+        np.fill_diagonal(matrix, 1)
+        self.true_relationship_matrix[:] = matrix.tolist()
         
         logger.info(f"连接关系生成完成")
         logger.info(f"实际导通分布统计（除自己外的导通数量）:")
         
+        # 除自己外的导通关系
+        conductive = matrix == 1
+        np.fill_diagonal(conductive, False)
+        
         # 统计实际的导通分布
-        actual_distribution = {}
-        for i in range(self.total_points):
-            count = 0
-            for j in range(self.total_points):
-                if i != j and self.true_relationship_matrix[i][j] == 1:
-                    count += 1
-            actual_distribution[count] = actual_distribution.get(count, 0) + 1
+        counts, frequencies = np.unique(np.count_nonzero(conductive, axis=1), return_counts=True)
+        actual_distribution = dict(zip(counts.tolist(), frequencies.tolist()))
         
         for count in sorted(actual_distribution.keys()):
             logger.info(f"  除自己外导通{count}个点位的点: {actual_distribution[count]}个")
@@ -274,13 +304,8 @@ class CableTestSystem:
         logger.info(f"  总连接数: {total_connections}")
         
         # 统计作为目标的被选择次数分布
-        target_selection_count = {}
-        for j in range(self.total_points):
-            count = 0
-            for i in range(self.total_points):
-                if i != j and self.true_relationship_matrix[i][j] == 1:
-                    count += 1
-            target_selection_count[count] = target_selection_count.get(count, 0) + 1
+        counts, frequencies = np.unique(np.count_nonzero(conductive, axis=0), return_counts=True)
+        target_selection_count = dict(zip(counts.tolist(), frequencies.tolist()))
         
         logger.info(f"  作为目标被选择的次数分布:")
         for count in sorted(target_selection_count.keys()):
@@ -392,8 +417,8 @@ class CableTestSystem:
                 # 🔧 正确逻辑：当完全没有检测到导通关系时，可以确认所有测试点位都不导通
                 for test_point in active_points:
                     if test_point != power_source:  # 排除电源点位
-                        self.relationship_matrix[power_source][test_point] = -1
-                        logger.info(f"多对多测试确认不导通：E[{power_source},{test_point}] = -1")
+                        self._set_relationship(power_source, test_point, -1)
+                        logger.debug("多对多测试确认不导通：E[%s,%s] = -1", power_source, test_point)
                 
         else:  # 1对1测试（1个电源点位 + 1个测试点位）
             test_point = active_points[1] if len(active_points) > 1 else None
@@ -405,14 +430,61 @@ class CableTestSystem:
                 
                 if has_conductive_relationship:
                     # 确认导通
-                    self.relationship_matrix[power_source][test_point] = 1
+                    self._set_relationship(power_source, test_point, 1)
                     logger.info(f"1对1测试确认导通：E[{power_source},{test_point}] = 1")
                 else:
                     # 确认不导通
-                    self.relationship_matrix[power_source][test_point] = -1
+                    self._set_relationship(power_source, test_point, -1)
                     logger.info(f"1对1测试确认不导通：E[{power_source},{test_point}] = -1")
         
+        self._matrix_version += 1
         logger.info(f"关系矩阵更新完成")
+    
+    def _set_relationship(self, power_source: int, test_point: int, value: int):
+        """写入检测矩阵单元，值有变化时记入写入日志（日志版本为本次更新完成后的矩阵版本）"""
+        row = self.relationship_matrix[power_source]
+        if row[test_point] == value:
+            return
+        row[test_point] = value
+        self._matrix_change_versions.append(self._matrix_version + 1)
+        self._matrix_changes.append((power_source, test_point, value))
+        if len(self._matrix_changes) > self._matrix_change_limit:
+            self._trim_matrix_changes()
+    
+    def _trim_matrix_changes(self):
+        """丢弃最早的一半写入日志（按版本整段丢弃），早于保留部分的同步令牌随之失效"""
+        versions = self._matrix_change_versions
+        cut = bisect.bisect_right(versions, versions[len(versions) // 2])
+        self._matrix_change_base = versions[cut - 1]
+        del versions[:cut]
+        del self._matrix_changes[:cut]
+    
+    def _reset_matrix_changes(self):
+        """检测矩阵重建后清空写入日志，早于当前版本的同步令牌随之失效"""
+        self._matrix_change_versions: List[int] = []
+        self._matrix_changes: List[Tuple[int, int, int]] = []
+        self._matrix_change_base = self._matrix_version
+        self._matrix_change_limit = max(1, int(self.total_points * self.total_points * MATRIX_CHANGE_LOG_FRACTION))
+    
+    def matrix_change_token(self) -> str:
+        """当前检测矩阵的同步令牌（实例标识 + 矩阵版本），与完整矩阵一同返回给客户端"""
+        return f"{self._state_epoch}-{self._matrix_version}"
+    
+    def get_relationship_matrix_changes(self, since_token: str) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        获取自同步令牌以来检测矩阵的单元写入（按写入顺序，重复应用结果不变）
+        
+        Returns:
+            Optional[List[Tuple[int, int, int]]]: (行, 列, 值)列表；令牌来自其他实例或早于矩阵重建时返回None，需重新获取完整矩阵
+        """
+        epoch, _, version = str(since_token).rpartition('-')
+        if epoch != self._state_epoch or not version.isdigit():
+            return None
+        since = int(version)
+        if since < self._matrix_change_base or since > self._matrix_version:
+            return None
+        start = bisect.bisect_right(self._matrix_change_versions, since)
+        return self._matrix_changes[start:]
 
     def run_binary_search_test(self, power_source: int, candidate_points: List[int]) -> List[TestResult]:
         """
@@ -487,39 +559,36 @@ class CableTestSystem:
             # 使用继电器状态管理器优化操作
             relay_operations = 0
             
-            # 🔧 重要：增加详细的继电器操作调试信息
-            print(f"🔌 继电器操作调试 - 测试开始:")
-            print(f"  电源点位: {power_source}")
-            print(f"  测试点位: {test_points}")
-            print(f"  当前继电器状态: {self.relay_manager.get_operation_stats()}")
+            # 🔧 重要：增加详细的继电器操作调试信息（仅在DEBUG级别启用时格式化输出）
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            if debug_enabled:
+                logger.debug("🔌 继电器操作调试 - 测试开始:\n  电源点位: %s\n  测试点位: %s\n  当前继电器状态: %s",
+                             power_source, test_points, self.relay_manager.get_operation_stats())
             
             # 1. 切换通电点位（如果需要）
             with timer.time_step("switch_power_source", {"power_source": power_source}):
                 power_source_ops = self.relay_manager.switch_power_source(power_source)
-                print(f"  电源点位切换操作: {power_source_ops} 次")
                 relay_operations += power_source_ops
             
             # 2. 激活测试点位（只操作需要改变状态的点位）
             with timer.time_step("activate_test_points", {"test_points": test_points}):
                 test_points_ops = self.relay_manager.activate_test_points(test_points)
-                print(f"  测试点位激活操作: {test_points_ops} 次")
             
             # 🔧 修复继电器操作次数计算逻辑
             # 直接使用继电器管理器计算的操作次数，因为管理器已经处理了状态比较
             relay_operations = power_source_ops + test_points_ops
             
-            print(f"🔌 继电器操作次数计算:")
-            print(f"  电源点位切换操作: {power_source_ops} 次")
-            print(f"  测试点位激活操作: {test_points_ops} 次")
-            print(f"  总继电器操作次数: {relay_operations} 次")
-            
-            # 调试信息：显示继电器状态比较
-            current_full_state = {power_source} | set(test_points)
-            last_full_state = self.relay_manager.last_full_relay_states
-            print(f"🔌 继电器状态比较调试:")
-            print(f"  上一次完整状态: {sorted(last_full_state)} (共{len(last_full_state)}个)")
-            print(f"  本次完整状态: {sorted(current_full_state)} (共{len(current_full_state)}个)")
-            print(f"  状态是否相同: {current_full_state == last_full_state}")
+            if debug_enabled:
+                logger.debug("🔌 继电器操作次数计算:\n  电源点位切换操作: %s 次\n  测试点位激活操作: %s 次\n  总继电器操作次数: %s 次",
+                             power_source_ops, test_points_ops, relay_operations)
+                
+                # 调试信息：显示继电器状态比较
+                current_full_state = {power_source} | set(test_points)
+                last_full_state = self.relay_manager.last_full_relay_states
+                logger.debug("🔌 继电器状态比较调试:\n  上一次完整状态: %s (共%d个)\n  本次完整状态: %s (共%d个)\n  状态是否相同: %s",
+                             sorted(last_full_state), len(last_full_state),
+                             sorted(current_full_state), len(current_full_state),
+                             current_full_state == last_full_state)
             
             # 3. 模拟继电器切换时间
             with timer.time_step("relay_switch_simulation", {"relay_operations": relay_operations}):
@@ -565,6 +634,7 @@ class CableTestSystem:
                 # self.power_on_count 将在每次测试中固定为1（在TestResult中处理）
                 
                 self.test_history.append(test_result)
+                self._record_pair_observations(test_result)
                 
                 # 更新每轮实验后确认的关系总数历史记录
                 # 计算当前已确认的导通关系 + 不导通关系总数
@@ -765,15 +835,44 @@ class CableTestSystem:
         }
 
     # ================= 纯“点-点关系”接口 =================
+    def _reset_pair_observations(self):
+        """按当前点位数重建（清空）点对观测矩阵"""
+        self._pair_flags = np.zeros((self.total_points, self.total_points), dtype=np.uint8)
+        # 每个点位是否已出现在检测到的导通对中（与PAIR_DETECTED同步增量维护，按点位O(1)判定）
+        self._point_has_conductive = np.zeros(self.total_points, dtype=bool)
+        self._observation_version += 1
+    
+    def _record_pair_observations(self, test_result: TestResult):
+        """将一次测试结果并入点对观测矩阵（每次测试只写入一次，查询时无需回扫历史；写入完成后才推进观测版本）"""
+        flags = self._pair_flags
+        active = np.unique(np.asarray(test_result.active_points, dtype=np.intp))
+        flags[np.ix_(active, active)] |= PAIR_COTESTED
+        
+        for c in test_result.detected_connections:
+            s = int(c.source_point)
+            targets = np.asarray(c.target_points, dtype=np.intp)
+            if targets.size == 0:
+                continue
+            flags[s, targets] |= PAIR_DETECTED
+            flags[targets, s] |= PAIR_DETECTED
+            self._point_has_conductive[s] = True
+            self._point_has_conductive[targets] = True
+            
+            # 仅当电源点与目标点同处激活点位时，该连接才否定二者的“同测不导通”
+            if np.isin(s, active):
+                linked = targets[np.isin(targets, active)]
+                flags[s, linked] |= PAIR_COTEST_LINKED
+                flags[linked, s] |= PAIR_COTEST_LINKED
+        
+        self._observation_version += 1
+    
+    def state_etag(self) -> str:
+        """当前测试状态的标识：任何测试、矩阵写入或重置后都会变化，可作为关系类查询响应的ETag"""
+        return f"{self._state_epoch}-{self._matrix_version}-{self._observation_version}"
+    
     def _iter_detected_conductive_pairs(self) -> Set[Tuple[int, int]]:
-        pairs: Set[Tuple[int, int]] = set()
-        for tr in self.test_history:
-            for c in tr.detected_connections:
-                s = int(c.source_point)
-                for t in c.target_points:
-                    a, b = (s, int(t)) if s <= int(t) else (int(t), s)
-                    pairs.add((a, b))
-        return pairs
+        rows, cols = np.nonzero(np.triu(self._pair_flags & PAIR_DETECTED))
+        return set(zip(rows.tolist(), cols.tolist()))
 
     def get_confirmed_conductive_pairs(self) -> List[Dict]:
         """返回已确认导通的点对列表。"""
@@ -781,47 +880,41 @@ class CableTestSystem:
         return [{'point1': a, 'point2': b} for (a, b) in pairs]
 
     def _were_points_cotested_without_link(self, p1: int, p2: int) -> bool:
-        cotested = False
-        for tr in self.test_history:
-            ap = tr.active_points
-            if p1 in ap and p2 in ap:
-                cotested = True
-                # 若此轮存在二者之间的连接，则视为非“不导通”
-                linked = False
-                for c in tr.detected_connections:
-                    if (c.source_point == p1 and p2 in c.target_points) or (c.source_point == p2 and p1 in c.target_points):
-                        linked = True
-                        break
-                if linked:
-                    return False
-        return cotested
+        # 同测过且任何一次同测都未出现二者之间的连接
+        return (int(self._pair_flags[p1, p2]) & (PAIR_COTESTED | PAIR_COTEST_LINKED)) == PAIR_COTESTED
+
+    def _non_conductive_mask(self) -> np.ndarray:
+        """同测且未出现连接的点对布尔矩阵（对称）"""
+        return (self._pair_flags & (PAIR_COTESTED | PAIR_COTEST_LINKED)) == PAIR_COTESTED
+
+    def get_confirmed_non_conductive_pair_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """以(point1数组, point2数组)返回已确认不导通的点对，供流式输出等无需构建字典列表的场景"""
+        return np.nonzero(np.triu(self._non_conductive_mask(), k=1))
 
     def get_confirmed_non_conductive_pairs(self) -> List[Dict]:
         """返回已确认不导通（同测且未出现连接）的点对列表。"""
-        res: List[Dict] = []
-        for a in range(self.total_points):
-            for b in range(a + 1, self.total_points):
-                if self._were_points_cotested_without_link(a, b):
-                    res.append({'point1': a, 'point2': b})
-        return res
+        rows, cols = self.get_confirmed_non_conductive_pair_arrays()
+        return [{'point1': a, 'point2': b} for a, b in zip(rows.tolist(), cols.tolist())]
+
+    def _unconfirmed_mask(self) -> np.ndarray:
+        """既未检测到导通、也未确认不导通的点对布尔矩阵（对称，含对角线）"""
+        return ~((self._pair_flags & PAIR_DETECTED).astype(bool) | self._non_conductive_mask())
+
+    def get_unconfirmed_pair_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """以(point1数组, point2数组)返回尚未确认的点对"""
+        return np.nonzero(np.triu(self._unconfirmed_mask(), k=1))
 
     def get_unconfirmed_pairs(self) -> List[Dict]:
         """返回尚未确认导通/不导通的点对（可能较多）。"""
-        conductive = set((p['point1'], p['point2']) for p in self.get_confirmed_conductive_pairs())
-        non_cond = set((p['point1'], p['point2']) for p in self.get_confirmed_non_conductive_pairs())
-        res: List[Dict] = []
-        for a in range(self.total_points):
-            for b in range(a + 1, self.total_points):
-                if (a, b) in conductive or (a, b) in non_cond:
-                    continue
-                res.append({'point1': a, 'point2': b})
-        return res
+        rows, cols = self.get_unconfirmed_pair_arrays()
+        return [{'point1': a, 'point2': b} for a, b in zip(rows.tolist(), cols.tolist())]
 
     def get_relationship_summary(self) -> Dict:
         """返回关系计数摘要。"""
-        cp = len(self.get_confirmed_conductive_pairs())
-        ncp = len(self.get_confirmed_non_conductive_pairs())
-        up = len(self.get_unconfirmed_pairs())
+        # 直接对点对观测矩阵的上三角计数，无需先生成三份点对字典列表
+        cp = int(np.count_nonzero(np.triu(self._pair_flags & PAIR_DETECTED)))
+        ncp = int(np.count_nonzero(np.triu(self._non_conductive_mask(), k=1)))
+        up = int(np.count_nonzero(np.triu(self._unconfirmed_mask(), k=1)))
         return {
             'total_points': self.total_points,
             'confirmed_conductive_pairs': cp,
@@ -829,42 +922,6 @@ class CableTestSystem:
             'unconfirmed_pairs': up
         }
     
-    def get_point_relationships(self, point_id: int) -> Dict:
-        """
-        获取指定点位与其他所有点位的导通关系
-        
-        Args:
-            point_id: 点位ID
-            
-        Returns:
-            Dict: 包含导通关系的字典
-        """
-        if point_id < 0 or point_id >= self.total_points:
-            return {'error': '点位ID超出范围'}
-        
-        relationships = {
-            'point_id': point_id,
-            'total_points': self.total_points,
-            'conductive_points': [],
-            'non_conductive_points': [],
-            'unknown_points': [],
-            'relationship_matrix_row': self.relationship_matrix[point_id]
-        }
-        
-        for i in range(self.total_points):
-            if i == point_id:
-                continue
-                
-            relation = self.relationship_matrix[point_id][i]
-            if relation == 1:
-                relationships['conductive_points'].append(i)
-            elif relation == -1:
-                relationships['non_conductive_points'].append(i)
-            else:  # relation == 0
-                relationships['unknown_points'].append(i)
-        
-        return relationships
-    
     def get_relationship_matrix(self) -> List[List[int]]:
         """
         获取完整的关系矩阵
@@ -898,52 +955,10 @@ class CableTestSystem:
         diagonal_cells = self.total_points  # 对角线上的单元格
         off_diagonal_cells = total_cells - diagonal_cells  # 非对角线上的单元格
         
-        # 统计检测到的关系
-        detected_conductive = 0
-        detected_non_conductive = 0
-        detected_unknown = 0
-        
-        # 统计真实关系
-        true_conductive = 0
-        true_unknown = 0
-        
-        # 统计匹配情况
-        matched_conductive = 0
-        matched_non_conductive = 0
-        false_positive = 0  # 误报：检测到导通但实际不导通
-        false_negative = 0  # 漏报：实际导通但未检测到
-        
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i == j:  # 跳过对角线
-                    continue
-                    
-                detected = detected_matrix[i][j]
-                true_val = true_matrix[i][j]
-                
-                # 统计检测到的关系
-                if detected == 1:
-                    detected_conductive += 1
-                elif detected == -1:
-                    detected_non_conductive += 1
-                else:  # detected == 0
-                    detected_unknown += 1
-                
-                # 统计真实关系
-                if true_val == 1:
-                    true_conductive += 1
-                else:  # true_val == 0
-                    true_unknown += 1
-                
-                # 统计匹配情况
-                if detected == 1 and true_val == 1:
-                    matched_conductive += 1
-                elif detected == -1 and true_val == 0:
-                    matched_non_conductive += 1
-                elif detected == 1 and true_val == 0:
-                    false_positive += 1
-                elif detected == -1 and true_val == 1:
-                    false_negative += 1
+        (detected_conductive, detected_non_conductive, detected_unknown,
+         true_conductive, true_unknown,
+         matched_conductive, matched_non_conductive,
+         false_positive, false_negative) = self._matrix_comparison_counts(detected_matrix, true_matrix)
         
         # 计算准确率
         total_detected = detected_conductive + detected_non_conductive
@@ -977,6 +992,51 @@ class CableTestSystem:
             }
         }
     
+    def _matrix_comparison_counts(self, detected_matrix: List[List[int]], true_matrix: List[List[int]]) -> Tuple[int, ...]:
+        """
+        统计检测矩阵与真实矩阵的逐格对比计数
+        
+        结果按矩阵版本缓存：同一轮内系统信息接口和每次测试后的统计会多次请求对比数据，
+        矩阵未被写入时直接复用上次结果，避免重复的N*N遍历。
+        """
+        cache_key = (self._matrix_version, self.total_points, id(detected_matrix), id(true_matrix))
+        if self._comparison_cache is not None and self._comparison_cache[0] == cache_key:
+            return self._comparison_cache[1]
+        
+        # 两个矩阵各转换一次为数组，所有计数由布尔掩码整体统计（跳过对角线）
+        n = self.total_points
+        detected = np.asarray(detected_matrix, dtype=np.int8)[:n, :n]
+        true_vals = np.asarray(true_matrix, dtype=np.int8)[:n, :n]
+        off_diagonal = ~np.eye(n, dtype=bool)
+        off_diagonal_count = n * (n - 1)
+        
+        detected_is_conductive = (detected == 1) & off_diagonal
+        detected_is_non_conductive = (detected == -1) & off_diagonal
+        true_is_conductive = true_vals == 1
+        true_is_zero = true_vals == 0
+        
+        # 统计检测到的关系
+        detected_conductive = int(np.count_nonzero(detected_is_conductive))
+        detected_non_conductive = int(np.count_nonzero(detected_is_non_conductive))
+        detected_unknown = off_diagonal_count - detected_conductive - detected_non_conductive
+        
+        # 统计真实关系（非1即计为未知）
+        true_conductive = int(np.count_nonzero(true_is_conductive & off_diagonal))
+        true_unknown = off_diagonal_count - true_conductive
+        
+        # 统计匹配情况
+        matched_conductive = int(np.count_nonzero(detected_is_conductive & true_is_conductive))
+        matched_non_conductive = int(np.count_nonzero(detected_is_non_conductive & true_is_zero))
+        false_positive = int(np.count_nonzero(detected_is_conductive & true_is_zero))  # 误报：检测到导通但实际不导通
+        false_negative = int(np.count_nonzero(detected_is_non_conductive & true_is_conductive))  # 漏报：实际导通但未检测到
+        
+        counts = (detected_conductive, detected_non_conductive, detected_unknown,
+                  true_conductive, true_unknown,
+                  matched_conductive, matched_non_conductive,
+                  false_positive, false_negative)
+        self._comparison_cache = (cache_key, counts)
+        return counts
+    
     def get_point_relationships(self, point_id: int) -> Dict:
         """
         获取指定点位与其他所有点位的导通关系
@@ -990,28 +1050,22 @@ class CableTestSystem:
         if point_id < 0 or point_id >= self.total_points:
             return {'error': '点位ID超出范围'}
         
-        relationships = {
+        # 整行转为数组一次性分类（排除点位自身），不再逐个元素在Python中判断
+        matrix_row = self.relationship_matrix[point_id]
+        row = np.asarray(matrix_row, dtype=np.int8)
+        others = np.ones(len(row), dtype=bool)
+        others[point_id] = False
+        conductive = (row == 1) & others
+        non_conductive = (row == -1) & others
+        
+        return {
             'point_id': point_id,
             'total_points': self.total_points,
-            'conductive_points': [],
-            'non_conductive_points': [],
-            'unknown_points': [],
-            'relationship_matrix_row': self.relationship_matrix[point_id]
+            'conductive_points': np.flatnonzero(conductive).tolist(),
+            'non_conductive_points': np.flatnonzero(non_conductive).tolist(),
+            'unknown_points': np.flatnonzero(others & ~conductive & ~non_conductive).tolist(),  # relation == 0
+            'relationship_matrix_row': matrix_row
         }
-        
-        for i in range(self.total_points):
-            if i == point_id:
-                continue
-                
-            relation = self.relationship_matrix[point_id][i]
-            if relation == 1:
-                relationships['conductive_points'].append(i)
-            elif relation == -1:
-                relationships['non_conductive_points'].append(i)
-            else:  # relation == 0
-                relationships['unknown_points'].append(i)
-        
-        return relationships
     
     def get_real_conductive_points(self, point_id: int) -> Dict:
         """
@@ -1026,15 +1080,20 @@ class CableTestSystem:
         if point_id < 0 or point_id >= self.total_points:
             return {'error': '点位ID超出范围'}
         
-        # 获取该点位作为电源时能导通的所有目标点位
-        conductive_targets = []
-        for target_id in range(self.total_points):
-            if target_id == point_id:
+        # 获取该点位作为电源时能导通的所有目标点位：
+        # 只遍历一次真实点对集合收集对端点位，避免为每个目标点位构造一次规范化点对键
+        partners = set()
+        for a, b in self.true_pairs:
+            if a > b:
                 continue
-            # 检查是否存在真实的导通关系
-            a, b = (point_id, target_id) if point_id <= target_id else (target_id, point_id)
-            if (a, b) in self.true_pairs:
-                conductive_targets.append(target_id)
+            if a == point_id:
+                partners.add(b)
+            elif b == point_id:
+                partners.add(a)
+        conductive_targets = sorted(
+            target_id for target_id in partners
+            if target_id != point_id and 0 <= target_id < self.total_points
+        )
         
         return {
             'power_point': point_id,
@@ -1117,6 +1176,7 @@ class CableTestSystem:
     def reset_system(self):
         """重置系统状态"""
         self.test_history.clear()
+        self._reset_pair_observations()
         self.relay_operation_count = 0
         
         for point in self.test_points.values():
@@ -1138,6 +1198,7 @@ class CableTestSystem:
             self.test_points = {}
             self.connections = []
             self.test_history = []
+            self._reset_pair_observations()
             self.relay_operation_count = 0
             self.power_on_count = 0
             self._initialize_test_points()
@@ -1176,6 +1237,7 @@ class CableTestSystem:
         self.relationship_matrix = []
         self.true_relationship_matrix = []
         self.test_history.clear()
+        self._reset_pair_observations()
         
         # 重新初始化测试点位
         self._initialize_test_points()
@@ -1288,46 +1350,12 @@ class CableTestSystem:
                     self.true_relationship_matrix[point_id][target_point] = 1
                     logger.debug(f"创建连接: 点位 {point_id} -> 点位 {target_point}")
         
-        # 确保对角线为1，其他未设置的位置为-1
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i == j:
-                    self.true_relationship_matrix[i][j] = 1  # 对角线始终为1
-                elif self.true_relationship_matrix[i][j] != 1:
-                    # 如果还没有设置为导通，则设置为不导通
-                    self.true_relationship_matrix[i][j] = -1
-        
-        logger.info(f"连接关系生成完成")
-        logger.info(f"实际导通分布统计（除自己外的导通数量）:")
-        
-        # 统计实际的导通分布
-        actual_distribution = {}
-        for i in range(self.total_points):
-            count = 0
-            for j in range(self.total_points):
-                if i != j and self.true_relationship_matrix[i][j] == 1:
-                    count += 1
-            actual_distribution[count] = actual_distribution.get(count, 0) + 1
-        
-        for count in sorted(actual_distribution.keys()):
-            logger.info(f"  除自己外导通{count}个点位的点: {actual_distribution[count]}个")
-        
-        # 额外统计信息
-        total_connections = sum(actual_distribution.values())
-        logger.info(f"  总连接数: {total_connections}")
+        # 确保对角线为1，其他未设置的位置为-1，并输出导通分布统计
+        self._finalize_true_relationship_matrix()
         
-        # 统计作为目标的被选择次数分布
-        target_selection_count = {}
-        for j in range(self.total_points):
-            count = 0
-            for i in range(self.total_points):
-                if i != j and self.true_relationship_matrix[i][j] == 1:
-                    count += 1
-            target_selection_count[count] = target_selection_count.get(count, 0) + 1
-        
-        logger.info(f"  作为目标被选择的次数分布:")
-        for count in sorted(target_selection_count.keys()):
-            logger.info(f"    被{count}个点位选择的点: {target_selection_count[count]}个")
+        # 矩阵全部生成后再推进版本：并发读取者不会以新版本（ETag、比较缓存）持有生成中途的矩阵
+        self._matrix_version += 1
+        self._reset_matrix_changes()
     
     def get_real_clusters(self) -> List[Dict]:
         """
@@ -1349,24 +1377,17 @@ class CableTestSystem:
 
     def get_unconfirmed_points(self) -> List[int]:
         """（兼容保留）返回在任何导通对中尚未出现过的点位。"""
-        if len(self.test_history) == 0:
-            return list(range(self.total_points))
-        appeared: Set[int] = set()
-        for tr in self.test_history:
-            for c in tr.detected_connections:
-                appeared.add(int(c.source_point))
-                for t in c.target_points:
-                    appeared.add(int(t))
-        return [p for p in range(self.total_points) if p not in appeared]
+        return np.flatnonzero(~self._point_has_conductive).tolist()
 
     def get_cluster_visualization_data(self) -> Dict:
         """已废弃：返回空结构（兼容前端调用）。"""
+        unconfirmed_points = self.get_unconfirmed_points()
         return {
             'confirmed_clusters': [],
             'cluster_colors': {},
-            'unconfirmed_points': self.get_unconfirmed_points(),
+            'unconfirmed_points': unconfirmed_points,
             'total_confirmed_points': 0,
-            'total_unconfirmed_points': len(self.get_unconfirmed_points())
+            'total_unconfirmed_points': len(unconfirmed_points)
         }
 
     def get_detailed_cluster_info(self) -> Dict:
@@ -1487,10 +1508,8 @@ class CableTestSystem:
             confirmed_count = conductive_count + non_conductive_count
             
             # 添加调试信息
-            print(f"🔍 get_confirmed_points_count 调试:")
-            print(f"  导通关系: {conductive_count}")
-            print(f"  不导通关系: {non_conductive_count}")
-            print(f"  已确认关系总数: {confirmed_count}")
+            logger.debug("🔍 get_confirmed_points_count 调试: 导通关系: %s, 不导通关系: %s, 已确认关系总数: %s",
+                         conductive_count, non_conductive_count, confirmed_count)
             
             return confirmed_count
         except Exception as e:
@@ -1532,12 +1551,7 @@ class CableTestSystem:
         except Exception as e:
             print(f"❌ get_confirmed_non_conductive_count 发生错误: {e}")
             # 降级到原始逻辑
-            confirmed_non_conductive_count = 0
-            for i in range(self.total_points):
-                for j in range(i + 1, self.total_points):
-                    if self._were_points_cotested_without_link(i, j):
-                        confirmed_non_conductive_count += 1
-            return confirmed_non_conductive_count
+            return int(np.count_nonzero(np.triu(self._non_conductive_mask(), k=1)))
 
     def get_relay_operation_stats(self) -> Dict[str, Any]:
         """获取继电器操作统计信息"""
@@ -1569,14 +1583,42 @@ class RelayStateManager:
         self.relay_operation_count = 0    # 继电器操作计数
         self.power_on_count = 0           # 通电操作计数
         
-        # 继电器状态缓存
-        self.relay_states = {}
-        for i in range(total_points):
-            self.relay_states[i] = RelayState.OFF
+        # 继电器状态位图：第i位为1表示点位i的继电器开启；需要切换的继电器数即新旧位图异或后的置位数
+        self._relay_bits = 0
+        self._active_bits = 0  # active_test_points对应的位图
         
         # 🔧 重要：添加属性跟踪上一次的完整继电器状态集合
         self.last_full_relay_states = set()
     
+    def _point_bit(self, point_id: int) -> int:
+        """点位对应的位；点位不存在时与原状态字典一致抛出KeyError"""
+        if not 0 <= point_id < self.total_points:
+            raise KeyError(point_id)
+        return 1 << point_id
+    
+    def _points_mask(self, points) -> int:
+        """一组点位的位图"""
+        mask = 0
+        for point_id in points:
+            mask |= self._point_bit(point_id)
+        return mask
+    
+    @property
+    def relay_states(self) -> Dict[int, RelayState]:
+        """兼容旧接口：按点位编号生成继电器状态字典"""
+        bits = self._relay_bits
+        return {i: RelayState.ON if bits >> i & 1 else RelayState.OFF for i in range(self.total_points)}
+    
+    def get_on_points(self) -> List[int]:
+        """按编号升序返回继电器开启的点位（只遍历置位）"""
+        bits = self._relay_bits
+        points = []
+        while bits:
+            lowest = bits & -bits
+            points.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return points
+    
     def switch_power_source(self, new_power_source: int) -> int:
         """切换通电点位 - 智能计算继电器操作次数"""
         timer = get_timer()
@@ -1589,26 +1631,27 @@ class RelayStateManager:
             operations = 0
             
             # 🔧 重要：增加电源点位切换调试信息
-            print(f"🔌 电源点位切换调试:")
-            print(f"  当前电源点位: {self.current_power_source}")
-            print(f"  新电源点位: {new_power_source}")
-            print(f"  是否需要切换: {self.current_power_source != new_power_source}")
+            logger.debug("🔌 电源点位切换调试: 当前电源点位: %s, 新电源点位: %s, 是否需要切换: %s",
+                         self.current_power_source, new_power_source,
+                         self.current_power_source != new_power_source)
             
             if self.current_power_source != new_power_source:
                 # 关闭原通电点位
                 if self.current_power_source is not None:
-                    if self.relay_states[self.current_power_source] == RelayState.ON:
-                        self.relay_states[self.current_power_source] = RelayState.OFF
+                    bit = self._point_bit(self.current_power_source)
+                    if self._relay_bits & bit:
+                        self._relay_bits &= ~bit
                         operations += 1
-                        logger.debug(f"关闭原通电点位: {self.current_power_source}")
+                        logger.debug("关闭原通电点位: %s", self.current_power_source)
                 
                 # 开启新通电点位
                 if new_power_source is not None:
-                    if self.relay_states[new_power_source] == RelayState.OFF:
-                        self.relay_states[new_power_source] = RelayState.ON
+                    bit = self._point_bit(new_power_source)
+                    if not self._relay_bits & bit:
+                        self._relay_bits |= bit
                         operations += 1
                         self.power_on_count += 1
-                        logger.debug(f"开启新通电点位: {new_power_source}")
+                        logger.debug("开启新通电点位: %s", new_power_source)
                 
                 self.current_power_source = new_power_source
                 self.relay_operation_count += operations
@@ -1642,27 +1685,29 @@ class RelayStateManager:
             # 使用上一次的完整继电器状态
             current_relay_states = self.last_full_relay_states.copy()
         
-        # 🔧 重要：调试信息 - 显示继电器状态详情
-        print(f"🔌 继电器状态详情:")
-        print(f"  当前电源点位: {self.current_power_source}")
-        print(f"  当前激活测试点位: {sorted(self.active_test_points)}")
-        print(f"  实际继电器状态字典: {dict((k, v.value) for k, v in self.relay_states.items() if v == RelayState.ON)}")
-        print(f"  上一次完整继电器状态集合: {sorted(self.last_full_relay_states)}")
-        print(f"  本次需要的继电器状态集合: {sorted(new_relay_states)}")
-        print(f"  继电器状态是否相同: {new_relay_states == current_relay_states}")
-        print(f"  当前继电器状态集合: {sorted(current_relay_states)}")
-        
-        # 🔧 重要：继电器状态比较调试信息
-        print(f"🔌 继电器状态比较调试:")
-        print(f"  比较结果: {new_relay_states == current_relay_states}")
+        # 🔧 重要：调试信息 - 显示继电器状态详情（每次测试都会经过，仅在DEBUG级别启用时才排序和格式化）
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug(
+                "🔌 继电器状态详情:\n  当前电源点位: %s\n  当前激活测试点位: %s\n  实际继电器状态字典: %s\n"
+                "  上一次完整继电器状态集合: %s\n  本次需要的继电器状态集合: %s\n  继电器状态是否相同: %s\n"
+                "  当前继电器状态集合: %s",
+                self.current_power_source,
+                sorted(self.active_test_points),
+                dict.fromkeys(self.get_on_points(), RelayState.ON.value),
+                sorted(self.last_full_relay_states),
+                sorted(new_relay_states),
+                new_relay_states == current_relay_states,
+                sorted(current_relay_states)
+            )
         
         # 🔧 重要：修复继电器状态比较逻辑
         # 问题：当电源点位改变时，虽然测试点位集合基本相同，但继电器状态集合可能不同
         # 解决方案：检查是否只是电源点位和测试点位的交换
         if new_relay_states == current_relay_states:
-            print(f"🔌 继电器状态完全相同，无需切换，返回0")
+            logger.debug("🔌 继电器状态完全相同，无需切换，返回0")
             # 更新激活点位集合
-            self.active_test_points = set(test_points)
+            self._set_active_test_points(test_points)
             return 0
         
         # 🔧 重要：特殊处理：如果只是电源点位改变，测试点位集合基本相同
@@ -1672,79 +1717,74 @@ class RelayStateManager:
             diff_new = new_relay_states - current_relay_states
             diff_current = current_relay_states - new_relay_states
             
-            print(f"  继电器状态差异分析:")
-            print(f"    新增的点位: {sorted(diff_new)}")
-            print(f"    减少的点位: {sorted(diff_current)}")
+            if debug_enabled:
+                logger.debug("  继电器状态差异分析:\n    新增的点位: %s\n    减少的点位: %s",
+                             sorted(diff_new), sorted(diff_current))
             
             # 如果差异很小（最多1个点位），说明只是电源点位和测试点位的交换
             if len(diff_new) <= 1 and len(diff_current) <= 1:
-                print(f"🔌 只是电源点位和测试点位交换，继电器状态基本相同，返回0")
+                logger.debug("🔌 只是电源点位和测试点位交换，继电器状态基本相同，返回0")
                 # 更新激活点位集合
-                self.active_test_points = set(test_points)
+                self._set_active_test_points(test_points)
                 return 0
             
             # 特殊处理：如果只是电源点位和测试点位的交换（电源点位变成测试点位，测试点位变成电源点位）
             if (len(diff_new) == 1 and len(diff_current) == 1):
                 # 检查是否只是电源点位和测试点位的交换
                 # 新增的点位在原来的状态中，减少的点位在新的状态中
-                new_point = list(diff_new)[0]
-                current_point = list(diff_current)[0]
+                new_point = next(iter(diff_new))
+                current_point = next(iter(diff_current))
+                is_swap = new_point in current_relay_states and current_point in new_relay_states
                 
-                print(f"🔌 检查电源点位和测试点位交换:")
-                print(f"  新增点位: {new_point}")
-                print(f"  减少点位: {current_point}")
-                print(f"  新增点位在原来状态中: {new_point in current_relay_states}")
-                print(f"  减少点位在新状态中: {current_point in new_relay_states}")
+                if debug_enabled:
+                    logger.debug("🔌 检查电源点位和测试点位交换:\n  新增点位: %s\n  减少点位: %s\n"
+                                 "  新增点位在原来状态中: %s\n  减少点位在新状态中: %s",
+                                 new_point, current_point,
+                                 new_point in current_relay_states, current_point in new_relay_states)
                 
-                if (new_point in current_relay_states and current_point in new_relay_states):
-                    print(f"🔌 电源点位和测试点位交换，继电器状态基本相同，返回0")
-                    print(f"  交换详情: {current_point} -> {new_point}")
+                if is_swap:
+                    logger.debug("🔌 电源点位和测试点位交换，继电器状态基本相同，返回0\n  交换详情: %s -> %s",
+                                 current_point, new_point)
                     # 更新激活点位集合
-                    self.active_test_points = set(test_points)
+                    self._set_active_test_points(test_points)
                     return 0
                 else:
-                    print(f"🔌 不是简单的电源点位和测试点位交换")
-                    print(f"  新增点位 {new_point} 在原来状态中: {new_point in current_relay_states}")
-                    print(f"  减少点位 {current_point} 在新状态中: {current_point in new_relay_states}")
-        
-
-        
-        # 计算需要激活的新点位
-        new_points = set(test_points) - self.active_test_points
+                    logger.debug("🔌 不是简单的电源点位和测试点位交换")
         
-        # 计算需要关闭的旧点位
-        points_to_close = self.active_test_points - set(test_points)
+        # 计算需要激活的新点位与需要关闭的旧点位（位图运算）
+        new_mask = self._points_mask(test_points)
+        new_points_mask = new_mask & ~self._active_bits
+        points_to_close_mask = self._active_bits & ~new_mask
         
-        # 关闭不需要的点位
-        for point_id in points_to_close:
-            if self.relay_states[point_id] == RelayState.ON:
-                self.relay_states[point_id] = RelayState.OFF
-                operations += 1
-                logger.debug(f"关闭测试点位: {point_id}")
-        
-        # 激活新的测试点位
-        for point_id in new_points:
-            if self.relay_states[point_id] == RelayState.OFF:
-                self.relay_states[point_id] = RelayState.ON
-                operations += 1
-                self.power_on_count += 1
-                logger.debug(f"激活测试点位: {point_id}")
+        # 关闭不需要的点位、激活新的测试点位；实际切换的继电器即新旧状态位图的异或
+        old_relay_bits = self._relay_bits
+        self._relay_bits = (old_relay_bits & ~points_to_close_mask) | new_points_mask
+        operations = (old_relay_bits ^ self._relay_bits).bit_count()
+        self.power_on_count += (self._relay_bits & ~old_relay_bits).bit_count()
         
         # 更新激活点位集合
         self.active_test_points = set(test_points)
+        self._active_bits = new_mask
         self.relay_operation_count += operations
         
         # 🔧 重要：更新 last_full_relay_states 为本次测试的完整继电器状态
         self.last_full_relay_states = new_relay_states.copy()
         
         if operations > 0:
-            logger.info(f"测试点位状态更新: 激活{len(new_points)}个, 关闭{len(points_to_close)}个 (继电器操作: {operations}次)")
+            logger.info(f"测试点位状态更新: 激活{new_points_mask.bit_count()}个, 关闭{points_to_close_mask.bit_count()}个 (继电器操作: {operations}次)")
         
         return operations
     
+    def _set_active_test_points(self, test_points: List[int]):
+        """更新激活点位集合及其位图（继电器状态不变）"""
+        self.active_test_points = set(test_points)
+        self._active_bits = self._points_mask(test_points)
+    
     def get_relay_state(self, point_id: int) -> RelayState:
         """获取指定点位的继电器状态"""
-        return self.relay_states.get(point_id, RelayState.OFF)
+        if 0 <= point_id < self.total_points and self._relay_bits >> point_id & 1:
+            return RelayState.ON
+        return RelayState.OFF
     
     def get_operation_stats(self) -> Dict[str, int]:
         """获取继电器操作统计"""
@@ -1762,14 +1802,12 @@ class RelayStateManager:
     
     def reset_states(self):
         """重置所有继电器状态为关闭"""
-        operations = 0
-        for point_id in range(self.total_points):
-            if self.relay_states[point_id] == RelayState.ON:
-                self.relay_states[point_id] = RelayState.OFF
-                operations += 1
+        operations = self._relay_bits.bit_count()
+        self._relay_bits = 0
         
         self.current_power_source = None
         self.active_test_points.clear()
+        self._active_bits = 0
         self.relay_operation_count += operations
         
         if operations > 0:
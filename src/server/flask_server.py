@@ -7,14 +7,18 @@ Flask服务端 - 线缆测试系统双向测试接口
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import gzip
 import json
 import time
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 import sys
 import os
+
+import numpy as np
+
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from core.cable_test_system import CableTestSystem, TestResult, RelayState
+from core.cable_test_system import CableTestSystem, TestResult, RelayState, Connection
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -23,13 +27,41 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
+# 响应压缩：关系矩阵等大体积JSON在客户端支持时以gzip返回
+GZIP_MIN_SIZE = 1024  # 小于该字节数的响应不压缩
+GZIP_COMPRESS_LEVEL = 5  # 兼顾压缩率与CPU开销
+
+@app.after_request
+def compress_response(response):
+    """对支持gzip的客户端压缩JSON响应"""
+    if ('gzip' not in request.headers.get('Accept-Encoding', '').lower()
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=GZIP_COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
+
 class FlaskTestServer:
     """Flask测试服务端"""
     
     def __init__(self, total_points: int = 100):
         self.test_system = CableTestSystem(total_points=total_points)
         self.current_point_states = {}  # 当前点位状态缓存
-        self.confirmed_clusters = []    # 兼容保留：不再使用
+        # 检测到的连接按列登记（兼容保留：不再使用）：只保存连接对象引用与所属测试序号，
+        # 集群编号字符串和字典仅在读取confirmed_clusters时生成
+        self._detected_connections: List[Connection] = []
+        self._detected_origins: List[int] = []  # 每个连接所属测试在_detected_tests中的序号
+        self._detected_tests: List[Tuple[str, float]] = []  # (test_id, 发现时间)
         self._update_current_states()
     
     def _update_current_states(self):
@@ -58,16 +90,29 @@ class FlaskTestServer:
                 }
         
         # 更新集群信息
-        for connection in test_result.detected_connections:
-            cluster_info = {
-                'cluster_id': f"cluster_{len(self.confirmed_clusters) + 1}",
+        connections = test_result.detected_connections
+        if connections:
+            origin = len(self._detected_tests)
+            self._detected_tests.append((test_result.test_id, time.time()))
+            self._detected_connections.extend(connections)
+            self._detected_origins.extend([origin] * len(connections))
+    
+    @property
+    def confirmed_clusters(self) -> List[Dict[str, Any]]:
+        """兼容旧结构：按登记顺序生成集群信息字典"""
+        tests = self._detected_tests
+        clusters = []
+        for index, (connection, origin) in enumerate(zip(self._detected_connections, self._detected_origins), 1):
+            test_id, discovered_at = tests[origin]
+            clusters.append({
+                'cluster_id': f"cluster_{index}",
                 'power_source': connection.source_point,
                 'connected_points': connection.target_points,
                 'connection_type': connection.connection_type,
-                'discovered_at': time.time(),
-                'test_id': test_result.test_id
-            }
-            self.confirmed_clusters.append(cluster_info)
+                'discovered_at': discovered_at,
+                'test_id': test_id
+            })
+        return clusters
     
     def get_point_status(self, point_id: int = None) -> Dict[str, Any]:
         """获取点位状态"""
@@ -843,6 +888,23 @@ def run_batch_experiments():
                 'error': '缺少批量实验配置参数'
             })
         
+        # 指定实验列表时逐个执行，一次往返返回全部结果（顺序与请求一致）
+        experiments = batch_config.get('experiments')
+        if experiments is not None:
+            if not isinstance(experiments, list):
+                return jsonify({
+                    'success': False,
+                    'error': 'experiments参数必须为列表'
+                })
+            results = [server.run_experiment(config) for config in experiments]
+            return jsonify({
+                'success': True,
+                'data': {
+                    'total_tests': len(results),
+                    'results': results
+                }
+            })
+        
         test_count = batch_config.get('test_count', 5)
         max_points_per_test = batch_config.get('max_points_per_test', 100)
         
@@ -960,6 +1022,7 @@ def get_relationship_matrix():
             'data': {
                 'matrix': matrix,
                 'total_points': server.test_system.total_points,
+                'version': server.test_system.matrix_change_token(),
                 'timestamp': time.time()
             }
         })
@@ -969,24 +1032,38 @@ def get_relationship_matrix():
             'error': f'获取关系矩阵失败: {str(e)}'
         })
 
+@app.route('/api/relationships/matrix/changes', methods=['GET'])
+def get_relationship_matrix_changes():
+    """获取自since令牌以来关系矩阵的增量变化；令牌失效时返回full_required"""
+    try:
+        version = server.test_system.matrix_change_token()
+        changes = server.test_system.get_relationship_matrix_changes(request.args.get('since', ''))
+        data = {'full_required': True} if changes is None else {'changes': changes}
+        data.update({'version': version, 'timestamp': time.time()})
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取关系矩阵变化失败: {str(e)}'
+        })
+
 @app.route('/api/relationships/true_matrix', methods=['GET'])
 def get_true_relationship_matrix():
     """获取真实关系矩阵"""
     try:
-        # 构建真实关系矩阵
+        # 构建真实关系矩阵：对角线为1（自己连接自己）
         total_points = server.test_system.total_points
-        true_matrix = [[0] * total_points for _ in range(total_points)]
+        matrix = np.eye(total_points, dtype=np.int8)
         
-        # 填充真实连接关系
-        for i in range(total_points):
-            true_matrix[i][i] = 1  # 对角线为1（自己连接自己）
-            
-            # 填充真实连接关系
-            if hasattr(server.test_system, 'true_pairs'):
-                for pair in server.test_system.true_pairs:
-                    if pair[0] == i:
-                        true_matrix[i][pair[1]] = 1
-                        true_matrix[pair[1]][i] = 1
+        # 填充真实连接关系：所有点对一次性对称散射写入，不再对每个点位遍历全部点对
+        pairs = np.array(sorted(getattr(server.test_system, 'true_pairs', ())), dtype=np.intp).reshape(-1, 2)
+        pairs = pairs[(pairs[:, 0] >= 0) & (pairs[:, 0] < total_points)]
+        matrix[pairs[:, 0], pairs[:, 1]] = 1
+        matrix[pairs[:, 1], pairs[:, 0]] = 1
+        true_matrix = matrix.tolist()
         
         return jsonify({
             'success': True,
@@ -1,10 +1,13 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, make_response, render_template_string
 from flask_cors import CORS
 # from flask_socketio import SocketIO, emit  # 暂时禁用WebSocket
 from core.cable_test_system import CableTestSystem, TestResult, RelayState
 from core import config
+import functools
+import gzip
 import json
 import time
+import zlib
 from typing import Dict, Any, List
 import threading
 import queue
@@ -20,6 +23,35 @@ app.config['SECRET_KEY'] = 'cable_test_secret_key'
 CORS(app)
 # socketio = SocketIO(app, cors_allowed_origins="*")  # 暂时禁用WebSocket
 
+# 响应压缩：关系点对列表、矩阵等大体积JSON在客户端支持时以gzip返回
+GZIP_MIN_SIZE = 1024  # 小于该字节数的响应不压缩
+GZIP_COMPRESS_LEVEL = 5  # 兼顾压缩率与CPU开销
+
+def client_accepts_gzip() -> bool:
+    """当前请求的客户端是否接受gzip编码"""
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+@app.after_request
+def compress_response(response):
+    """对支持gzip的客户端压缩JSON响应（流式响应由生成方自行压缩）"""
+    if (not client_accepts_gzip()
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=GZIP_COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
+
 class WebFlaskTestServer:
     def __init__(self, total_points: int = None):
         # 使用配置文件中的点位数量，如果没有指定的话
@@ -75,10 +107,13 @@ class WebFlaskTestServer:
     
     def _update_current_states(self):
         """更新当前点位状态缓存"""
-        self.current_point_states = {}
-        all_points = self.test_system.get_all_point_states()
-        for point_id, point in all_points.items():
-            self.current_point_states[point_id] = point.relay_state.value
+        # 每次测试后都会调用：先用dict.fromkeys在C层一次性把全部点位置为关闭，
+        # 再只覆盖继电器未关闭的点位，不逐点取枚举值赋值，也不复制点位字典
+        all_points = self.test_system.test_points
+        states = dict.fromkeys(all_points, RelayState.OFF.value)
+        states.update({point_id: point.relay_state.value for point_id, point in all_points.items()
+                       if point.relay_state is not RelayState.OFF})
+        self.current_point_states = states
     
     def _update_clusters_from_test(self, test_result: TestResult):
         """根据测试结果更新点位状态和点对关系信息"""
@@ -111,8 +146,7 @@ class WebFlaskTestServer:
         print(f"  继电器操作: {test_result.relay_operations}")
         print(f"  当前激活点位: {test_result.active_points}")
         # 🔧 重要：显示正确的继电器状态，而不是空的 current_point_states
-        relay_states = self.test_system.relay_manager.relay_states
-        active_relay_states = {k: v.value for k, v in relay_states.items() if v.value == 1}
+        active_relay_states = dict.fromkeys(self.test_system.relay_manager.get_on_points(), RelayState.ON.value)
         print(f"  当前继电器状态: {active_relay_states}")
         # 追加：每次试验完成后的线缆拓扑简报
         try:
@@ -412,8 +446,21 @@ class WebFlaskTestServer:
     def get_relationship_matrix(self) -> Dict[str, Any]:
         """获取完整的关系矩阵"""
         try:
+            # 先取同步令牌再序列化矩阵：期间发生的写入会在下次增量同步时重复应用，结果不变
+            version = self.test_system.matrix_change_token()
             matrix = self.test_system.get_relationship_matrix()
-            return {'success': True, 'data': {'matrix': matrix, 'total_points': len(matrix)}, 'timestamp': time.time()}
+            return {'success': True, 'data': {'matrix': matrix, 'total_points': len(matrix), 'version': version}, 'timestamp': time.time()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_relationship_matrix_changes(self, since: str) -> Dict[str, Any]:
+        """获取自since令牌以来关系矩阵的单元变化；令牌失效时返回full_required，由客户端重新获取完整矩阵"""
+        try:
+            version = self.test_system.matrix_change_token()
+            changes = self.test_system.get_relationship_matrix_changes(since)
+            if changes is None:
+                return {'success': True, 'data': {'full_required': True, 'version': version}, 'timestamp': time.time()}
+            return {'success': True, 'data': {'changes': changes, 'version': version}, 'timestamp': time.time()}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -563,6 +610,36 @@ def get_server():
         server = WebFlaskTestServer()
     return server
 
+def reports_failure(response) -> bool:
+    """响应体是否为{'success': False, ...}形式的失败结果（多数查询接口以200状态码返回失败）"""
+    if response.is_streamed or not response.is_json:
+        return False
+    # 绝大多数成功响应不含false字面量，直接跳过解析；含有时再解析确认顶层success字段
+    if b'false' not in response.get_data():
+        return False
+    payload = response.get_json(silent=True)
+    return isinstance(payload, dict) and payload.get('success') is False
+
+def conditional_on_state(view):
+    """
+    为只读查询接口提供条件GET：以测试系统状态标识作为弱ETag，
+    客户端携带的If-None-Match仍匹配时直接返回304，不再重新生成和传输响应体。
+    失败结果不设置ETag，避免客户端在状态变化前一直以304复用该失败结果。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = get_server().test_system.state_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not reports_failure(response):
+            response.set_etag(etag, weak=True)
+        return response
+    return wrapper
+
 # HTML模板
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -2473,37 +2550,93 @@ def get_test_progress():
 
 # ============== 新增：点-点关系API ==============
 @app.route('/api/relationships/summary')
+@conditional_on_state
 def get_relationship_summary():
     return jsonify(get_server().get_relationship_summary())
 
 @app.route('/api/relationships/conductive')
+@conditional_on_state
 def get_conductive_pairs():
     return jsonify(get_server().get_conductive_pairs())
 
+# 流式输出点对列表时每块包含的点对数
+PAIR_STREAM_CHUNK = 20000
+
+def stream_pairs_response(pair_arrays_fn):
+    """
+    分块流式输出点对列表，响应结构与get_server().get_*_pairs()经jsonify的结果一致。
+    
+    未确认点对可达N²/2个，一次性构建字典列表再整体序列化会使峰值内存翻倍；
+    这里只持有两个整数数组，逐块编码后边生成边发送。
+    """
+    try:
+        rows, cols = pair_arrays_fn()
+    except Exception as e:
+        # 以5xx返回，conditional_on_state不会为错误响应设置ETag，客户端不会缓存并复用该错误
+        return jsonify({'success': False, 'error': str(e)}), 500
+    total = int(len(rows))
+    
+    def generate():
+        yield '{"success":true,"data":{"total":%d,"items":[' % total
+        for start in range(0, total, PAIR_STREAM_CHUNK):
+            end = start + PAIR_STREAM_CHUNK
+            chunk = ','.join('{"point1":%d,"point2":%d}' % pair
+                             for pair in zip(rows[start:end].tolist(), cols[start:end].tolist()))
+            yield (',' if start else '') + chunk
+        yield ']},"timestamp":%s}' % json.dumps(time.time())
+    
+    if not client_accepts_gzip():
+        return Response(generate(), mimetype='application/json')
+    
+    def generate_gzip():
+        # compress_response跳过流式响应，这里逐块压缩（wbits=31输出gzip格式），仍边生成边发送
+        compressor = zlib.compressobj(GZIP_COMPRESS_LEVEL, zlib.DEFLATED, 31)
+        for text in generate():
+            data = compressor.compress(text.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+    
+    response = Response(generate_gzip(), mimetype='application/json')
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/api/relationships/non_conductive')
+@conditional_on_state
 def get_non_conductive_pairs():
-    return jsonify(get_server().get_non_conductive_pairs())
+    return stream_pairs_response(get_server().test_system.get_confirmed_non_conductive_pair_arrays)
 
 @app.route('/api/relationships/unconfirmed')
+@conditional_on_state
 def get_unconfirmed_pairs():
-    return jsonify(get_server().get_unconfirmed_pairs())
+    return stream_pairs_response(get_server().test_system.get_unconfirmed_pair_arrays)
 
 @app.route('/api/relationships/point/<int:point_id>')
+@conditional_on_state
 def get_point_relationships(point_id: int):
     """获取指定点位的导通关系"""
     return jsonify(get_server().get_point_relationships(point_id))
 
 @app.route('/api/relationships/matrix')
+@conditional_on_state
 def get_relationship_matrix():
     """获取完整的关系矩阵"""
     return jsonify(get_server().get_relationship_matrix())
 
+@app.route('/api/relationships/matrix/changes')
+def get_relationship_matrix_changes():
+    """获取自since令牌以来关系矩阵的增量变化"""
+    return jsonify(get_server().get_relationship_matrix_changes(request.args.get('since', '')))
+
 @app.route('/api/relationships/true_matrix')
+@conditional_on_state
 def get_true_relationship_matrix():
     """获取真实关系矩阵"""
     return jsonify(get_server().get_true_relationship_matrix())
 
 @app.route('/api/relationships/matrices_comparison')
+@conditional_on_state
 def get_relationship_matrices_comparison():
     """获取检测到的关系矩阵与真实关系矩阵的对比"""
     return jsonify(get_server().get_relationship_matrices_comparison())
@@ -2574,6 +2707,7 @@ def get_cluster_comparison():
     return jsonify(get_server().get_cluster_comparison())
 
 @app.route('/api/clusters/detailed')
+@conditional_on_state
 def get_detailed_cluster_info():
     """获取详细的点对关系信息"""
     try:
@@ -2584,11 +2718,13 @@ def get_detailed_cluster_info():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/clusters/visualization')
+@conditional_on_state
 def get_cluster_visualization():
     """获取连接组可视化数据"""
     return jsonify(get_server().get_cluster_visualization())
 
 @app.route('/api/clusters/unconfirmed_relationships')
+@conditional_on_state
 def get_unconfirmed_cluster_relationships():
     """获取未确认连接组关系信息"""
     try:
@@ -2624,6 +2760,7 @@ def get_unconfirmed_cluster_relationships():
         return jsonify({'success': False, 'data': safe_data})
 
 @app.route('/api/relationships/confirmed_non_conductive')
+@conditional_on_state
 def get_confirmed_non_conductive():
     """获取已确认不导通关系（分页）
     Query:
@@ -2699,6 +2836,20 @@ def run_batch_experiments():
         if not data:
             return jsonify({'success': False, 'error': '无效的请求数据'}), 400
         
+        # 指定实验列表时逐个执行，一次往返返回全部结果（顺序与请求一致）
+        experiments = data.get('experiments')
+        if experiments is not None:
+            if not isinstance(experiments, list):
+                return jsonify({'success': False, 'error': 'experiments参数必须为列表'}), 400
+            results = [get_server().run_experiment(config) for config in experiments]
+            return jsonify({
+                'success': True,
+                'data': {
+                    'total_tests': len(results),
+                    'results': results
+                }
+            })
+        
         test_count = data.get('test_count', 5)
         max_points_per_test = data.get('max_points_per_test', 100)
         
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码 - 客户端请求体、响应解析与预设配置文件共用
+
+安装了orjson时直接在字节与对象之间转换，否则回退到标准json
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson  # 可选依赖：大体积请求/响应的编解码更快
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    序列化为UTF-8字节
+    
+    Args:
+        obj: 待序列化对象（安装了orjson时numpy数组与标量可直接序列化）
+        indent: 是否缩进2格（写入文件时使用）；默认生成紧凑格式
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def loads(data: Union[bytes, str]) -> Any:
+    """解析JSON字节或字符串（orjson的解析异常是json.JSONDecodeError的子类）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -6,15 +6,105 @@
 """
 
 import json
+import os
+import sys
 import time
 import random
 import math
 import requests
+import threading
 import traceback
 from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import logging
 from typing import List, Tuple, Dict, Set, Optional, Any
 
+# 与服务端、客户端共用src/utils中的JSON编解码
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from utils import json_codec
+
+# 请求体已预先序列化为JSON字节，需显式声明内容类型
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+class PairBitset:
+    """
+    无序点对集合的位图实现
+    
+    点位编号为base..base+n-1，每个不同点对(a, b)在按上三角顺序排列的位图中占1位，
+    n个点位只需n*(n-1)/2位；成员判断与增删不构造元组、不做哈希，集合大小增量维护。
+    """
+    
+    def __init__(self, n: int, base: int = 0, fill: bool = False):
+        self.n = n
+        self.base = base
+        total = n * (n - 1) // 2
+        self.bits = bytearray(b'\xff' * ((total + 7) // 8)) if fill else bytearray((total + 7) // 8)
+        if fill and total % 8:
+            self.bits[-1] = (1 << (total % 8)) - 1  # 清除末字节中不对应点对的填充位
+        self._count = total if fill else 0
+    
+    def _index(self, a: int, b: int) -> int:
+        a -= self.base
+        b -= self.base
+        if a > b:
+            a, b = b, a
+        return a * self.n - a * (a + 1) // 2 + (b - a - 1)
+    
+    def _row_indices(self, a: int, others: List[int]) -> List[int]:
+        """同一点位a与一组点位构成的点对下标：a所在行的起始偏移只计算一次，逐个点位只做比较和加法"""
+        a -= self.base
+        row_base = a * self.n - a * (a + 1) // 2 - a - 1
+        indices = []
+        for b in others:
+            b -= self.base
+            if b > a:
+                indices.append(row_base + b)
+            else:
+                indices.append(b * self.n - b * (b + 1) // 2 + (a - b - 1))
+        return indices
+    
+    def add(self, a: int, b: int):
+        idx = self._index(a, b)
+        mask = 1 << (idx & 7)
+        if not self.bits[idx >> 3] & mask:
+            self.bits[idx >> 3] |= mask
+            self._count += 1
+    
+    def discard(self, a: int, b: int):
+        idx = self._index(a, b)
+        mask = 1 << (idx & 7)
+        if self.bits[idx >> 3] & mask:
+            self.bits[idx >> 3] &= ~mask & 0xFF
+            self._count -= 1
+    
+    def add_many(self, a: int, others: List[int]):
+        """批量加入点对(a, b)，b取自others"""
+        bits = self.bits
+        for idx in self._row_indices(a, others):
+            mask = 1 << (idx & 7)
+            if not bits[idx >> 3] & mask:
+                bits[idx >> 3] |= mask
+                self._count += 1
+    
+    def discard_many(self, a: int, others: List[int]):
+        """批量移除点对(a, b)，b取自others"""
+        bits = self.bits
+        for idx in self._row_indices(a, others):
+            mask = 1 << (idx & 7)
+            if bits[idx >> 3] & mask:
+                bits[idx >> 3] &= ~mask & 0xFF
+                self._count -= 1
+    
+    def contains(self, a: int, b: int) -> bool:
+        idx = self._index(a, b)
+        return bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+    
+    def __contains__(self, pair: Tuple[int, int]) -> bool:
+        return self.contains(*pair)
+    
+    def __len__(self) -> int:
+        return self._count
+
 # 配置日志
 def setup_logging(enable_logging: bool = True):
     """设置日志配置"""
@@ -41,14 +131,29 @@ class AdaptiveGroupingTester:
         # 测试状态
         self.total_points = config.get('total_points', 100)
         self.concurrency = config.get('concurrency', 4)
+        
+        # 持久会话：连接池与并发线程数一致，各线程复用keep-alive连接，不再为每次测试新建TCP连接
+        self.session = requests.Session()
+        self.session.headers.update(JSON_HEADERS)
+        self.session.headers['Connection'] = 'keep-alive'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # 并发测试线程回写测试计数与关系状态时使用
+        self._state_lock = threading.Lock()
+        # 服务器支持/api/experiment/batch的实验列表时，每轮的批次测试合并为一次请求提交
+        self.batch_endpoint_available = True
         self.current_phase = 0
         self.test_count = 0
         self.start_time = time.time()
         
         # 关系矩阵和状态
         self.relation_matrix = {}
-        self.unknown_relations = set()
-        self.known_relations = set()
+        # 未知/已知点对以位图保存（点位编号从1开始）
+        self.unknown_relations = PairBitset(self.total_points, base=1)
+        # 按源点索引的未知目标点（与unknown_relations同步维护），选源点/取目标点无需扫描全部点对
+        self.unknown_by_source: Dict[int, Set[int]] = {}
+        self.known_relations = PairBitset(self.total_points, base=1)
         self.power_sources = set()
         
         # 初始化未知关系
@@ -65,11 +170,31 @@ class AdaptiveGroupingTester:
     
     def _initialize_unknown_relations(self):
         """初始化未知关系集合"""
-        for i in range(1, self.total_points + 1):
-            for j in range(i + 1, self.total_points + 1):
-                self.unknown_relations.add((i, j))
+        # 所有(i, j)且i<j的点对：位图整体置位，按源点索引整段构建
+        points = range(1, self.total_points + 1)
+        self.unknown_relations = PairBitset(self.total_points, base=1, fill=True)
+        self.unknown_by_source = {i: set(range(i + 1, self.total_points + 1)) for i in points if i < self.total_points}
         self.logger.info(f"🔍 初始化未知关系: {len(self.unknown_relations)} 对")
     
+    def _add_unknown(self, source: int, destination: int):
+        """登记一个未知关系（同时更新源点索引；测试失败时可能由并发测试线程调用）"""
+        with self._state_lock:
+            self.unknown_relations.add(source, destination)
+            self.unknown_by_source.setdefault(source, set()).add(destination)
+    
+    def _remove_unknowns(self, source: int, destinations: List[int]):
+        """批量移除同一源点的一组未知关系（点对下标按源点整行计算）；源点的未知目标为空时从索引中删除该源点"""
+        self.unknown_relations.discard_many(source, destinations)
+        dests = self.unknown_by_source.get(source)
+        if dests is not None:
+            dests.difference_update(destinations)
+            if not dests:
+                del self.unknown_by_source[source]
+    
+    def close(self):
+        """关闭HTTP会话，释放连接池"""
+        self.session.close()
+    
     def run_full_test_cycle(self):
         """运行完整的测试循环"""
         self.logger.info("📊 开始运行完整测试循环")
@@ -120,25 +245,15 @@ class AdaptiveGroupingTester:
                         break
                     
                     # 1. 选择一个电源点（source）
-                    # 收集所有可能的源点
-                    potential_sources = set()
-                    for pair in self.unknown_relations:
-                        potential_sources.add(pair[0])
-                    
-                    if not potential_sources:
+                    # 索引中的源点都至少还有一个未知目标
+                    if not self.unknown_by_source:
                         break
                     
                     # 随机选择一个源点
-                    source = random.choice(list(potential_sources))
+                    source = random.choice(list(self.unknown_by_source))
                     
                     # 2. 收集该源点相关的所有未知关系目标点
-                    source_unknown_dests = []
-                    for pair in list(self.unknown_relations):
-                        if pair[0] == source:
-                            source_unknown_dests.append(pair[1])
-                    
-                    if not source_unknown_dests:
-                        continue
+                    source_unknown_dests = list(self.unknown_by_source[source])
                     
                     # 3. 根据配置确定批次大小
                     # 批次大小应该根据剩余未知点数动态调整
@@ -152,11 +267,11 @@ class AdaptiveGroupingTester:
                     test_tasks.append((source, selected_dests))
                     
                     # 从未知关系中移除这些点对，避免重复测试
-                    for dest in selected_dests:
-                        if (source, dest) in self.unknown_relations:
-                            self.unknown_relations.remove((source, dest))
+                    self._remove_unknowns(source, selected_dests)
                 
-                # 执行测试任务
+                # 执行测试任务：优先一次请求提交本轮全部批次，服务器不支持时逐个并发提交
+                if self.batch_endpoint_available and self._perform_binary_batch_tests(test_tasks):
+                    continue
                 futures = [executor.submit(self._perform_binary_batch_test, src, dests) for src, dests in test_tasks]
                 
                 # 等待所有任务完成
@@ -173,7 +288,8 @@ class AdaptiveGroupingTester:
     def _perform_binary_test(self, source: int, destination: int):
         """执行二分法测试 - 一对一版本"""
         try:
-            self.test_count += 1
+            with self._state_lock:
+                self.test_count += 1
             
             # 构建测试请求 - 使用主服务器期望的参数格式
             test_data = {
@@ -184,15 +300,16 @@ class AdaptiveGroupingTester:
             }
             
             # 发送测试请求到服务器 - 注意：使用正确的API端点/api/experiment
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/api/experiment",
-                json=test_data,
+                data=json_codec.dumps(test_data),
                 timeout=30
             )
             
             if response.status_code == 200:
                 result = response.json()
-                self._update_relation_matrix(source, destination, result)
+                with self._state_lock:
+                    self._update_relation_matrix(source, destination, result)
                 
                 # 打印测试进度
                 if self.test_count % 10 == 0:
@@ -201,17 +318,18 @@ class AdaptiveGroupingTester:
             else:
                 self.logger.error(f"❌ 测试请求失败: HTTP {response.status_code}")
                 # 将点位对重新添加到未知关系中
-                self.unknown_relations.add((source, destination))
+                self._add_unknown(source, destination)
                 
         except Exception as e:
             self.logger.error(f"❌ 测试执行异常 (源: {source}, 目标: {destination}): {str(e)}")
             # 将点位对重新添加到未知关系中
-            self.unknown_relations.add((source, destination))
+            self._add_unknown(source, destination)
     
     def _perform_binary_batch_test(self, source: int, destinations: List[int]):
         """执行二分法批次测试"""
         try:
-            self.test_count += 1
+            with self._state_lock:
+                self.test_count += 1
             
             # 记录批次信息
             self.logger.info(f"📋 执行二分法批次测试 (源: {source}, 目标点数: {len(destinations)})")
@@ -225,26 +343,16 @@ class AdaptiveGroupingTester:
             }
             
             # 发送测试请求到服务器 - 使用正确的API端点/api/experiment
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/api/experiment",
-                json=test_data,
+                data=json_codec.dumps(test_data),
                 timeout=60  # 批次测试可能需要更长时间
             )
             
             if response.status_code == 200:
                 result = response.json()
-                
-                # 处理批次测试结果
-                if isinstance(result, dict) and 'results' in result:
-                    # 主服务器返回的是批次结果
-                    batch_results = result['results']
-                    for dest_idx, dest_result in enumerate(batch_results):
-                        dest = destinations[dest_idx]
-                        self._update_relation_matrix(source, dest, dest_result)
-                else:
-                    # 如果返回的是单个结果，为每个目标点使用相同结果
-                    for dest in destinations:
-                        self._update_relation_matrix(source, dest, result)
+                with self._state_lock:
+                    self._apply_batch_result(source, destinations, result)
                 
                 # 打印测试进度
                 if self.test_count % 10 == 0:
@@ -254,21 +362,87 @@ class AdaptiveGroupingTester:
                 self.logger.error(f"❌ 批次测试请求失败: HTTP {response.status_code}")
                 # 将所有点位对重新添加到未知关系中
                 for dest in destinations:
-                    self.unknown_relations.add((source, dest))
+                    self._add_unknown(source, dest)
                 
         except Exception as e:
             self.logger.error(f"❌ 批次测试执行异常 (源: {source}, 目标点数: {len(destinations)}): {str(e)}")
             # 将所有点位对重新添加到未知关系中
             for dest in destinations:
-                self.unknown_relations.add((source, dest))
+                self._add_unknown(source, dest)
+    
+    def _perform_binary_batch_tests(self, test_tasks: List[Tuple[int, List[int]]]) -> bool:
+        """
+        一次请求提交本轮全部二分法批次测试（服务器按顺序逐个执行，结果顺序与任务一致）
+        
+        Returns:
+            bool: 本轮任务是否已处理；服务器不支持实验列表时返回False，由调用方逐个提交
+        """
+        if not test_tasks:
+            return True
+        
+        experiments = [{
+            "power_source": source,
+            "test_points": destinations,
+            "strategy": "binary_search",
+            "phase": self.current_phase
+        } for source, destinations in test_tasks]
+        self.logger.info(f"📋 合并提交 {len(experiments)} 个二分法批次测试")
+        
+        start_count = self.test_count
+        self.test_count += len(test_tasks)
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/experiment/batch",
+                data=json_codec.dumps({"experiments": experiments}),
+                timeout=60 * len(experiments)
+            )
+            payload = response.json() if response.status_code == 200 else {}
+            results = (payload.get('data') or {}).get('results') if payload.get('success') else None
+            if results is None or len(results) != len(test_tasks):
+                self.logger.warning(f"⚠️  服务器不支持合并提交 (HTTP {response.status_code})，改为逐个提交")
+                self.batch_endpoint_available = False
+                self.test_count = start_count
+                return False
+        except Exception as e:
+            self.logger.error(f"❌ 合并批次测试执行异常 (批次数: {len(test_tasks)}): {str(e)}")
+            for source, destinations in test_tasks:
+                for dest in destinations:
+                    self._add_unknown(source, dest)
+            return True
+        
+        for (source, destinations), result in zip(test_tasks, results):
+            self._apply_batch_result(source, destinations, result)
+        
+        # 打印测试进度
+        if self.test_count // 10 > start_count // 10:
+            self.logger.info(f"📈 测试进度: {self.test_count} 次测试完成")
+        return True
+    
+    def _apply_batch_result(self, source: int, destinations: List[int], result: Dict):
+        """将一次批次测试的响应写入关系矩阵"""
+        if isinstance(result, dict) and 'results' in result:
+            # 主服务器返回的是批次结果
+            batch_results = result['results']
+            for dest_idx, dest_result in enumerate(batch_results):
+                self._record_relation_result(source, destinations[dest_idx], dest_result)
+            self.known_relations.add_many(source, destinations[:len(batch_results)])
+        else:
+            # 如果返回的是单个结果，为每个目标点使用相同结果
+            for dest in destinations:
+                self._record_relation_result(source, dest, result)
+            self.known_relations.add_many(source, destinations)
             
     def _update_relation_matrix(self, source: int, destination: int, result: Dict):
         """更新关系矩阵"""
-        relation_key = (source, destination)
-        self.relation_matrix[relation_key] = result
+        self._record_relation_result(source, destination, result)
         
         # 更新已知关系
-        self.known_relations.add(relation_key)
+        self.known_relations.add(source, destination)
+    
+    def _record_relation_result(self, source: int, destination: int, result: Dict):
+        """记录单个点对的测试结果（已知关系位图由调用方更新）"""
+        relation_key = (source, destination)
+        self.relation_matrix[relation_key] = result
         
         # 检查是否是电源点位
         if result.get('is_power_source', False):
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试端配置模块共用的辅助定义
+50%批量测试配置与混合策略配置都从此处导入，彼此之间不再相互依赖
+
+本模块导入时没有副作用；预设持久化使用src/utils中的JSON编解码，
+由入口脚本负责把src目录加入sys.path。
+"""
+
+import threading
+from dataclasses import asdict, is_dataclass
+from enum import Enum
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+# 策略名称：按成员身份比较（is），打印时输出原字符串值
+class StrategyName(str, Enum):
+    OPTIMIZED_50_PERCENT = 'optimized_50_percent'
+    HYBRID_BLOCK_BINARY = 'hybrid_block_binary'
+
+    def __str__(self) -> str:
+        return self.value
+
+# 串行化对模块级配置对象的“读取-替换”，避免并发应用预设或调整并发数时互相覆盖；
+# 读取方只需一次属性访问即可拿到完整的新对象或旧对象，无需加锁
+CONFIG_LOCK = threading.Lock()
+
+def freeze_presets(presets: Dict[str, Dict[str, Any]]) -> MappingProxyType:
+    """将预设表及其中每个预设都包装为只读映射（修改任一层都会抛出TypeError）"""
+    return MappingProxyType({name: MappingProxyType(preset) for name, preset in presets.items()})
+
+# 预设参数的列式存储（名称与各数值字段分别成数组），按目标参数挑选最接近的预设时整体向量化计算
+def build_preset_arrays(presets: Mapping[str, Mapping[str, Any]], keys: Tuple[str, str, str]) -> Tuple:
+    """按(覆盖率, 批次大小, 并发数)三个字段名将预设表转换为名称元组与三列数组"""
+    import numpy as np
+    names = tuple(presets)
+    columns = tuple(np.array([presets[n][key] for n in names], dtype=np.float64) for key in keys)
+    return (names,) + columns
+
+def nearest_preset(preset_arrays: Tuple, target_coverage: float, target_batch: float, target_concurrency: float,
+                   weights: Tuple[float, float, float] = (1.0, 0.1, 0.5)) -> str:
+    """返回与目标(覆盖率, 批次大小, 并发数)加权平方距离最小的预设名称"""
+    import numpy as np
+    names, coverages, batch_sizes, concurrencies = preset_arrays
+    distance = (weights[0] * (coverages - target_coverage) ** 2
+                + weights[1] * (batch_sizes - target_batch) ** 2
+                + weights[2] * (concurrencies - target_concurrency) ** 2)
+    return names[int(np.argmin(distance))]
+
+# 预设配置的JSON持久化
+def save_preset(path: str, preset: Any):
+    """将预设配置（字典或配置dataclass）保存为JSON文件"""
+    from utils import json_codec
+    if is_dataclass(preset):
+        preset = asdict(preset)
+    with open(path, 'wb') as f:
+        f.write(json_codec.dumps(dict(preset), indent=True))
+
+def load_preset(path: str) -> Dict[str, Any]:
+    """从JSON文件读取预设配置"""
+    from utils import json_codec
+    with open(path, 'rb') as f:
+        return json_codec.loads(f.read())
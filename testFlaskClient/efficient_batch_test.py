@@ -10,39 +10,93 @@
 4. 基于分析结果组织二次试验
 """
 
-import json
+import os
+import sys
 import time
 import random
 import math
-from typing import Dict, List, Set, Tuple, Optional, Any
+import functools
+import itertools
+from typing import Dict, List, Set, Tuple, Optional, Any, Sequence
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import concurrent.futures
+from collections import Counter, defaultdict
 from dataclasses import dataclass
+from efficient_config import ClientConfig
+from hybrid_strategy_config import should_switch_to_binary
 
-@dataclass
+# 与服务端、客户端共用src/utils中的JSON编解码
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from utils import json_codec
+
+# 关系矩阵对角线哨兵值：不属于{-1, 0, 1}，按行扫描未知关系时无需再排除点位自身
+DIAGONAL_SENTINEL = -128
+
+# 单字节置位数查表，用于统计位图中的置位总数
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# 导通概率估算参数：局部模式与全局密度的权重、概率上下限、无共同已知邻居时的默认概率
+LOCAL_PATTERN_WEIGHT = 0.7
+GLOBAL_DENSITY_WEIGHT = 0.3
+MIN_PROBABILITY = 0.1
+MAX_PROBABILITY = 0.9
+DEFAULT_PROBABILITY = 0.5
+
+# 服务器矩阵与本地矩阵相比变化的行数超过该比例时整体重建，否则按行增量应用
+MAX_INCREMENTAL_ROW_FRACTION = 0.125
+
+# 分块规划时一次筛选的(电源点×目标点)子矩阵单元数上限，超过则按电源点分段筛选以限制临时内存
+BLOCK_FILTER_CHUNK_CELLS = 1 << 22
+
+@dataclass(slots=True)
 class TestRequest:
     """测试请求数据结构"""
     power_source: int
-    test_points: List[int]
+    test_points: Sequence[int]
     strategy: str
     batch_size: int
     priority: int = 1
 
+@dataclass(slots=True)
+class TestResult:
+    """单个测试请求的执行结果"""
+    request: TestRequest
+    result: Dict[str, Any]
+    success: bool
+
 class EfficientBatchTestClient:
     """高效批量测试客户端"""
     
-    def __init__(self, base_url: str = "http://localhost:5000"):
+    def __init__(self, base_url: str = "http://localhost:5000", config: Optional[ClientConfig] = None):
         self.base_url = base_url
+        self.cfg = config if config is not None else ClientConfig()
+        self._experiment_url = f"{base_url}/api/experiment"
+        self._experiment_batch_url = f"{base_url}/api/experiment/batch"
         self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.headers.update({'Content-Type': 'application/json', 'Connection': 'keep-alive',
+                                     'Accept-Encoding': 'gzip, deflate'})
         
         # 关系矩阵缓存
-        self.relationship_matrix = None
+        self.relationship_matrix: Optional[np.ndarray] = None  # int8矩阵：1导通，-1不导通，0未知
         self.true_relationship_matrix = None
         self.total_points = 0
+        self._probability_matrix: Optional[np.ndarray] = None  # 导通概率矩阵缓存，矩阵更新时失效
+        self._common_neighbors: Optional[np.ndarray] = None  # 点对共同已知邻居数（增量维护）
+        self._common_conductive: Optional[np.ndarray] = None  # 点对共同导通邻居数（增量维护）
+        self._matrix_version = 0  # 关系矩阵版本号，每次矩阵变化时递增
+        # 按(版本号, 点位1, 点位2)缓存导通概率，版本号变化后旧条目自然失效
+        self._cached_probability = functools.lru_cache(maxsize=131072)(self._estimate_conductivity_probability)
+        self._known_count = 0        # 非对角线已知关系计数（增量维护）
+        self._conductive_count = 0   # 非对角线导通关系计数（增量维护）
+        self._unknown_per_row: Optional[np.ndarray] = None  # 每行未知关系数（增量维护）
+        self._server_matrix: Optional[np.ndarray] = None  # 服务器检测矩阵的原样副本（按同步令牌增量更新）
+        self._server_matrix_version: Optional[str] = None  # 服务器检测矩阵的同步令牌
         
         # 测试历史
-        self.tested_pairs: Set[Tuple[int, int]] = set()
+        self.tested_pairs: Optional[np.ndarray] = None  # 已测试点对位图（N×ceil(N/8)的uint8，按行小端位序打包，对称），获取矩阵后分配
         self.confirmed_conductive: Set[Tuple[int, int]] = set()
         self.confirmed_non_conductive: Set[Tuple[int, int]] = set()
         
@@ -50,19 +104,50 @@ class EfficientBatchTestClient:
         self.total_tests = 0
         self.total_relay_operations = 0
         
-        # 批量测试配置
-        self.batch_size = 50  # 默认批量大小
-        self.min_batch_size = 20  # 最小批量大小
-        self.max_batch_size = 80  # 最大批量大小
+        # 批量测试配置（batch_size在自适应测试中会动态调整）
+        self.batch_size = self.cfg.batch_size  # 默认批量大小
+        self.min_batch_size = self.cfg.min_batch_size  # 最小批量大小
+        self.max_batch_size = self.cfg.max_batch_size  # 最大批量大小
         
         # 并发配置
-        self.max_concurrent_requests = 10  # 最大并发请求数
-        self.request_batch_size = 20  # 每批发送的请求数量
+        self.max_concurrent_requests = self.cfg.max_concurrent_requests  # 最大并发请求数
+        self.request_batch_size = self.cfg.request_batch_size  # 每批发送的请求数量
+        
+        # 连接池按并发数的两倍预留，保证每个工作线程都能复用keep-alive连接；
+        # 服务器临时错误（5xx）时GET/POST均按指数退避自动重试，重试用尽后返回最后一次响应
+        retry = Retry(total=self.cfg.max_retries,
+                      backoff_factor=self.cfg.retry_backoff_factor,
+                      status_forcelist=self.cfg.retry_status_codes,
+                      allowed_methods=frozenset(["GET", "POST"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.max_concurrent_requests,
+                              pool_maxsize=self.max_concurrent_requests * 2,
+                              max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 长生命周期线程池，所有批次复用，避免每批重复创建/销毁线程；在close()中关闭
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_requests,
+                                                               thread_name_prefix="batchtest")
         
         # 继电器优化配置
         self.current_power_source = None  # 当前通电点位
         self.relay_switch_count = 0      # 继电器切换次数
         self.relay_optimization_enabled = True  # 启用继电器优化
+        
+        # 输出配置
+        self.verbose = False  # 是否打印逐条/逐请求的详细输出（默认只打印批次汇总）
+    
+    def close(self):
+        """关闭线程池和HTTP会话"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def get_system_info(self) -> Dict[str, Any]:
         """获取系统信息"""
@@ -70,7 +155,7 @@ class EfficientBatchTestClient:
             response = self.session.get(f"{self.base_url}/api/system/info")
             if response.status_code == 200:
                 return response.json()
-        except Exception as e:
+        except requests.RequestException as e:
             print(f"获取系统信息失败: {e}")
         return {}
     
@@ -79,18 +164,54 @@ class EfficientBatchTestClient:
         try:
             response = self.session.get(f"{self.base_url}/api/relationships/matrix")
             if response.status_code == 200:
-                return response.json()
-        except Exception as e:
+                return json_codec.loads(response.content)
+        except requests.RequestException as e:
             print(f"获取关系矩阵失败: {e}")
         return {}
     
+    def get_relationship_matrix_changes(self, since: str) -> Dict[str, Any]:
+        """获取自同步令牌以来检测矩阵的单元变化"""
+        try:
+            response = self.session.get(f"{self.base_url}/api/relationships/matrix/changes", params={'since': since})
+            if response.status_code == 200:
+                return json_codec.loads(response.content)
+        except requests.RequestException as e:
+            print(f"获取关系矩阵变化失败: {e}")
+        return {}
+    
+    def _sync_server_matrix(self) -> bool:
+        """
+        同步服务器检测矩阵的本地副本，返回本次是否有变化
+        
+        持有同步令牌时只拉取令牌之后的单元写入并就地应用；服务器不支持增量接口或令牌失效时获取完整矩阵。
+        """
+        if self._server_matrix is not None and self._server_matrix_version is not None:
+            delta = self.get_relationship_matrix_changes(self._server_matrix_version).get('data') or {}
+            changes = delta.get('changes')
+            if changes is not None:
+                self._server_matrix_version = delta['version']
+                if not changes:
+                    return False
+                # 同一单元按写入顺序以最后一次为准
+                latest = {(row, col): value for row, col, value in changes}
+                rows, cols = np.array(list(latest), dtype=np.intp).T
+                self._server_matrix[rows, cols] = np.fromiter(latest.values(), dtype=np.int8, count=len(latest))
+                return True
+        
+        detected_result = self.get_relationship_matrix()
+        if not detected_result.get('success'):
+            return False
+        self._server_matrix = np.asarray(detected_result['data']['matrix'], dtype=np.int8)
+        self._server_matrix_version = detected_result['data'].get('version')
+        return True
+    
     def get_true_relationship_matrix(self) -> Dict[str, Any]:
         """获取真实关系矩阵"""
         try:
             response = self.session.get(f"{self.base_url}/api/relationships/true_matrix")
             if response.status_code == 200:
-                return response.json()
-        except Exception as e:
+                return json_codec.loads(response.content)
+        except requests.RequestException as e:
             print(f"获取真实关系矩阵失败: {e}")
         return {}
     
@@ -101,55 +222,67 @@ class EfficientBatchTestClient:
                 "power_source": power_source,
                 "test_points": test_points
             }
-            response = self.session.post(f"{self.base_url}/api/experiment", json=payload)
+            response = self.session.post(self._experiment_url, data=json_codec.dumps(payload))
             if response.status_code == 200:
                 return response.json()
-        except Exception as e:
+        except requests.RequestException as e:
             print(f"运行实验失败: {e}")
         return {}
     
-    def run_experiment_batch(self, test_requests: List[TestRequest]) -> List[Dict[str, Any]]:
+    def run_experiment_multi(self, test_requests: List[TestRequest]) -> List[Dict[str, Any]]:
+        """通过批量接口一次往返运行多个实验，返回与请求顺序一致的结果列表（失败的项为空字典）"""
+        try:
+            payload = {
+                "experiments": [
+                    {"power_source": req.power_source, "test_points": req.test_points}
+                    for req in test_requests
+                ]
+            }
+            response = self.session.post(self._experiment_batch_url, data=json_codec.dumps(payload))
+            if response.status_code == 200:
+                results = response.json().get('data', {}).get('results')
+                if isinstance(results, list) and len(results) == len(test_requests):
+                    return results
+        except requests.RequestException as e:
+            print(f"批量运行实验失败: {e}")
+        return [{} for _ in test_requests]
+    
+    def _iter_completed(self, fn, items):
+        """以滑动窗口在共享线程池中执行fn(item)：在途任务不超过max_concurrent_requests，
+        每完成一个立即补充下一个，按完成顺序产出(item, future)"""
+        remaining = iter(items)
+        pending = {self._executor.submit(fn, item): item
+                   for item in itertools.islice(remaining, self.max_concurrent_requests)}
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for next_item in itertools.islice(remaining, 1):
+                    pending[self._executor.submit(fn, next_item)] = next_item
+                yield item, future
+    
+    def run_experiment_batch(self, test_requests: List[TestRequest]) -> List[TestResult]:
         """批量运行实验"""
         results = []
         
-        # 分批发送请求，避免服务器压力过大
-        for i in range(0, len(test_requests), self.request_batch_size):
-            batch = test_requests[i:i + self.request_batch_size]
-            print(f"发送第 {i//self.request_batch_size + 1} 批请求 ({len(batch)} 个)")
-            
-            # 使用线程池并发执行
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
-                future_to_request = {
-                    executor.submit(self.run_experiment, req.power_source, req.test_points): req
-                    for req in batch
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_request):
-                    request = future_to_request[future]
-                    try:
-                        result = future.result()
-                        results.append({
-                            'request': request,
-                            'result': result,
-                            'success': result.get('success', False)
-                        })
-                        
-                        if result.get('success'):
-                            print(f"  电源点{request.power_source} -> {len(request.test_points)}个目标点: 成功")
-                        else:
-                            print(f"  电源点{request.power_source} -> {len(request.test_points)}个目标点: 失败")
-                            
-                    except Exception as e:
-                        print(f"  电源点{request.power_source} -> {len(request.test_points)}个目标点: 异常 {e}")
-                        results.append({
-                            'request': request,
-                            'result': {'error': str(e)},
-                            'success': False
-                        })
+        # 每request_batch_size个实验合并为一次批量接口调用，各批量请求以滑动窗口方式并发执行
+        chunks = [test_requests[i:i + self.request_batch_size]
+                  for i in range(0, len(test_requests), self.request_batch_size)]
+        print(f"发送 {len(test_requests)} 个实验 (合并为 {len(chunks)} 个批量请求)")
+        
+        for chunk, future in self._iter_completed(self.run_experiment_multi, chunks):
+            # 网络错误已在run_experiment_multi中处理，其余异常直接抛出，避免静默丢失数据
+            chunk_results = future.result()
             
-            # 批次间短暂延迟
-            if i + self.request_batch_size < len(test_requests):
-                time.sleep(0.1)
+            # 逐条结果先缓冲，每个批量请求只输出一次，减少主线程上的写操作
+            log_lines = []
+            for request, result in zip(chunk, chunk_results):
+                success = result.get('success', False)
+                results.append(TestResult(request, result, success))
+                log_lines.append(f"  电源点{request.power_source} -> {len(request.test_points)}个目标点: "
+                                 f"{'成功' if success else '失败'}")
+            if log_lines:
+                print("\n".join(log_lines))
         
         return results
     
@@ -157,47 +290,73 @@ class EfficientBatchTestClient:
         """更新关系矩阵"""
         print("更新关系矩阵...")
         
-        # 获取检测到的关系矩阵
-        detected_result = self.get_relationship_matrix()
-        if detected_result.get('success'):
-            self.relationship_matrix = detected_result['data']['matrix']
-            self.total_points = detected_result['data']['total_points']
+        # 获取检测到的关系矩阵（已有本地副本时只同步变化的单元；无变化时计数与缓存保持有效）
+        if self._sync_server_matrix():
+            matrix = self._server_matrix.copy()
+            np.fill_diagonal(matrix, DIAGONAL_SENTINEL)
+            self.total_points = len(matrix)
+            if self.tested_pairs is None or self.tested_pairs.shape[0] != self.total_points:
+                self.tested_pairs = np.zeros((self.total_points, (self.total_points + 7) // 8), dtype=np.uint8)
+            
+            # 优先只应用与本地矩阵的差异，保留计数与共同邻居缓存；无法增量应用时整体重建
+            if not self._apply_matrix_changes(matrix):
+                self._reset_matrix_state(matrix)
             print(f"检测到的关系矩阵: {self.total_points}x{self.total_points}")
         
-        # 获取真实关系矩阵
-        true_result = self.get_true_relationship_matrix()
-        if true_result.get('success'):
-            self.true_relationship_matrix = true_result['data']['matrix']
-            print("真实关系矩阵已更新")
+        # 获取真实关系矩阵（测试过程中不会变化，成功获取一次后直接复用）
+        if self.true_relationship_matrix is None:
+            true_result = self.get_true_relationship_matrix()
+            if true_result.get('success'):
+                self.true_relationship_matrix = np.asarray(true_result['data']['matrix'], dtype=np.int8)
+                print("真实关系矩阵已更新")
+    
+    def _reset_matrix_state(self, matrix: np.ndarray):
+        """替换整个关系矩阵，重新统计计数并清空依赖矩阵的缓存"""
+        self.relationship_matrix = matrix
+        self._probability_matrix = None
+        self._common_neighbors = self._common_conductive = None
+        self._matrix_version += 1
+        
+        # 重新统计全局关系计数（对角线不计入）
+        self._known_count = int(np.count_nonzero(matrix)) - len(matrix)
+        self._conductive_count = int(np.count_nonzero(matrix == 1))
+        self._unknown_per_row = np.count_nonzero(matrix == 0, axis=1)
+    
+    def _apply_matrix_changes(self, matrix: np.ndarray) -> bool:
+        """将新矩阵与本地矩阵的差异按行增量应用，返回是否成功（形状不同、变化过多或矩阵不对称时返回False）"""
+        current = self.relationship_matrix
+        if current is None or current.shape != matrix.shape:
+            return False
+        
+        changed_rows = np.flatnonzero((current != matrix).any(axis=1))
+        if len(changed_rows) == 0:
+            return True  # 无变化，计数与缓存保持有效
+        if len(changed_rows) > len(matrix) * MAX_INCREMENTAL_ROW_FRACTION:
+            return False
+        
+        # 逐行对称写入；前面的行已写入的对称单元不会在后面的行中重复计入
+        for row in changed_rows.tolist():
+            targets = np.flatnonzero(current[row] != matrix[row])
+            if len(targets) > 0:
+                self._write_relations(row, targets, matrix[row, targets])
+        self._matrix_version += 1
+        
+        # 服务器矩阵不对称时按行写入的结果与其不一致，交由调用方整体重建
+        return bool(np.array_equal(current, matrix))
     
     def analyze_matrix_efficiency(self) -> Dict[str, Any]:
         """分析矩阵效率"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return {}
         
         total_cells = self.total_points * self.total_points
         diagonal_cells = self.total_points
         off_diagonal_cells = total_cells - diagonal_cells
         
-        # 统计检测到的关系
-        detected_conductive = 0
-        detected_non_conductive = 0
-        detected_unknown = 0
-        
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i == j:  # 跳过对角线
-                    continue
-                
-                detected = self.relationship_matrix[i][j]
-                
-                # 统计检测到的关系
-                if detected == 1:
-                    detected_conductive += 1
-                elif detected == -1:
-                    detected_non_conductive += 1
-                else:  # detected == 0
-                    detected_unknown += 1
+        # 直接读取增量维护的全局计数，无需扫描矩阵
+        detected_conductive = self._conductive_count
+        detected_non_conductive = self._known_count - self._conductive_count
+        detected_unknown = off_diagonal_cells - detected_conductive - detected_non_conductive
         
         # 计算效率指标
         detection_rate = (detected_conductive + detected_non_conductive) / off_diagonal_cells * 100 if off_diagonal_cells > 0 else 0
@@ -215,54 +374,47 @@ class EfficientBatchTestClient:
     
     def select_batch_points(self) -> List[int]:
         """选择批量测试的点位（智能去重版本）"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return []
         
         # 策略1: 优先选择未知关系最多的点位
         # 策略2: 避免选择与已知关系过多的点位（减少冗余测试）
-        candidate_scores = []
+        # 每行未知关系数增量维护，无需扫描矩阵；已知关系数 = (N-1) - 未知关系数
+        unknown_counts = self._unknown_per_row
         
-        for i in range(self.total_points):
-            unknown_count = 0
-            known_conductive = 0
-            known_non_conductive = 0
-            
-            for j in range(self.total_points):
-                if i != j:
-                    relation = self.relationship_matrix[i][j]
-                    if relation == 0:  # 未知关系
-                        unknown_count += 1
-                    elif relation == 1:  # 已知导通
-                        known_conductive += 1
-                    elif relation == -1:  # 已知不导通
-                        known_non_conductive += 1
-            
-            if unknown_count > 0:  # 只考虑还有未知关系的点位
-                # 评分公式：未知关系数量 * 0.8 + 避免冗余 * 0.2
-                # 已知关系越少，评分越高（减少冗余测试）
-                redundancy_penalty = (known_conductive + known_non_conductive) / (self.total_points - 1)
-                score = unknown_count * 0.8 - redundancy_penalty * 0.2
-                
-                candidate_scores.append((i, score, unknown_count, known_conductive, known_non_conductive))
-        
-        if not candidate_scores:
+        # 只考虑还有未知关系的点位
+        candidates = np.flatnonzero(unknown_counts > 0)
+        if len(candidates) == 0:
             return []
         
-        # 按评分排序，选择最优的点位
-        candidate_scores.sort(key=lambda x: x[1], reverse=True)
+        # 评分公式：未知关系数量 * 0.8 + 避免冗余 * 0.2
+        # 已知关系越少，评分越高（减少冗余测试）
+        candidate_unknown = unknown_counts[candidates]
+        redundancy_penalty = (self.total_points - 1 - candidate_unknown) / (self.total_points - 1)
+        scores = candidate_unknown * 0.8 - redundancy_penalty * 0.2
         
         # 调整批量大小为50%左右
         target_batch_size = min(50, self.total_points // 2)  # 50%覆盖率
-        selected_points = [p[0] for p in candidate_scores[:target_batch_size]]
+        
+        # 只对评分不低于第k高分的候选排序（O(N)部分选择），同分时保持点位编号顺序，
+        # 结果与全量稳定排序后取前k个一致
+        k = min(target_batch_size, len(scores))
+        top = np.arange(len(scores))
+        if k < len(scores):
+            kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+            top = np.flatnonzero(scores >= kth_score)
+        ranked = top[np.argsort(-scores[top], kind='stable')][:k]
+        selected_points = candidates[ranked].tolist()
         
         print(f"选择了 {len(selected_points)} 个点位进行批量测试（目标50%覆盖率）")
         print(f"选中的点位: {selected_points[:10]}{'...' if len(selected_points) > 10 else ''}")
         
-        # 打印选择策略信息
-        if candidate_scores:
-            best_candidate = candidate_scores[0]
-            print(f"最优候选点位: {best_candidate[0]}, 评分{best_candidate[1]:.2f}")
-            print(f"  未知关系: {best_candidate[2]}, 已知导通: {best_candidate[3]}, 已知不导通: {best_candidate[4]}")
+        # 打印选择策略信息（只对最优点位统计已知导通/不导通数量）
+        best = int(candidates[ranked[0]])
+        best_row = self.relationship_matrix[best]
+        print(f"最优候选点位: {best}, 评分{scores[ranked[0]]:.2f}")
+        print(f"  未知关系: {unknown_counts[best]}, 已知导通: {np.count_nonzero(best_row == 1)}, "
+              f"已知不导通: {np.count_nonzero(best_row == -1)}")
         
         return selected_points
     
@@ -272,32 +424,34 @@ class EfficientBatchTestClient:
             return []
         
         test_requests = []
-        tested_combinations = set()  # 记录已测试的组合，避免重复
         
         # 策略: 每个选中的点位作为电源点，测试其他所有选中的点位
+        # 选中点位之间的关系子矩阵：只保留未知关系，并只取上三角，
+        # 使每个点对只由排在前面的电源点测试一次（避免重复组合）
+        batch_array = np.asarray(batch_points, dtype=np.intp)
+        pending = np.triu(self.relationship_matrix[np.ix_(batch_array, batch_array)] == 0, k=1)
+        
+        # 之前轮次已测试、但服务器矩阵尚未反映结果的点对在本地直接跳过，不再发送请求
+        if self.tested_pairs is not None:
+            untested = ~self._tested_submatrix(batch_array)
+            skipped_tested = int(np.count_nonzero(pending & ~untested))
+            pending &= untested
+        else:
+            skipped_tested = 0
+        total_combinations = int(np.count_nonzero(pending))
+        
+        # 不同电源点的目标点组合相同时共用同一个不可变元组（后期未知关系收敛时很常见）
+        target_cache: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        
         for i, power_source in enumerate(batch_points):
-            # 选择其他点位作为测试目标
-            test_targets = [p for p in batch_points if p != power_source]
-            
-            # 过滤掉已知关系的点位和已测试的组合
-            filtered_targets = []
-            for target in test_targets:
-                # 检查是否已知关系
-                if self.relationship_matrix[power_source][target] == 0:  # 未知关系
-                    # 检查是否已经测试过这个组合
-                    combination = tuple(sorted([power_source, target]))
-                    if combination not in tested_combinations:
-                        filtered_targets.append(target)
-                        tested_combinations.add(combination)
+            filtered_targets = tuple(batch_array[pending[i]].tolist())
             
             if filtered_targets:
-                # 计算优先级（未知关系越多，优先级越高）
-                priority = len(filtered_targets)
-                
                 # 避免生成过大的批次，分批处理
                 max_targets_per_batch = 25  # 每批最多25个目标点
                 for j in range(0, len(filtered_targets), max_targets_per_batch):
                     batch_targets = filtered_targets[j:j + max_targets_per_batch]
+                    batch_targets = target_cache.setdefault(batch_targets, batch_targets)
                     
                     test_requests.append(TestRequest(
                         power_source=power_source,
@@ -310,11 +464,13 @@ class EfficientBatchTestClient:
         test_requests.sort(key=lambda x: x.batch_size, reverse=True)
         
         print(f"生成了 {len(test_requests)} 个智能去重批量测试请求")
-        print(f"避免了 {len(tested_combinations)} 个重复测试组合")
+        print(f"避免了 {total_combinations} 个重复测试组合")
+        if skipped_tested:
+            print(f"跳过了 {skipped_tested} 个已测试过的点对")
         
         return test_requests
     
-    def analyze_test_results(self, test_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_test_results(self, test_results: List[TestResult]) -> Dict[str, Any]:
         """分析测试结果"""
         print("分析测试结果...")
         
@@ -324,11 +480,12 @@ class EfficientBatchTestClient:
         total_non_conductive_relations = 0
         
         for result in test_results:
-            if result['success']:
+            if result.success:
                 successful_tests += 1
+                self._mark_tested(result.request.power_source, result.request.test_points)
                 
                 # 分析测试结果
-                test_result = result['result'].get('data', {}).get('test_result', {})
+                test_result = result.result.get('data', {}).get('test_result', {})
                 if test_result:
                     connections = test_result.get('connections', [])
                     if connections:
@@ -345,15 +502,17 @@ class EfficientBatchTestClient:
                                     # 如果是数字或字符串，认为是有效连接
                                     valid_connections += 1
                             total_connections_found += valid_connections
-                            print(f"  发现导通关系: {valid_connections}个")
-                        else:
+                            if self.verbose:
+                                print(f"  发现导通关系: {valid_connections}个")
+                        elif self.verbose:
                             print(f"  发现导通关系: 0个")
                     else:
                         # 计算不导通关系数量
-                        request = result['request']
+                        request = result.request
                         non_conductive_count = len(request.test_points)
                         total_non_conductive_relations += non_conductive_count
-                        print(f"  电源点{request.power_source}与{non_conductive_count}个目标点不导通")
+                        if self.verbose:
+                            print(f"  电源点{request.power_source}与{non_conductive_count}个目标点不导通")
             else:
                 failed_tests += 1
         
@@ -370,16 +529,15 @@ class EfficientBatchTestClient:
             'total_non_conductive_relations': total_non_conductive_relations
         }
     
-    def run_efficient_batch_testing(self, max_rounds: int = 3):
-        """运行高效批量测试流程"""
-        print("=== 开始高效批量测试流程 ===")
-        print(f"批量大小: {self.batch_size}")
-        print(f"并发请求数: {self.max_concurrent_requests}")
-        print(f"请求批次大小: {self.request_batch_size}")
-        print(f"目标: 通过批量测试快速填充关系矩阵")
-        
-        for round_num in range(1, max_rounds + 1):
-            print(f"\n--- 第 {round_num} 轮高效批量测试 ---")
+    def _batch_rounds(self, title: str, stop_fn, adjust_fn=None, max_rounds: Optional[int] = None):
+        """多轮大规模批量测试的通用驱动（生成器）
+        
+        每轮更新关系矩阵并分析效率，stop_fn(efficiency)返回True时结束；否则先调用adjust_fn(efficiency)
+        调整参数，再选点、规划、执行并分析批量测试，产出(轮次, 分析结果)。轮次间延迟和其他终止条件由调用方决定。
+        """
+        rounds = range(1, max_rounds + 1) if max_rounds is not None else itertools.count(1)
+        for round_num in rounds:
+            print(f"\n--- 第 {round_num} 轮{title} ---")
             
             # 更新关系矩阵
             self.update_matrices()
@@ -391,11 +549,12 @@ class EfficientBatchTestClient:
                 print(f"已知关系: {efficiency['detected']['conductive'] + efficiency['detected']['non_conductive']}")
                 print(f"未知关系: {efficiency['detected']['unknown']}")
             
-            # 检查是否已完成大部分测试
-            if efficiency and efficiency['detected']['rate'] > 95:
-                print("检测率已超过95%，测试基本完成")
+            if stop_fn(efficiency):
                 break
             
+            if adjust_fn is not None:
+                adjust_fn(efficiency)
+            
             # 选择批量测试点位
             batch_points = self.select_batch_points()
             if not batch_points:
@@ -423,6 +582,24 @@ class EfficientBatchTestClient:
             # 更新统计信息
             self.total_tests += analysis['successful_tests']
             
+            yield round_num, analysis
+    
+    def run_efficient_batch_testing(self, max_rounds: int = 3):
+        """运行高效批量测试流程"""
+        print("=== 开始高效批量测试流程 ===")
+        print(f"批量大小: {self.batch_size}")
+        print(f"并发请求数: {self.max_concurrent_requests}")
+        print(f"请求批次大小: {self.request_batch_size}")
+        print(f"目标: 通过批量测试快速填充关系矩阵")
+        
+        def reached_target(efficiency: Dict[str, Any]) -> bool:
+            # 检查是否已完成大部分测试
+            if efficiency and efficiency['detected']['rate'] > 95:
+                print("检测率已超过95%，测试基本完成")
+                return True
+            return False
+        
+        for round_num, _ in self._batch_rounds("高效批量测试", reached_target, max_rounds=max_rounds):
             # 轮次间延迟
             if round_num < max_rounds:
                 print(f"等待 {2} 秒后开始下一轮...")
@@ -432,73 +609,35 @@ class EfficientBatchTestClient:
         print("\n=== 高效批量测试完成 ===")
         self.print_final_statistics()
     
+    def _adjust_batch_size(self, efficiency: Dict[str, Any]):
+        """根据当前检测率调整批量大小"""
+        current_rate = efficiency['detected']['rate']
+        if current_rate < 50:
+            self.batch_size = min(50, self.batch_size + 10)  # 最大限制在50
+            print(f"检测率较低，增加批量大小到 {self.batch_size}")
+        elif current_rate < 80:
+            self.batch_size = max(25, self.batch_size - 5)   # 适度减少批量大小
+            print(f"检测率中等，调整批量大小到 {self.batch_size}")
+        else:
+            self.batch_size = max(20, self.batch_size - 10)  # 大幅减少批量大小
+            print(f"检测率较高，减少批量大小到 {self.batch_size}")
+    
     def run_adaptive_batch_testing(self, target_detection_rate: float = 95.0):
         """运行自适应批量测试流程"""
         print("=== 开始自适应批量测试流程 ===")
         print(f"目标检测率: {target_detection_rate}%")
         
-        round_num = 0
-        while True:
-            round_num += 1
-            print(f"\n--- 第 {round_num} 轮自适应批量测试 ---")
-            
-            # 更新关系矩阵
-            self.update_matrices()
-            
-            # 分析当前效率
-            efficiency = self.analyze_matrix_efficiency()
+        def reached_target(efficiency: Dict[str, Any]) -> bool:
             if not efficiency:
                 print("无法获取矩阵效率信息，退出")
-                break
-            
-            current_rate = efficiency['detected']['rate']
-            print(f"当前检测率: {current_rate:.1f}%")
-            print(f"已知关系: {efficiency['detected']['conductive'] + efficiency['detected']['non_conductive']}")
-            print(f"未知关系: {efficiency['detected']['unknown']}")
-            
+                return True
             # 检查是否达到目标
-            if current_rate >= target_detection_rate:
+            if efficiency['detected']['rate'] >= target_detection_rate:
                 print(f"已达到目标检测率 {target_detection_rate}%，测试完成")
-                break
-            
-            # 根据当前检测率调整批量大小
-            if current_rate < 50:
-                self.batch_size = min(50, self.batch_size + 10)  # 最大限制在50
-                print(f"检测率较低，增加批量大小到 {self.batch_size}")
-            elif current_rate < 80:
-                self.batch_size = max(25, self.batch_size - 5)   # 适度减少批量大小
-                print(f"检测率中等，调整批量大小到 {self.batch_size}")
-            else:
-                self.batch_size = max(20, self.batch_size - 10)  # 大幅减少批量大小
-                print(f"检测率较高，减少批量大小到 {self.batch_size}")
-            
-            # 选择批量测试点位
-            batch_points = self.select_batch_points()
-            if not batch_points:
-                print("没有更多点位可进行批量测试")
-                break
-            
-            # 规划大规模批量测试
-            test_requests = self.plan_massive_batch_tests(batch_points)
-            if not test_requests:
-                print("没有更多测试请求")
-                break
-            
-            print(f"本轮将执行 {len(test_requests)} 个大规模批量测试")
-            
-            # 批量执行测试
-            start_time = time.time()
-            test_results = self.run_experiment_batch(test_requests)
-            end_time = time.time()
-            
-            print(f"批量测试完成，耗时: {end_time - start_time:.2f}秒")
-            
-            # 分析测试结果
-            analysis = self.analyze_test_results(test_results)
-            
-            # 更新统计信息
-            self.total_tests += analysis['successful_tests']
-            
+                return True
+            return False
+        
+        for _, analysis in self._batch_rounds("自适应批量测试", reached_target, self._adjust_batch_size):
             # 检查是否有进展
             if analysis['successful_tests'] == 0:
                 print("本轮没有成功执行的测试，可能已达到极限")
@@ -575,6 +714,7 @@ class EfficientBatchTestClient:
         
         round_num = 0
         phase = "block"  # 当前阶段：block(分块) 或 binary(二分法)
+        block_phase_rates = []  # 分块阶段各轮开始时的检测率，用于在线估计切换阈值
         
         while True:
             round_num += 1
@@ -599,11 +739,13 @@ class EfficientBatchTestClient:
                 print(f"已达到目标检测率 {target_detection_rate}%，测试完成")
                 break
             
-            # 阶段切换逻辑
-            if phase == "block" and current_rate >= 70.0:
-                # 当检测率达到70%时，切换到二分法策略
+            # 阶段切换逻辑：分块阶段满最小持续轮数后按检查间隔判断，分块策略预计剩余增益不足时切换
+            if phase == "block":
+                block_phase_rates.append(current_rate)
+            if phase == "block" and should_switch_to_binary(block_phase_rates):
+                # 分块策略收益见顶时，切换到二分法策略
                 phase = "binary"
-                print(f"检测率达到70%，切换到二分法策略进行精细化处理")
+                print(f"检测率达到{current_rate:.1f}%，切换到二分法策略进行精细化处理")
                 print("策略说明：")
                 print("  - 分块策略已完成大部分关系的快速确认")
                 print("  - 二分法策略将针对剩余未知关系进行精确测试")
@@ -639,7 +781,7 @@ class EfficientBatchTestClient:
         print("\n=== 混合策略测试完成 ===")
         self.print_final_statistics()
     
-    def run_block_strategy_phase(self) -> List[Dict[str, Any]]:
+    def run_block_strategy_phase(self) -> List[TestResult]:
         """执行分块策略阶段测试（优化版本：所有点位轮询作为通电点位）"""
         print("分块策略：使用大规模批量测试快速确认关系")
         print("优化策略：所有点位轮询作为通电点位，优化继电器切换")
@@ -651,8 +793,8 @@ class EfficientBatchTestClient:
             return []
         
         # 优化：确保所有点位都有机会作为通电点位
-        all_points = list(range(self.total_points))
-        power_source_candidates = [p for p in all_points if self.has_unknown_relations(p)]
+        # 每行未知关系数增量维护，一次向量比较即可得到全部仍有未知关系的点位
+        power_source_candidates = np.flatnonzero(self._unknown_per_row > 0).tolist()
         
         if not power_source_candidates:
             print("所有点位都没有未知关系，分块策略完成")
@@ -687,13 +829,10 @@ class EfficientBatchTestClient:
     
     def has_unknown_relations(self, point: int) -> bool:
         """检查点位是否还有未知关系"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return False
         
-        for j in range(self.total_points):
-            if j != point and self.relationship_matrix[point][j] == 0:
-                return True
-        return False
+        return bool(self._unknown_per_row[point] > 0)
     
     def plan_optimized_block_tests(self, batch_points: List[int], power_source_candidates: List[int]) -> List[TestRequest]:
         """规划优化的分块测试（所有点位轮询作为通电点位）"""
@@ -707,21 +846,22 @@ class EfficientBatchTestClient:
         # 策略2: 优化继电器切换顺序，减少切换次数
         power_source_scores = []
         
-        for power_source in power_source_candidates:
-            unknown_count = 0
-            potential_targets = []
+        # 计算每个点位作为通电点位时的未知关系：先对(电源点×目标点)子矩阵整体求未知掩码与每行计数，
+        # 再只为有未知关系的电源点按批次顺序取出目标点，不再逐个目标点在Python中判断
+        targets_array = np.asarray(batch_points, dtype=np.intp)
+        rows_per_chunk = max(1, BLOCK_FILTER_CHUNK_CELLS // len(targets_array))
+        for start in range(0, len(power_source_candidates), rows_per_chunk):
+            sources = np.asarray(power_source_candidates[start:start + rows_per_chunk], dtype=np.intp)
+            unknown_mask = self.relationship_matrix[np.ix_(sources, targets_array)] == 0  # 未知关系
+            unknown_mask &= targets_array[None, :] != sources[:, None]
+            unknown_counts = np.count_nonzero(unknown_mask, axis=1)
             
-            # 计算该点位作为通电点位时的未知关系数量
-            for target in batch_points:
-                if target != power_source:
-                    if self.relationship_matrix[power_source][target] == 0:  # 未知关系
-                        unknown_count += 1
-                        potential_targets.append(target)
-            
-            if unknown_count > 0:
+            for row in np.flatnonzero(unknown_counts).tolist():
+                unknown_count = int(unknown_counts[row])
+                potential_targets = targets_array[unknown_mask[row]].tolist()
                 # 评分：未知关系数量 + 继电器切换优化
                 score = unknown_count * 10 + len(potential_targets) * 2
-                power_source_scores.append((power_source, score, unknown_count, potential_targets))
+                power_source_scores.append((int(sources[row]), score, unknown_count, potential_targets))
         
         # 按评分排序，优先选择高分点位作为通电点位
         power_source_scores.sort(key=lambda x: x[1], reverse=True)
@@ -731,20 +871,19 @@ class EfficientBatchTestClient:
             print(f"  {i+1}. 点位{power_source}: 评分{score}, 未知关系{unknown_count}个")
         
         # 为每个通电点位生成测试请求
+        # 集合的add预先绑定为局部名，点对键内联比较构造，避免每个目标都新建列表再排序
+        mark_tested_combination = tested_combinations.add
         for power_source, score, unknown_count, potential_targets in power_source_scores:
             if not potential_targets:
                 continue
             
-            # 过滤掉已知关系的点位和已测试的组合
+            # 过滤掉已测试的组合（候选目标在上面已按未知关系筛选，且不含电源点自身）
             filtered_targets = []
             for target in potential_targets:
-                # 检查是否已知关系
-                if self.relationship_matrix[power_source][target] == 0:  # 未知关系
-                    # 检查是否已经测试过这个组合
-                    combination = tuple(sorted([power_source, target]))
-                    if combination not in tested_combinations:
-                        filtered_targets.append(target)
-                        tested_combinations.add(combination)
+                combination = (power_source, target) if power_source < target else (target, power_source)
+                if combination not in tested_combinations:
+                    filtered_targets.append(target)
+                    mark_tested_combination(combination)
             
             if filtered_targets:
                 # 避免生成过大的批次，分批处理
@@ -788,65 +927,132 @@ class EfficientBatchTestClient:
     
     def select_optimal_binary_source(self) -> Optional[int]:
         """选择最优的电源点进行二分法测试"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return None
         
         # 策略：选择未知关系最多且可能导通关系最多的点位作为电源点
-        candidate_scores = []
-        
-        for i in range(self.total_points):
-            unknown_count = 0
-            potential_conductive = 0
-            
-            for j in range(self.total_points):
-                if i != j:
-                    if self.relationship_matrix[i][j] == 0:  # 未知关系
-                        unknown_count += 1
-                        # 基于已知信息估算导通概率
-                        if self.estimate_conductivity_probability(i, j) > 0.5:
-                            potential_conductive += 1
-            
-            if unknown_count > 0:  # 只考虑还有未知关系的点位
-                # 评分公式：未知关系数量 * 0.7 + 潜在导通关系数量 * 0.3
-                score = unknown_count * 0.7 + potential_conductive * 0.3
-                candidate_scores.append((i, score, unknown_count, potential_conductive))
+        unknown_counts = self._unknown_per_row
         
-        if not candidate_scores:
+        # 只考虑还有未知关系的点位
+        has_unknown = unknown_counts > 0
+        if not has_unknown.any():
             return None
         
-        # 按评分排序，选择最优的
-        candidate_scores.sort(key=lambda x: x[1], reverse=True)
-        best_candidate = candidate_scores[0]
-        
-        print(f"最优电源点候选: 点位{best_candidate[0]}, 评分{best_candidate[1]:.2f}")
-        print(f"  未知关系: {best_candidate[2]}, 潜在导通: {best_candidate[3]}")
+        # 完全孤立的点位（除自身外全部未知）没有共同已知邻居，潜在导通数为0，评分恒为0.7*(N-1)；
+        # 其余点位评分不超过其未知关系数，若都低于该值则孤立点位必然最优，无需计算概率矩阵
+        isolated = unknown_counts == self.total_points - 1
+        if isolated.any():
+            isolated_score = 0.7 * (self.total_points - 1)
+            if np.max(unknown_counts[~isolated], initial=0) < isolated_score:
+                best = int(np.argmax(isolated))
+                print(f"最优电源点候选: 点位{best}, 评分{isolated_score:.2f}")
+                print(f"  未知关系: {unknown_counts[best]}, 潜在导通: 0")
+                return best
+        
+        # 基于已知信息估算导通概率
+        unknown = (self.relationship_matrix == 0)  # 未知关系
+        probability = self._compute_probability_matrix()
+        potential_conductive = (unknown & (probability > 0.5)).sum(axis=1)
+        
+        # 评分公式：未知关系数量 * 0.7 + 潜在导通关系数量 * 0.3
+        scores = np.where(has_unknown, unknown_counts * 0.7 + potential_conductive * 0.3, -np.inf)
+        best = int(np.argmax(scores))  # O(N)，无需对全部候选排序
+        
+        print(f"最优电源点候选: 点位{best}, 评分{scores[best]:.2f}")
+        print(f"  未知关系: {unknown_counts[best]}, 潜在导通: {potential_conductive[best]}")
+        
+        if self.verbose:
+            # 前k个候选只做部分排序
+            k = min(5, int(np.count_nonzero(has_unknown)))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            print(f"  前{k}个候选: {', '.join(f'点位{i}({scores[i]:.2f})' for i in top.tolist())}")
+        
+        return best
+    
+    def _compute_probability_matrix(self) -> np.ndarray:
+        """批量计算所有点对的导通概率（与estimate_conductivity_probability逐对计算结果一致）"""
+        if self._probability_matrix is not None:
+            return self._probability_matrix
+        
+        if self._common_neighbors is None:
+            # 已知/导通关系指示矩阵，对角线置零以排除点位自身
+            known = (self.relationship_matrix != 0).astype(np.float32)
+            conductive = (self.relationship_matrix == 1).astype(np.float32)
+            np.fill_diagonal(known, 0)  # 哨兵值非零，需显式清除
+            
+            # 两次矩阵乘法得到所有点对的共同已知邻居数和共同导通邻居数（计数为整数，以int32存储）
+            self._common_neighbors = (known @ known.T).astype(np.int32)
+            self._common_conductive = (conductive @ conductive.T).astype(np.int32)
+        
+        common = self._common_neighbors
+        common_conductive = self._common_conductive
+        
+        # 综合概率：局部模式 * 0.7 + 全局密度 * 0.3，限制在[0.1, 0.9]范围内；无共同邻居时取默认概率0.5
+        # 全局项对所有点对相同，只计算一次；其余运算原地进行，避免中间数组
+        global_term = self.get_global_conductivity_density() * GLOBAL_DENSITY_WEIGHT
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probability = common_conductive / common
+        probability *= LOCAL_PATTERN_WEIGHT
+        probability += global_term
+        np.clip(probability, MIN_PROBABILITY, MAX_PROBABILITY, out=probability)
+        probability[common == 0] = DEFAULT_PROBABILITY
+        self._probability_matrix = probability
+        
+        return self._probability_matrix
+    
+    def _refresh_common_neighbors(self, power_source: int, old_row: np.ndarray):
+        """电源点所在行/列更新后增量修正共同邻居计数，避免重新做矩阵乘法"""
+        self._probability_matrix = None
+        if self._common_neighbors is None:
+            return
         
-        return best_candidate[0]
+        new_row = self.relationship_matrix[power_source]
+        for counts, indicator in ((self._common_neighbors, lambda m: m != 0),
+                                  (self._common_conductive, lambda m: m == 1)):
+            old_col = indicator(old_row).astype(np.int32)
+            new_col = indicator(new_row).astype(np.int32)
+            old_col[power_source] = new_col[power_source] = 0
+            
+            # 以power_source作为共同邻居的贡献发生变化（秩1修正）：
+            # n·nᵀ - o·oᵀ = d·nᵀ + o·dᵀ，d只在本次更新的点位上非零，只需修改这些点位所在的行/列
+            delta = new_col - old_col
+            changed = np.flatnonzero(delta)
+            if len(changed) > 0:
+                counts[changed] += np.outer(delta[changed], new_col)
+                counts[:, changed] += np.outer(old_col, delta[changed])
+            
+            # power_source自身所在的行/列直接重算：矩阵对称，只需累加其邻居所在的行
+            neighbors = np.flatnonzero(new_col)
+            neighbor_rows = indicator(self.relationship_matrix[neighbors])
+            neighbor_rows[np.arange(len(neighbors)), neighbors] = False  # 排除对角线
+            counts[power_source] = np.count_nonzero(neighbor_rows, axis=0)
+            counts[:, power_source] = counts[power_source]
     
     def estimate_conductivity_probability(self, point1: int, point2: int) -> float:
         """估算两个点位之间的导通概率"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return 0.5
         
+        return self._cached_probability(self._matrix_version, point1, point2)
+    
+    def _estimate_conductivity_probability(self, matrix_version: int, point1: int, point2: int) -> float:
+        """估算导通概率的实际计算（matrix_version仅作为缓存键）"""
         # 基于已知的导通关系模式估算
         # 如果两个点位都与某个共同点位导通，则它们导通的概率较高
         
-        common_conductive_neighbors = 0
-        total_common_neighbors = 0
+        row1, row2 = self.relationship_matrix[point1], self.relationship_matrix[point2]
         
-        for k in range(self.total_points):
-            if k != point1 and k != point2:
-                # 检查k是否与point1和point2都有已知关系
-                if (self.relationship_matrix[point1][k] != 0 and 
-                    self.relationship_matrix[point2][k] != 0):
-                    total_common_neighbors += 1
-                    # 如果都与k导通，增加导通概率
-                    if (self.relationship_matrix[point1][k] == 1 and 
-                        self.relationship_matrix[point2][k] == 1):
-                        common_conductive_neighbors += 1
+        # 检查k是否与point1和point2都有已知关系（排除两个点位自身）
+        common_mask = (row1 != 0) & (row2 != 0)
+        common_mask[point1] = common_mask[point2] = False
+        total_common_neighbors = int(np.count_nonzero(common_mask))
         
         if total_common_neighbors == 0:
-            return 0.5  # 默认概率
+            return DEFAULT_PROBABILITY  # 默认概率
+        
+        # 如果都与k导通，增加导通概率
+        common_conductive_neighbors = int(np.count_nonzero((row1 == 1) & (row2 == 1) & common_mask))
         
         # 基于共同导通邻居的比例估算
         conductivity_ratio = common_conductive_neighbors / total_common_neighbors
@@ -855,168 +1061,172 @@ class EfficientBatchTestClient:
         global_conductivity = self.get_global_conductivity_density()
         
         # 综合概率：局部模式 * 0.7 + 全局密度 * 0.3
-        final_probability = conductivity_ratio * 0.7 + global_conductivity * 0.3
+        final_probability = conductivity_ratio * LOCAL_PATTERN_WEIGHT + global_conductivity * GLOBAL_DENSITY_WEIGHT
         
-        return max(0.1, min(0.9, final_probability))  # 限制在[0.1, 0.9]范围内
+        return max(MIN_PROBABILITY, min(MAX_PROBABILITY, final_probability))  # 限制在[0.1, 0.9]范围内
     
     def get_global_conductivity_density(self) -> float:
         """获取全局导通密度"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return 0.5
         
-        total_known = 0
-        total_conductive = 0
-        
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i != j and self.relationship_matrix[i][j] != 0:
-                    total_known += 1
-                    if self.relationship_matrix[i][j] == 1:
-                        total_conductive += 1
-        
-        if total_known == 0:
+        # 计数在update_matrices中初始化，并随update_relationship_from_test增量更新
+        if self._known_count == 0:
             return 0.5
         
-        return total_conductive / total_known
+        return self._conductive_count / self._known_count
+    
+    def _track_relation_change(self, power_source: int, targets: np.ndarray, old: np.ndarray, new: np.ndarray):
+        """增量维护全局关系计数（对称关系占两个矩阵单元）和每行未知关系数（targets须互不重复）"""
+        self._known_count += 2 * (int(np.count_nonzero(new)) - int(np.count_nonzero(old)))
+        self._conductive_count += 2 * (int(np.count_nonzero(new == 1)) - int(np.count_nonzero(old == 1)))
+        
+        # 目标点所在行各变化±1，电源点所在行累计全部变化
+        unknown_delta = (new == 0).astype(np.intp) - (old == 0)
+        self._unknown_per_row[targets] += unknown_delta
+        self._unknown_per_row[power_source] += int(unknown_delta.sum())
+    
+    def _write_relations(self, power_source: int, targets: np.ndarray, values: np.ndarray):
+        """对称写入电源点与一组互不重复的目标点之间的关系，并增量维护计数与共同邻居计数"""
+        old_row = self.relationship_matrix[power_source].copy()
+        self._track_relation_change(power_source, targets, old_row[targets], values)
+        self.relationship_matrix[power_source, targets] = values
+        self.relationship_matrix[targets, power_source] = values  # 对称关系
+        self._refresh_common_neighbors(power_source, old_row)
     
     def run_binary_search_test(self, power_source: int) -> List[Dict[str, Any]]:
         """对指定电源点执行二分法测试"""
         print(f"开始对电源点 {power_source} 执行二分法测试...")
         
         # 获取所有未知关系的目标点
-        unknown_targets = []
-        for j in range(self.total_points):
-            if j != power_source and self.relationship_matrix[power_source][j] == 0:
-                unknown_targets.append(j)
+        unknown_targets = np.flatnonzero(self.relationship_matrix[power_source] == 0)
         
-        if not unknown_targets:
+        if len(unknown_targets) == 0:
             print(f"电源点 {power_source} 没有未知关系的目标点")
             return []
         
         print(f"找到 {len(unknown_targets)} 个未知关系的目标点")
         
-        # 按导通概率排序目标点，优先测试高概率点位
-        unknown_targets.sort(key=lambda x: self.estimate_conductivity_probability(power_source, x), reverse=True)
+        # 按导通概率排序目标点，优先测试高概率点位（稳定排序，与原有顺序一致）；
+        # 孤立电源点的概率行恒为0.5，排序不改变顺序，跳过概率矩阵计算
+        if len(unknown_targets) < self.total_points - 1:
+            probability_row = self._compute_probability_matrix()[power_source]
+            unknown_targets = unknown_targets[np.argsort(-probability_row[unknown_targets], kind='stable')]
         
         # 分批测试，每批大小适中以提高效率（调整为50%策略）
         batch_size = min(25, len(unknown_targets) // 2)  # 每批最多25个，或未知关系的一半
         if batch_size < 10:  # 确保最小批次大小
             batch_size = min(10, len(unknown_targets))
-        test_results = []
-        
-        for i in range(0, len(unknown_targets), batch_size):
-            batch_targets = unknown_targets[i:i + batch_size]
-            print(f"测试批次 {i//batch_size + 1}: 电源点{power_source} -> {len(batch_targets)}个目标点")
-            
-            # 执行测试
-            result = self.run_experiment(power_source, batch_targets)
+        # 按固定大小切片（最后一批可能不足batch_size），转为列表以便序列化
+        batches = [unknown_targets[i:i + batch_size].tolist() for i in range(0, len(unknown_targets), batch_size)]
+        test_results: List[Optional[Dict[str, Any]]] = [None] * len(batches)
+        
+        # 所有批次共用同一电源点，并发发送不会引入额外的继电器切换；
+        # 关系矩阵只在主线程中按完成顺序更新，无需额外加锁
+        if self.verbose:
+            for index, batch_targets in enumerate(batches):
+                print(f"测试批次 {index + 1}: 电源点{power_source} -> {len(batch_targets)}个目标点")
+        
+        for index, future in self._iter_completed(lambda i: self.run_experiment(power_source, batches[i]),
+                                                  range(len(batches))):
+            batch_targets = batches[index]
+            result = future.result()
             if result.get('success'):
-                test_results.append({
+                # 分析结果，更新关系矩阵
+                num_detected = self.update_relationship_from_test(power_source, batch_targets, result)
+                print(f"批次 {index + 1}: 电源点{power_source} 导通+{num_detected}, 不导通+{len(batch_targets) - num_detected}")
+                
+                test_results[index] = {
                     'power_source': power_source,
                     'targets': batch_targets,
                     'result': result,
-                    'success': True
-                })
-                
-                # 分析结果，更新关系矩阵
-                self.update_relationship_from_test(power_source, batch_targets, result)
+                    'success': True,
+                    'num_detected': num_detected,  # 本批次确认导通的目标点数
+                    'num_targets': len(batch_targets)
+                }
             else:
                 print(f"批次测试失败: {result.get('error', '未知错误')}")
-                test_results.append({
+                test_results[index] = {
                     'power_source': power_source,
                     'targets': batch_targets,
                     'result': result,
                     'success': False
-                })
+                }
         
         return test_results
     
-    def update_relationship_from_test(self, power_source: int, targets: List[int], test_result: Dict):
-        """从测试结果更新关系矩阵"""
+    def update_relationship_from_test(self, power_source: int, targets: List[int], test_result: Dict) -> int:
+        """从测试结果更新关系矩阵，返回本次确认导通的目标点数"""
         if not test_result.get('success'):
-            return
+            return 0
         
         test_data = test_result.get('data', {}).get('test_result', {})
         if not test_data:
-            return
+            return 0
         
         # 获取检测到的导通关系
         detected_connections = test_data.get('connections', [])
         
-        # 处理不同类型的connections数据
+        # 一次性提取点位ID并构建不可变集合以便快速查找（非列表数据视为无导通）
         if isinstance(detected_connections, list):
-            # 如果是列表，提取点位ID
-            detected_points = []
-            for conn in detected_connections:
-                if isinstance(conn, dict):
-                    # 如果是字典，尝试提取point_id或id字段
-                    point_id = conn.get('point_id') or conn.get('id')
-                    if point_id is not None:
-                        detected_points.append(point_id)
-                elif isinstance(conn, (int, str)):
-                    # 如果是数字或字符串，直接转换
-                    try:
-                        detected_points.append(int(conn))
-                    except (ValueError, TypeError):
-                        continue
+            detected_set = frozenset(
+                int(point_id)
+                for point_id in map(self._connection_point_id, detected_connections)
+                if point_id is not None
+            )
         else:
-            detected_points = []
-        
-        # 转换为集合以便快速查找
-        detected_set = set(detected_points)
-        
-        # 更新关系矩阵
-        for target in targets:
-            if target in detected_set:
-                # 导通关系
-                self.relationship_matrix[power_source][target] = 1
-                self.relationship_matrix[target][power_source] = 1  # 对称关系
-                print(f"  确认: 点位{power_source} <-> 点位{target} 导通")
-            else:
-                # 不导通关系
-                self.relationship_matrix[power_source][target] = -1
-                self.relationship_matrix[target][power_source] = -1  # 对称关系
-                print(f"  确认: 点位{power_source} <-> 点位{target} 不导通")
+            detected_set = frozenset()
+        
+        # 更新关系矩阵：检测到的目标点导通(1)，其余不导通(-1)，对称写入
+        target_array = np.unique(np.asarray(targets, dtype=np.intp))
+        is_detected = np.fromiter((t in detected_set for t in target_array.tolist()), dtype=bool, count=len(target_array))
+        values = np.where(is_detected, np.int8(1), np.int8(-1))
+        
+        self._write_relations(power_source, target_array, values)
+        self._mark_tested(power_source, target_array)
+        
+        if self.verbose:
+            for target, value in zip(target_array.tolist(), values.tolist()):
+                print(f"  确认: 点位{power_source} <-> 点位{target} {'导通' if value == 1 else '不导通'}")
+        
+        self._matrix_version += 1
+        
+        return int(np.count_nonzero(is_detected))
+    
+    def _mark_tested(self, power_source: int, targets):
+        """在已测试点对位图中对称标记电源点与目标点"""
+        if self.tested_pairs is None:
+            return
+        targets = np.asarray(targets, dtype=np.intp)
+        # 电源点所在行：多个目标可能落在同一字节，用ufunc.at保证逐个累积置位
+        np.bitwise_or.at(self.tested_pairs[power_source], targets >> 3, (1 << (targets & 7)).astype(np.uint8))
+        self.tested_pairs[targets, power_source >> 3] |= np.uint8(1 << (power_source & 7))
+    
+    def _tested_submatrix(self, points: np.ndarray) -> np.ndarray:
+        """解包指定点位所在行，返回这些点位之间的已测试布尔子矩阵"""
+        rows = np.unpackbits(self.tested_pairs[points], axis=1, count=self.total_points, bitorder='little')
+        return rows[:, points].astype(bool)
+    
+    @staticmethod
+    def _connection_point_id(conn: Any) -> Optional[Any]:
+        """从connections元素中提取点位ID：字典取point_id或id字段，数字或数字字符串直接返回，其余返回None"""
+        if isinstance(conn, dict):
+            point_id = conn.get('point_id')
+            return point_id if point_id is not None else conn.get('id')
+        if isinstance(conn, int) or (isinstance(conn, str) and conn.strip().lstrip('-').isdigit()):
+            return conn
+        return None
     
     def analyze_binary_test_results(self, test_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """分析二分法测试结果"""
         print("分析二分法测试结果...")
         
-        successful_tests = 0
-        failed_tests = 0
-        conductive_found = 0
-        non_conductive_confirmed = 0
-        
-        for result in test_results:
-            if result['success']:
-                successful_tests += 1
-                
-                # 统计导通和不导通的关系
-                test_data = result['result'].get('data', {}).get('test_result', {})
-                if test_data:
-                    connections = test_data.get('connections', [])
-                    
-                    # 处理不同类型的connections数据
-                    if isinstance(connections, list):
-                        # 如果是列表，计算有效连接数
-                        valid_connections = 0
-                        for conn in connections:
-                            if isinstance(conn, dict):
-                                # 如果是字典，检查是否有有效数据
-                                if conn.get('point_id') is not None or conn.get('id') is not None:
-                                    valid_connections += 1
-                            elif isinstance(conn, (int, str)):
-                                # 如果是数字或字符串，认为是有效连接
-                                valid_connections += 1
-                        conductive_found += valid_connections
-                    else:
-                        conductive_found += 0
-                    
-                    # 计算不导通关系数量
-                    total_targets = len(result['targets'])
-                    non_conductive_confirmed += (total_targets - conductive_found)
-            else:
-                failed_tests += 1
+        # 每个批次的导通数量在run_binary_search_test写入时已统计，这里只做汇总
+        successful = [result for result in test_results if result['success']]
+        successful_tests = len(successful)
+        failed_tests = len(test_results) - successful_tests
+        conductive_found = sum(result['num_detected'] for result in successful)
+        non_conductive_confirmed = sum(result['num_targets'] - result['num_detected'] for result in successful)
         
         print(f"二分法测试结果分析:")
         print(f"  成功测试: {successful_tests}")
@@ -1033,25 +1243,15 @@ class EfficientBatchTestClient:
     
     def analyze_test_redundancy(self) -> Dict[str, Any]:
         """分析测试冗余度"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return {}
         
         total_off_diagonal = self.total_points * (self.total_points - 1)
-        known_relations = 0
-        unknown_relations = 0
-        redundant_potential = 0
-        
-        for i in range(self.total_points):
-            for j in range(self.total_points):
-                if i != j:
-                    if self.relationship_matrix[i][j] != 0:
-                        known_relations += 1
-                        # 检查是否可能产生冗余测试
-                        if self.relationship_matrix[i][j] == 1:  # 导通关系
-                            # 如果两个点都导通，它们之间的测试可能是冗余的
-                            redundant_potential += 1
-                    else:
-                        unknown_relations += 1
+        # 直接读取增量维护的全局计数，无需扫描矩阵
+        known_relations = self._known_count
+        unknown_relations = total_off_diagonal - known_relations
+        # 导通关系：如果两个点都导通，它们之间的测试可能是冗余的
+        redundant_potential = self._conductive_count
         
         redundancy_rate = redundant_potential / total_off_diagonal * 100 if total_off_diagonal > 0 else 0
         efficiency_rate = known_relations / total_off_diagonal * 100 if total_off_diagonal > 0 else 0
@@ -1096,10 +1296,22 @@ class EfficientBatchTestClient:
     def print_final_statistics(self):
         """打印最终统计信息"""
         print(f"总测试次数: {self.total_tests}")
-        print(f"已测试点对: {len(self.tested_pairs)}")
+        if self.tested_pairs is not None:
+            tested_pair_count = int(_POPCOUNT8[self.tested_pairs].sum()) // 2
+            total_pairs = self.total_points * (self.total_points - 1) // 2
+            coverage = tested_pair_count / total_pairs * 100 if total_pairs > 0 else 0
+            print(f"已测试点对: {tested_pair_count} (覆盖率 {coverage:.1f}%)")
+        else:
+            print("已测试点对: 0")
         print(f"确认导通: {len(self.confirmed_conductive)}")
         print(f"确认不导通: {len(self.confirmed_non_conductive)}")
         
+        # 继电器统计与系统信息互不依赖，并发请求以重叠网络往返
+        relay_future = self._executor.submit(self.get_relay_stats) if self.relay_optimization_enabled else None
+        system_future = self._executor.submit(self.get_system_info)
+        relay_stats = relay_future.result() if relay_future is not None else None
+        system_info = system_future.result()
+        
         # 继电器操作统计
         if self.relay_optimization_enabled:
             print(f"继电器切换次数: {self.relay_switch_count}")
@@ -1108,11 +1320,10 @@ class EfficientBatchTestClient:
                 print(f"平均每次测试继电器切换: {avg_switches_per_test:.2f}次")
             
             # 添加继电器优化统计
-            self.print_relay_optimization_stats()
+            self.print_relay_optimization_stats(relay_stats)
         
         # 系统信息统计
         print("\n=== 系统状态统计 ===")
-        system_info = self.get_system_info()
         if system_info.get('success'):
             data = system_info['data']
             print(f"总点位: {data['total_points']}")
@@ -1128,7 +1339,7 @@ class EfficientBatchTestClient:
 
     def get_strategy_recommendation(self) -> Dict[str, Any]:
         """获取策略建议"""
-        if not self.relationship_matrix:
+        if self.relationship_matrix is None:
             return {}
         
         efficiency = self.analyze_matrix_efficiency()
@@ -1218,22 +1429,15 @@ class EfficientBatchTestClient:
         
         print("优化继电器切换顺序...")
         
-        # 按通电点位分组
-        power_source_groups = {}
+        # 单次遍历按通电点位分组，同时累计每个通电点位的总目标数
+        power_source_groups = defaultdict(list)
+        power_source_totals = Counter()
         for request in test_requests:
-            power_source = request.power_source
-            if power_source not in power_source_groups:
-                power_source_groups[power_source] = []
-            power_source_groups[power_source].append(request)
-        
-        # 计算每个通电点位的总目标数
-        power_source_totals = {}
-        for power_source, requests in power_source_groups.items():
-            total_targets = sum(len(req.test_points) for req in requests)
-            power_source_totals[power_source] = total_targets
+            power_source_groups[request.power_source].append(request)
+            power_source_totals[request.power_source] += len(request.test_points)
         
         # 按总目标数排序，优先选择目标数多的通电点位
-        sorted_power_sources = sorted(power_source_totals.items(), key=lambda x: x[1], reverse=True)
+        sorted_power_sources = power_source_totals.most_common()
         
         print(f"通电点位优化排序（按目标数）:")
         for i, (power_source, total_targets) in enumerate(sorted_power_sources[:5]):
@@ -1242,37 +1446,34 @@ class EfficientBatchTestClient:
         # 重新组织测试请求，相同通电点位的请求连续执行
         optimized_requests = []
         for power_source, _ in sorted_power_sources:
-            if power_source in power_source_groups:
-                optimized_requests.extend(power_source_groups[power_source])
+            optimized_requests.extend(power_source_groups[power_source])
         
-        # 计算继电器切换次数
-        switch_count = 0
-        last_power_source = None
-        for request in optimized_requests:
-            if last_power_source is not None and request.power_source != last_power_source:
-                switch_count += 1
-            last_power_source = request.power_source
+        original_switch_count = self._count_switches(test_requests)
+        
+        # 优化后相同通电点位的请求连续执行，切换次数即为分组数减一
+        switch_count = len(power_source_groups) - 1
         
         print(f"继电器切换优化完成:")
-        print(f"  原始顺序切换次数: {len(set(req.power_source for req in test_requests))}")
+        print(f"  原始顺序切换次数: {original_switch_count}")
         print(f"  优化后切换次数: {switch_count}")
-        print(f"  减少切换次数: {len(set(req.power_source for req in test_requests)) - switch_count}")
+        print(f"  减少切换次数: {original_switch_count - switch_count}")
         
         return optimized_requests
     
+    @staticmethod
+    def _count_switches(test_requests: List[TestRequest]) -> int:
+        """按执行顺序统计相邻请求间通电点位的切换次数"""
+        power_sources = np.fromiter((request.power_source for request in test_requests),
+                                    dtype=np.int32, count=len(test_requests))
+        return int(np.count_nonzero(np.diff(power_sources)))
+    
     def track_relay_operations(self, test_requests: List[TestRequest]):
         """跟踪继电器操作"""
         if not test_requests:
             return
         
         # 计算继电器切换次数
-        switch_count = 0
-        last_power_source = None
-        
-        for request in test_requests:
-            if last_power_source is not None and request.power_source != last_power_source:
-                switch_count += 1
-            last_power_source = request.power_source
+        switch_count = self._count_switches(test_requests)
         
         self.relay_switch_count += switch_count
         print(f"继电器操作统计:")
@@ -1289,7 +1490,7 @@ class EfficientBatchTestClient:
             response = self.session.get(f"{self.base_url}/api/relay/stats")
             if response.status_code == 200:
                 return response.json()
-        except Exception as e:
+        except requests.RequestException as e:
             print(f"获取继电器统计信息失败: {e}")
         return {}
     
@@ -1299,13 +1500,14 @@ class EfficientBatchTestClient:
             response = self.session.post(f"{self.base_url}/api/relay/reset")
             if response.status_code == 200:
                 return response.json()
-        except Exception as e:
+        except requests.RequestException as e:
             print(f"重置继电器状态失败: {e}")
         return {}
     
-    def print_relay_optimization_stats(self):
-        """打印继电器优化统计信息"""
-        relay_stats = self.get_relay_stats()
+    def print_relay_optimization_stats(self, relay_stats: Optional[Dict[str, Any]] = None):
+        """打印继电器优化统计信息（可传入已获取的统计结果，避免重复请求）"""
+        if relay_stats is None:
+            relay_stats = self.get_relay_stats()
         if not relay_stats.get('success'):
             print("无法获取继电器统计信息")
             return
@@ -1347,36 +1549,36 @@ class EfficientBatchTestClient:
             print(f"点位关系确认率: {confirmed_rate:.1f}%")
 
 def main():
-    """主函数"""
-    client = EfficientBatchTestClient()
-    
-    # 运行高效批量测试
-    print("选择测试模式:")
-    print("1. 固定批量大小测试")
-    print("2. 自适应批量大小测试")
-    print("3. 二分法智能测试")
-    print("4. 混合策略测试")
-    
-    choice = input("请输入选择 (1, 2, 3 或 4): ").strip()
-    
-    if choice == "1":
-        # 固定批量大小测试
-        client.run_efficient_batch_testing(max_rounds=3)
-    elif choice == "2":
-        # 自适应批量大小测试
-        target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
-        client.run_adaptive_batch_testing(target_detection_rate=target_rate)
-    elif choice == "3":
-        # 二分法智能测试
-        target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
-        client.run_binary_search_testing(target_detection_rate=target_rate)
-    elif choice == "4":
-        # 混合策略测试
-        target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
-        client.run_hybrid_strategy_testing(target_detection_rate=target_rate)
-    else:
-        print("无效选择，使用默认模式")
-        client.run_efficient_batch_testing(max_rounds=3)
+    """主函数（客户端参数取自efficient_config中的配置字典）"""
+    with EfficientBatchTestClient(config=ClientConfig.from_settings()) as client:
+        
+        # 运行高效批量测试
+        print("选择测试模式:")
+        print("1. 固定批量大小测试")
+        print("2. 自适应批量大小测试")
+        print("3. 二分法智能测试")
+        print("4. 混合策略测试")
+        
+        choice = input("请输入选择 (1, 2, 3 或 4): ").strip()
+        
+        if choice == "1":
+            # 固定批量大小测试
+            client.run_efficient_batch_testing(max_rounds=3)
+        elif choice == "2":
+            # 自适应批量大小测试
+            target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
+            client.run_adaptive_batch_testing(target_detection_rate=target_rate)
+        elif choice == "3":
+            # 二分法智能测试
+            target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
+            client.run_binary_search_testing(target_detection_rate=target_rate)
+        elif choice == "4":
+            # 混合策略测试
+            target_rate = float(input("请输入目标检测率 (默认95.0): ") or "95.0")
+            client.run_hybrid_strategy_testing(target_detection_rate=target_rate)
+        else:
+            print("无效选择，使用默认模式")
+            client.run_efficient_batch_testing(max_rounds=3)
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,9 @@
 高效批量测试客户端配置文件
 """
 
+from dataclasses import dataclass
+from typing import Tuple
+
 # 服务器配置
 SERVER_CONFIG = {
     'base_url': 'http://localhost:5000',
@@ -88,7 +91,7 @@ PERFORMANCE_MONITORING = {
 NETWORK_OPTIMIZATION = {
     'connection_pooling': True,      # 启用连接池
     'keep_alive': True,              # 启用保持连接
-    'request_compression': False,    # 请求压缩（如果服务器支持）
+    'request_compression': True,     # 响应压缩（Accept-Encoding: gzip，服务器对大体积JSON压缩返回）
     'batch_request_optimization': True,  # 批量请求优化
     'network_retry_strategy': {
         'max_retries': 3,
@@ -156,6 +159,34 @@ RELAY_OPTIMIZATION = {
     'efficiency_tracking': True,      # 效率跟踪
 }
 
+@dataclass(frozen=True)
+class ClientConfig:
+    """高效批量测试客户端的启动配置（不可变），默认值与客户端内置默认值一致"""
+    batch_size: int = 50               # 默认批量大小
+    min_batch_size: int = 20           # 最小批量大小
+    max_batch_size: int = 80           # 最大批量大小
+    max_concurrent_requests: int = 10  # 最大并发请求数
+    request_batch_size: int = 20       # 每个批量请求合并的实验数量
+    max_retries: int = 3               # 服务器临时错误时的最大重试次数
+    retry_backoff_factor: float = 0.3  # 指数退避系数（第n次重试前等待 factor * 2^(n-1) 秒）
+    retry_status_codes: Tuple[int, ...] = (500, 502, 503, 504)  # 触发重试的状态码
+    
+    @classmethod
+    def from_settings(cls) -> 'ClientConfig':
+        """按本文件当前的配置字典（含已应用的预设）生成客户端配置"""
+        retry_strategy = NETWORK_OPTIMIZATION['network_retry_strategy']
+        return cls(
+            batch_size=BATCH_TESTING['default_batch_size'],
+            min_batch_size=BATCH_TESTING['min_batch_size'],
+            max_batch_size=BATCH_TESTING['max_batch_size'],
+            max_concurrent_requests=CONCURRENCY['max_concurrent_requests'],
+            request_batch_size=CONCURRENCY['request_batch_size'],
+            max_retries=retry_strategy['max_retries'],
+            # urllib3按指数退避重试，首次重试前等待的正是backoff_factor，retry_delay即对应该系数
+            retry_backoff_factor=float(retry_strategy['retry_delay']),
+            retry_status_codes=tuple(retry_strategy['retry_on_status_codes']),
+        )
+
 # 配置验证
 def validate_config():
     """验证配置的有效性"""
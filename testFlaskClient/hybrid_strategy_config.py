@@ -3,53 +3,105 @@
 """
 混合策略测试配置文件
 结合分块策略和二分法策略的智能测试配置
+
+核心、阶段切换、分块阶段和二分法阶段配置为不可变对象，按属性读取；
+应用预设时以dataclasses.replace生成新对象并重新绑定模块级名称，
+其他模块应通过get_*()访问函数读取当前配置，避免持有过期引用。
 """
 
+import math
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from config_common import (CONFIG_LOCK, StrategyName, build_preset_arrays, freeze_presets,
+                           load_preset, nearest_preset, save_preset)
+
+# 公开接口；load_preset/save_preset从config_common再导出，供调用方从配置模块直接导入
+__all__ = ['StrategyName', 'HybridStrategyCore', 'HYBRID_STRATEGY_CORE', 'PhaseSwitchConfig',
+           'PHASE_SWITCH_CONFIG', 'BlockPhaseConfig', 'BLOCK_PHASE_CONFIG', 'BinaryPhaseConfig',
+           'BINARY_PHASE_CONFIG', 'get_hybrid_strategy_core', 'get_phase_switch_config',
+           'get_block_phase_config', 'get_binary_phase_config', 'PERFORMANCE_MONITORING',
+           'ADAPTIVE_CONFIG', 'RELAY_OPTIMIZATION_CONFIG', 'get_derived',
+           'validate_hybrid_strategy_config', 'best_preset',
+           'apply_hybrid_strategy_preset', 'ADAPTIVE_FORCED_SWITCH_RATE',
+           'estimate_remaining_block_gain', 'should_switch_to_binary',
+           'print_hybrid_strategy_config_summary', 'get_strategy_execution_advice', 'load_preset',
+           'save_preset']
+
 # 混合策略核心配置
-HYBRID_STRATEGY_CORE = {
-    'enabled': True,
-    'strategy_name': 'hybrid_block_binary',
-    'description': '混合策略测试 - 分块策略快速确认 + 二分法策略精细化处理',
-    'auto_phase_switch': True,  # 自动阶段切换
-}
+@dataclass(frozen=True, slots=True)
+class HybridStrategyCore:
+    enabled: bool = True
+    strategy_name: StrategyName = StrategyName.HYBRID_BLOCK_BINARY
+    description: str = '混合策略测试 - 分块策略快速确认 + 二分法策略精细化处理'
+    auto_phase_switch: bool = True  # 自动阶段切换
+
+HYBRID_STRATEGY_CORE = HybridStrategyCore()
 
 # 阶段切换配置
-PHASE_SWITCH_CONFIG = {
-    'block_to_binary_threshold': 70.0,  # 分块策略切换到二分法策略的阈值
-    'binary_to_block_threshold': 60.0,  # 二分法策略切换回分块策略的阈值（如果效率下降）
-    'phase_switch_check_interval': 2,   # 阶段切换检查间隔（轮数）
-    'min_phase_duration': 3,            # 最小阶段持续时间（轮数）
-}
+@dataclass(frozen=True, slots=True)
+class PhaseSwitchConfig:
+    block_to_binary_threshold: float = 70.0  # 分块策略切换到二分法策略的阈值
+    binary_to_block_threshold: float = 60.0  # 二分法策略切换回分块策略的阈值（如果效率下降）
+    phase_switch_check_interval: int = 2     # 阶段切换检查间隔（轮数），满足最小持续时间后每隔该轮数判断一次
+    min_phase_duration: int = 3              # 最小阶段持续时间（轮数），之前只在达到强制切换检测率时切换
+    adaptive_threshold: bool = True          # 根据分块阶段的检测率曲线在线判断切换时机
+    threshold_smoothing_alpha: float = 0.2   # 增益衰减比的指数平滑系数
+    min_block_remaining_gain: float = 5.0    # 分块策略外推的剩余可得增益（百分点）低于此值时切换
+
+PHASE_SWITCH_CONFIG = PhaseSwitchConfig()
 
 # 分块策略阶段配置
-BLOCK_PHASE_CONFIG = {
-    'enabled': True,
-    'target_coverage': 50.0,            # 目标覆盖率50%
-    'max_batch_size': 50,               # 最大批量大小50
-    'min_batch_size': 20,               # 最小批量大小20
-    'default_batch_size': 40,           # 默认批量大小40
-    'max_targets_per_batch': 25,        # 每批最大目标数25
-    'smart_deduplication': True,        # 智能去重
-    'avoid_known_relations': True,      # 避免已知关系
-    'power_source_rotation': True,      # 电源点轮换
-    'batch_optimization': True,         # 批量优化
-    'relay_optimization': True,         # 继电器切换优化
-    'power_source_prioritization': True, # 通电点位优先级排序
-    'min_power_source_coverage': 80.0,  # 最小通电点位覆盖率80%
-}
+@dataclass(frozen=True, slots=True)
+class BlockPhaseConfig:
+    enabled: bool = True
+    target_coverage: float = 50.0            # 目标覆盖率50%
+    max_batch_size: int = 50                 # 最大批量大小50
+    min_batch_size: int = 20                 # 最小批量大小20
+    default_batch_size: int = 40             # 默认批量大小40
+    max_targets_per_batch: int = 25          # 每批最大目标数25
+    smart_deduplication: bool = True         # 智能去重
+    avoid_known_relations: bool = True       # 避免已知关系
+    power_source_rotation: bool = True       # 电源点轮换
+    batch_optimization: bool = True          # 批量优化
+    relay_optimization: bool = True          # 继电器切换优化
+    power_source_prioritization: bool = True # 通电点位优先级排序
+    min_power_source_coverage: float = 80.0  # 最小通电点位覆盖率80%
+
+BLOCK_PHASE_CONFIG = BlockPhaseConfig()
 
 # 二分法策略阶段配置
-BINARY_PHASE_CONFIG = {
-    'enabled': True,
-    'batch_size': 20,                   # 二分法测试批次大小
-    'probability_threshold': 0.5,       # 导通概率阈值
-    'neighbor_weight': 0.7,             # 邻居关系权重
-    'global_density_weight': 0.3,       # 全局密度权重
-    'max_iterations_per_source': 5,     # 每个电源点最大迭代次数
-    'adaptive_batch_sizing': True,      # 自适应批次大小
-    'priority_based_selection': True,   # 基于优先级选择
-    'convergence_optimization': True,   # 收敛优化
-}
+@dataclass(frozen=True, slots=True)
+class BinaryPhaseConfig:
+    enabled: bool = True
+    batch_size: int = 20                     # 二分法测试批次大小
+    probability_threshold: float = 0.5       # 导通概率阈值
+    neighbor_weight: float = 0.7             # 邻居关系权重
+    global_density_weight: float = 0.3       # 全局密度权重
+    max_iterations_per_source: int = 5       # 每个电源点最大迭代次数
+    adaptive_batch_sizing: bool = True       # 自适应批次大小
+    priority_based_selection: bool = True    # 基于优先级选择
+    convergence_optimization: bool = True    # 收敛优化
+
+BINARY_PHASE_CONFIG = BinaryPhaseConfig()
+
+def get_hybrid_strategy_core() -> HybridStrategyCore:
+    """获取当前混合策略核心配置"""
+    return HYBRID_STRATEGY_CORE
+
+def get_phase_switch_config() -> PhaseSwitchConfig:
+    """获取当前阶段切换配置"""
+    return PHASE_SWITCH_CONFIG
+
+def get_block_phase_config() -> BlockPhaseConfig:
+    """获取当前分块策略阶段配置"""
+    return BLOCK_PHASE_CONFIG
+
+def get_binary_phase_config() -> BinaryPhaseConfig:
+    """获取当前二分法策略阶段配置"""
+    return BINARY_PHASE_CONFIG
 
 # 性能监控配置
 PERFORMANCE_MONITORING = {
@@ -90,27 +142,57 @@ RELAY_OPTIMIZATION_CONFIG = {
     }
 }
 
+# 派生阈值（百分比与0-1比例之间的换算），模块加载和应用预设后统一计算
+_DERIVED: Dict[str, Any] = {}
+
+def _compute_derived():
+    """按当前配置重新计算派生阈值"""
+    _DERIVED['block_target_coverage_ratio'] = BLOCK_PHASE_CONFIG.target_coverage / 100.0
+    _DERIVED['power_source_min_ratio'] = BLOCK_PHASE_CONFIG.min_power_source_coverage / 100.0
+    _DERIVED['switch_reduction_pct'] = RELAY_OPTIMIZATION_CONFIG['switch_reduction_target'] * 100.0
+
+def get_derived(key: str) -> Any:
+    """获取派生阈值"""
+    return _DERIVED[key]
+
+_compute_derived()
+
+# 已通过验证的配置组合缓存，键为参与验证的配置值；配置未变化时重复验证直接返回
+_VALIDATION_CACHE: Dict[Tuple, bool] = {}
+
 # 配置验证函数
 def validate_hybrid_strategy_config():
-    """验证混合策略配置的有效性"""
+    """验证混合策略配置的有效性（同一组配置只完整验证一次）"""
+    key = (PHASE_SWITCH_CONFIG, BLOCK_PHASE_CONFIG, BINARY_PHASE_CONFIG,
+           RELAY_OPTIMIZATION_CONFIG['switch_reduction_target'])
+    if key in _VALIDATION_CACHE:
+        return _VALIDATION_CACHE[key]
+    
     print("验证混合策略配置...")
     
     # 验证阶段切换配置
-    if PHASE_SWITCH_CONFIG['block_to_binary_threshold'] <= PHASE_SWITCH_CONFIG['binary_to_block_threshold']:
+    if PHASE_SWITCH_CONFIG.block_to_binary_threshold <= PHASE_SWITCH_CONFIG.binary_to_block_threshold:
         raise ValueError("分块到二分法切换阈值必须大于二分法到分块切换阈值")
     
-    if PHASE_SWITCH_CONFIG['min_phase_duration'] <= 0:
+    if PHASE_SWITCH_CONFIG.min_phase_duration <= 0:
         raise ValueError("最小阶段持续时间必须大于0")
     
+    if PHASE_SWITCH_CONFIG.phase_switch_check_interval <= 0:
+        raise ValueError("阶段切换检查间隔必须大于0")
+    
+    if PHASE_SWITCH_CONFIG.adaptive_threshold and PHASE_SWITCH_CONFIG.min_block_remaining_gain <= 0:
+        raise ValueError("分块策略剩余增益切换阈值必须大于0")
+    
     # 验证分块策略配置
-    if BLOCK_PHASE_CONFIG['min_batch_size'] > BLOCK_PHASE_CONFIG['max_batch_size']:
+    if BLOCK_PHASE_CONFIG.min_batch_size > BLOCK_PHASE_CONFIG.max_batch_size:
         raise ValueError("分块策略最小批量大小不能大于最大批量大小")
     
-    if BLOCK_PHASE_CONFIG['default_batch_size'] < BLOCK_PHASE_CONFIG['min_batch_size']:
+    if BLOCK_PHASE_CONFIG.default_batch_size < BLOCK_PHASE_CONFIG.min_batch_size:
         raise ValueError("分块策略默认批量大小不能小于最小批量大小")
     
     # 验证二分法策略配置
-    if BINARY_PHASE_CONFIG['neighbor_weight'] + BINARY_PHASE_CONFIG['global_density_weight'] != 1.0:
+    weight_sum = BINARY_PHASE_CONFIG.neighbor_weight + BINARY_PHASE_CONFIG.global_density_weight
+    if not math.isclose(weight_sum, 1.0, abs_tol=1e-9):
         raise ValueError("二分法策略权重之和必须等于1.0")
     
     # 验证继电器优化配置
@@ -118,100 +200,191 @@ def validate_hybrid_strategy_config():
         raise ValueError("继电器切换减少目标必须在0-1之间")
     
     print("混合策略配置验证通过")
+    _VALIDATION_CACHE[key] = True
     return True
 
-# 配置预设
-HYBRID_STRATEGY_PRESETS = {
-    'balanced_hybrid': {
-        'description': '平衡混合配置 - 平衡分块和二分法策略',
-        'block_coverage': 50.0,
-        'binary_batch_size': 20,
-        'switch_threshold': 70.0,
-        'max_concurrent_requests': 15,
-    },
-    'efficient_hybrid': {
-        'description': '高效混合配置 - 优先效率',
-        'block_coverage': 45.0,
-        'binary_batch_size': 25,
-        'switch_threshold': 65.0,
-        'max_concurrent_requests': 20,
-    },
-    'precise_hybrid': {
-        'description': '精确混合配置 - 优先精度',
-        'block_coverage': 55.0,
-        'binary_batch_size': 15,
-        'switch_threshold': 75.0,
-        'max_concurrent_requests': 10,
-    }
-}
+# 配置预设（只读，首次使用时构建）
+@lru_cache(maxsize=1)
+def _presets():
+    """混合策略预设配置"""
+    return freeze_presets({
+        'balanced_hybrid': {
+            'description': '平衡混合配置 - 平衡分块和二分法策略',
+            'block_coverage': 50.0,
+            'binary_batch_size': 20,
+            'switch_threshold': 70.0,
+            'max_concurrent_requests': 15,
+        },
+        'efficient_hybrid': {
+            'description': '高效混合配置 - 优先效率',
+            'block_coverage': 45.0,
+            'binary_batch_size': 25,
+            'switch_threshold': 65.0,
+            'max_concurrent_requests': 20,
+        },
+        'precise_hybrid': {
+            'description': '精确混合配置 - 优先精度',
+            'block_coverage': 55.0,
+            'binary_batch_size': 15,
+            'switch_threshold': 75.0,
+            'max_concurrent_requests': 10,
+        }
+    })
+
+def __getattr__(name: str):
+    # 兼容旧的模块级名称：预设映射改为首次访问时构建
+    if name == 'HYBRID_STRATEGY_PRESETS':
+        return _presets()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@lru_cache(maxsize=1)
+def _preset_arrays():
+    return build_preset_arrays(_presets(), ('block_coverage', 'binary_batch_size', 'max_concurrent_requests'))
+
+def best_preset(target_coverage: float, target_batch: float, target_concurrency: float,
+                weights: Tuple[float, float, float] = (1.0, 0.1, 0.5)) -> str:
+    """返回与目标(覆盖率, 批次大小, 并发数)最接近的混合策略预设名称"""
+    return nearest_preset(_preset_arrays(), target_coverage, target_batch, target_concurrency, weights)
 
 def apply_hybrid_strategy_preset(preset_name: str):
-    """应用混合策略预设配置"""
-    if preset_name not in HYBRID_STRATEGY_PRESETS:
+    """应用混合策略预设配置（应用后立即验证，验证失败时恢复原配置并抛出ValueError）"""
+    global BLOCK_PHASE_CONFIG, BINARY_PHASE_CONFIG, PHASE_SWITCH_CONFIG
+    
+    if preset_name not in _presets():
         print(f"未知的混合策略预设配置: {preset_name}")
         return False
     
-    preset = HYBRID_STRATEGY_PRESETS[preset_name]
+    preset = _presets()[preset_name]
     print(f"应用混合策略预设配置: {preset['description']}")
     
-    # 应用配置
-    BLOCK_PHASE_CONFIG['target_coverage'] = preset['block_coverage']
-    BINARY_PHASE_CONFIG['batch_size'] = preset['binary_batch_size']
-    PHASE_SWITCH_CONFIG['block_to_binary_threshold'] = preset['switch_threshold']
+    with CONFIG_LOCK:
+        # 配置对象不可变，保留原对象即可在验证失败时整体回滚
+        snapshot = (BLOCK_PHASE_CONFIG, BINARY_PHASE_CONFIG, PHASE_SWITCH_CONFIG)
+        
+        # 应用配置：每个配置对象各自一次性替换
+        BLOCK_PHASE_CONFIG = replace(BLOCK_PHASE_CONFIG, target_coverage=preset['block_coverage'])
+        BINARY_PHASE_CONFIG = replace(BINARY_PHASE_CONFIG, batch_size=preset['binary_batch_size'])
+        PHASE_SWITCH_CONFIG = replace(PHASE_SWITCH_CONFIG, block_to_binary_threshold=preset['switch_threshold'])
+        
+        # 配置已变化，之前的验证结果作废
+        _VALIDATION_CACHE.clear()
+        try:
+            validate_hybrid_strategy_config()
+        except ValueError:
+            BLOCK_PHASE_CONFIG, BINARY_PHASE_CONFIG, PHASE_SWITCH_CONFIG = snapshot
+            print("混合策略预设配置验证失败，已恢复原配置")
+            raise
+        _compute_derived()
     
     print("混合策略预设配置应用完成")
     return True
 
+# 自适应切换时检测率达到此值必定切换，不受最小阶段持续时间和检查间隔限制
+ADAPTIVE_FORCED_SWITCH_RATE = 85.0
+
+def estimate_remaining_block_gain(block_phase_rates: Sequence[float], alpha: float) -> Optional[float]:
+    """由分块阶段各轮检测率外推分块策略还能得到的检测率增益（百分点）
+    
+    每轮增益近似按固定比例q衰减：用指数平滑估计q，最近一轮增益为g时剩余增益为 g·q/(1-q)。
+    最近一轮没有增益时返回0；此前没有正增益、无法估计衰减比时返回None。
+    """
+    gains = [cur - prev for prev, cur in zip(block_phase_rates, block_phase_rates[1:])]
+    if not gains:
+        return None
+    if gains[-1] <= 0:
+        return 0.0
+    
+    decay = None
+    for prev_gain, gain in zip(gains, gains[1:]):
+        if prev_gain <= 0:
+            continue
+        ratio = min(max(gain / prev_gain, 0.0), 0.95)
+        decay = ratio if decay is None else alpha * ratio + (1 - alpha) * decay
+    if decay is None:
+        return None
+    return gains[-1] * decay / (1 - decay)
+
+def should_switch_to_binary(block_phase_rates: Sequence[float], config: Optional[PhaseSwitchConfig] = None) -> bool:
+    """根据分块阶段各轮开始时的检测率（最后一项为当前检测率）判断是否切换到二分法策略
+    
+    分块阶段已完成的轮数不足min_phase_duration时不切换，之后每隔phase_switch_check_interval轮判断一次。
+    未启用自适应或无法估计衰减时按静态阈值block_to_binary_threshold判断；否则只要分块策略的
+    剩余增益低于min_block_remaining_gain就切换，与当前检测率高低无关（曲线在低检测率处走平也会切换）。
+    自适应模式下检测率达到ADAPTIVE_FORCED_SWITCH_RATE时立即切换。只读取配置，不修改模块级配置对象。
+    """
+    if config is None:
+        config = PHASE_SWITCH_CONFIG
+    current_rate = block_phase_rates[-1]
+    if config.adaptive_threshold and current_rate >= ADAPTIVE_FORCED_SWITCH_RATE:
+        return True
+    
+    completed_rounds = len(block_phase_rates) - 1
+    if completed_rounds < config.min_phase_duration:
+        return False
+    if (completed_rounds - config.min_phase_duration) % config.phase_switch_check_interval:
+        return False
+    
+    if not config.adaptive_threshold:
+        return current_rate >= config.block_to_binary_threshold
+    
+    remaining = estimate_remaining_block_gain(block_phase_rates, config.threshold_smoothing_alpha)
+    if remaining is None:
+        return current_rate >= config.block_to_binary_threshold
+    return remaining < config.min_block_remaining_gain
+
 # 配置信息打印
 def print_hybrid_strategy_config_summary():
-    """打印混合策略配置摘要"""
-    print("\n=== 混合策略测试配置摘要 ===")
-    print(f"策略: {HYBRID_STRATEGY_CORE['strategy_name']}")
-    print(f"描述: {HYBRID_STRATEGY_CORE['description']}")
-    print(f"自动阶段切换: {'启用' if HYBRID_STRATEGY_CORE['auto_phase_switch'] else '禁用'}")
-    print(f"阶段切换阈值: {PHASE_SWITCH_CONFIG['block_to_binary_threshold']}%")
-    print(f"分块策略覆盖率: {BLOCK_PHASE_CONFIG['target_coverage']}%")
-    print(f"二分法批次大小: {BINARY_PHASE_CONFIG['batch_size']}")
-    print(f"智能去重: {'启用' if BLOCK_PHASE_CONFIG['smart_deduplication'] else '禁用'}")
-    print(f"自适应配置: {'启用' if ADAPTIVE_CONFIG['enabled'] else '禁用'}")
-    print(f"继电器优化: {'启用' if RELAY_OPTIMIZATION_CONFIG['enabled'] else '禁用'}")
-    print(f"通电点位轮询: {'启用' if BLOCK_PHASE_CONFIG['power_source_rotation'] else '禁用'}")
-    print(f"切换减少目标: {RELAY_OPTIMIZATION_CONFIG['switch_reduction_target']*100:.0f}%")
-
-# 策略执行建议
+    """打印混合策略配置摘要（整体拼接后一次输出）"""
+    lines = [
+        "\n=== 混合策略测试配置摘要 ===",
+        f"策略: {HYBRID_STRATEGY_CORE.strategy_name}",
+        f"描述: {HYBRID_STRATEGY_CORE.description}",
+        f"自动阶段切换: {'启用' if HYBRID_STRATEGY_CORE.auto_phase_switch else '禁用'}",
+        f"阶段切换阈值: {PHASE_SWITCH_CONFIG.block_to_binary_threshold}%",
+        f"分块策略覆盖率: {BLOCK_PHASE_CONFIG.target_coverage}%",
+        f"二分法批次大小: {BINARY_PHASE_CONFIG.batch_size}",
+        f"智能去重: {'启用' if BLOCK_PHASE_CONFIG.smart_deduplication else '禁用'}",
+        f"自适应配置: {'启用' if ADAPTIVE_CONFIG['enabled'] else '禁用'}",
+        f"继电器优化: {'启用' if RELAY_OPTIMIZATION_CONFIG['enabled'] else '禁用'}",
+        f"通电点位轮询: {'启用' if BLOCK_PHASE_CONFIG.power_source_rotation else '禁用'}",
+        f"切换减少目标: {_DERIVED['switch_reduction_pct']:.0f}%",
+    ]
+    print("\n".join(lines))
+
+# 策略执行建议（静态只读数据，首次调用时构建一次）
+@lru_cache(maxsize=1)
 def get_strategy_execution_advice():
-    """获取策略执行建议"""
-    advice = {
+    """获取策略执行建议（只读映射）"""
+    return MappingProxyType({
         'phase_1_block': {
             'description': '第一阶段：分块策略快速确认（优化版）',
             'target': '检测率达到70%',
             'strategy': '使用50%覆盖率策略，所有点位轮询作为通电点位，智能去重，优化继电器切换',
             'expected_duration': '3-5轮',
-            'key_metrics': ['检测率', '批量效率', '去重效果', '继电器切换次数', '通电点位覆盖率']
+            'key_metrics': ('检测率', '批量效率', '去重效果', '继电器切换次数', '通电点位覆盖率')
         },
         'phase_2_binary': {
             'description': '第二阶段：二分法策略精细化处理',
             'target': '检测率达到95%+',
             'strategy': '基于概率估算，优先测试高概率点位，小批次精确测试',
             'expected_duration': '5-8轮',
-            'key_metrics': ['检测率', '测试精度', '收敛速度']
+            'key_metrics': ('检测率', '测试精度', '收敛速度')
         },
         'phase_switch': {
             'description': '阶段切换策略',
             'target': '检测率达到70%时自动切换',
             'strategy': '如果二分法效率下降，可切换回分块策略',
             'expected_duration': '实时切换',
-            'key_metrics': ['切换时机', '策略效果', '优化建议']
+            'key_metrics': ('切换时机', '策略效果', '优化建议')
         },
         'relay_optimization': {
             'description': '继电器切换优化策略',
             'target': '减少30%继电器切换次数',
             'strategy': '通电点位分组执行，优先级排序，批量合并优化',
             'expected_duration': '持续优化',
-            'key_metrics': ['切换次数', '切换效率', '优化效果']
+            'key_metrics': ('切换次数', '切换效率', '优化效果')
         }
-    }
-    return advice
+    })
 
 if __name__ == "__main__":
     # 验证配置
@@ -221,14 +394,15 @@ if __name__ == "__main__":
     print_hybrid_strategy_config_summary()
     
     # 显示可用预设
-    print(f"\n可用混合策略预设配置: {list(HYBRID_STRATEGY_PRESETS.keys())}")
+    print(f"\n可用混合策略预设配置: {list(_presets().keys())}")
     
     # 显示策略执行建议
     advice = get_strategy_execution_advice()
-    print("\n=== 策略执行建议 ===")
+    lines = ["\n=== 策略执行建议 ==="]
     for phase, details in advice.items():
-        print(f"\n{details['description']}:")
-        print(f"  目标: {details['target']}")
-        print(f"  策略: {details['strategy']}")
-        print(f"  预期时长: {details['expected_duration']}")
-        print(f"  关键指标: {', '.join(details['key_metrics'])}")
+        lines.append(f"\n{details['description']}:")
+        lines.append(f"  目标: {details['target']}")
+        lines.append(f"  策略: {details['strategy']}")
+        lines.append(f"  预期时长: {details['expected_duration']}")
+        lines.append(f"  关键指标: {', '.join(details['key_metrics'])}")
+    print("\n".join(lines))
@@ -3,26 +3,56 @@
 """
 50%批量测试策略配置文件
 专门针对减少冗余、提高效率的优化配置
+
+核心策略、智能去重和网络并发配置为不可变对象，按属性读取；
+应用预设时以dataclasses.replace生成新对象并重新绑定模块级名称，
+其他模块应通过get_*()访问函数读取当前配置。
 """
 
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from config_common import (CONFIG_LOCK, StrategyName, build_preset_arrays, freeze_presets,
+                           load_preset, nearest_preset, save_preset)
+
+# 公开接口；load_preset/save_preset从config_common再导出，供调用方从配置模块直接导入
+__all__ = ['StrategyName', 'CoreStrategy', 'CORE_STRATEGY', 'DeduplicationConfig',
+           'DEDUPLICATION_CONFIG', 'ADAPTIVE_BATCH_SIZING', 'should_change_batch_size',
+           'POINT_SELECTION_STRATEGY', 'TEST_PLANNING', 'EFFICIENCY_MONITORING',
+           'MAX_CONCURRENT_REQUESTS_LIMIT', 'NetworkAndConcurrency', 'NETWORK_AND_CONCURRENCY',
+           'get_core_strategy', 'get_deduplication_config', 'get_network_and_concurrency',
+           'tune_concurrency', 'get_executor', 'get_http_session', 'get_derived',
+           'validate_50_percent_config', 'best_preset',
+           'apply_optimized_preset', 'print_optimized_config_summary', 'load_preset',
+           'save_preset']
+
 # 核心策略配置
-CORE_STRATEGY = {
-    'strategy_name': 'optimized_50_percent',
-    'description': '50%批量测试策略 - 平衡覆盖率和效率，减少冗余测试',
-    'target_coverage': 50.0,           # 目标覆盖率50%
-    'max_batch_size': 50,              # 最大批量大小50
-    'min_batch_size': 20,              # 最小批量大小20
-    'default_batch_size': 40,          # 默认批量大小40
-}
+@dataclass(frozen=True, slots=True)
+class CoreStrategy:
+    strategy_name: StrategyName = StrategyName.OPTIMIZED_50_PERCENT
+    description: str = '50%批量测试策略 - 平衡覆盖率和效率，减少冗余测试'
+    target_coverage: float = 50.0      # 目标覆盖率50%
+    max_batch_size: int = 50           # 最大批量大小50
+    min_batch_size: int = 20           # 最小批量大小20
+    default_batch_size: int = 40       # 默认批量大小40
+
+CORE_STRATEGY = CoreStrategy()
 
 # 智能去重配置
-DEDUPLICATION_CONFIG = {
-    'enabled': True,
-    'avoid_known_relations': True,     # 避免测试已知关系
-    'track_tested_combinations': True, # 跟踪已测试组合
-    'max_targets_per_batch': 25,      # 每批最多25个目标点
-    'combination_cache_size': 1000,    # 组合缓存大小
-}
+@dataclass(frozen=True, slots=True)
+class DeduplicationConfig:
+    enabled: bool = True
+    avoid_known_relations: bool = True      # 避免测试已知关系
+    track_tested_combinations: bool = True  # 跟踪已测试组合
+    max_targets_per_batch: int = 25         # 每批最多25个目标点
+    combination_cache_size: int = 1000      # 组合缓存大小
+
+DEDUPLICATION_CONFIG = DeduplicationConfig()
 
 # 批量大小自适应配置
 ADAPTIVE_BATCH_SIZING = {
@@ -36,9 +66,27 @@ ADAPTIVE_BATCH_SIZING = {
         'medium_rate_decrease': 5,     # 中等检测率时减少数量
         'high_rate_decrease': 10,      # 高检测率时大幅减少
         'max_batch_size_limit': 50,    # 最大批量大小限制
+        'hysteresis_band': 3.0,        # 滞回带宽度（检测率百分点），检测率在阈值附近波动时不反复调整
+        'min_rounds_between_changes': 2, # 两次调整之间的最少轮数
+        'min_improvement_to_change_pct': 5.0, # 预计提升不足该百分比时不调整批量大小
     }
 }
 
+def should_change_batch_size(current_rate: float, rate_at_last_change: float,
+                             rounds_since_last_change: int,
+                             predicted_improvement_pct: Optional[float] = None) -> bool:
+    """判断本轮是否允许调整批量大小：
+    距上次调整已满最少轮数，检测率相对上次调整时的变化超出滞回带，
+    且给出预计提升百分比时该提升不低于min_improvement_to_change_pct"""
+    rules = ADAPTIVE_BATCH_SIZING['adjustment_rules']
+    if rounds_since_last_change < rules['min_rounds_between_changes']:
+        return False
+    if abs(current_rate - rate_at_last_change) <= rules['hysteresis_band']:
+        return False
+    if predicted_improvement_pct is not None:
+        return predicted_improvement_pct >= rules['min_improvement_to_change_pct']
+    return True
+
 # 点位选择策略
 POINT_SELECTION_STRATEGY = {
     'unknown_relation_weight': 0.8,    # 未知关系权重
@@ -69,96 +117,266 @@ EFFICIENCY_MONITORING = {
     }
 }
 
-# 网络和并发配置
-NETWORK_AND_CONCURRENCY = {
-    'max_concurrent_requests': 15,     # 最大并发请求数
-    'request_batch_size': 25,          # 请求批次大小
-    'thread_pool_workers': 12,         # 线程池工作线程数
-    'connection_timeout': 30,          # 连接超时时间
-    'retry_count': 3,                  # 重试次数
-}
+# 网络和并发配置：HTTP请求以I/O等待为主，并发数与线程数按CPU核数的倍数取默认值
+_CPU_COUNT = os.cpu_count() or 4
+MAX_CONCURRENT_REQUESTS_LIMIT = 64
+
+@dataclass(frozen=True, slots=True)
+class NetworkAndConcurrency:
+    max_concurrent_requests: int = min(MAX_CONCURRENT_REQUESTS_LIMIT, _CPU_COUNT * 4)  # 最大并发请求数
+    request_batch_size: int = 25       # 请求批次大小
+    thread_pool_workers: int = min(32, _CPU_COUNT * 2)  # 线程池工作线程数
+    connection_timeout: int = 30       # 连接超时时间
+    retry_count: int = 3               # 重试次数
+    auto_tune_concurrency: bool = True # 根据请求延迟在运行时微调并发数
+
+NETWORK_AND_CONCURRENCY = NetworkAndConcurrency()
+
+def get_core_strategy() -> CoreStrategy:
+    """获取当前核心策略配置"""
+    return CORE_STRATEGY
+
+def get_deduplication_config() -> DeduplicationConfig:
+    """获取当前智能去重配置"""
+    return DEDUPLICATION_CONFIG
+
+def get_network_and_concurrency() -> NetworkAndConcurrency:
+    """获取当前网络和并发配置"""
+    return NETWORK_AND_CONCURRENCY
+
+def tune_concurrency(p95_latency_ms: float, target_ms: float = 200.0) -> int:
+    """按测试端观测到的p95请求延迟微调最大并发请求数（每次±1），返回调整后的并发数
+    
+    延迟高于目标时减1以减轻服务器排队，低于目标一半时加1以提高吞吐，其余情况保持不变。
+    """
+    global NETWORK_AND_CONCURRENCY
+    
+    with CONFIG_LOCK:
+        config = NETWORK_AND_CONCURRENCY
+        if not config.auto_tune_concurrency:
+            return config.max_concurrent_requests
+        
+        concurrency = config.max_concurrent_requests
+        if p95_latency_ms > target_ms:
+            concurrency = max(1, concurrency - 1)
+        elif p95_latency_ms < target_ms / 2:
+            concurrency = min(MAX_CONCURRENT_REQUESTS_LIMIT, concurrency + 1)
+        
+        if concurrency != config.max_concurrent_requests:
+            NETWORK_AND_CONCURRENCY = replace(config, max_concurrent_requests=concurrency)
+        return concurrency
+
+# 进程内共享的测试线程池：首次使用时创建，各批次复用；配置的线程数变化时才重建
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_WORKERS = 0
+_EXECUTOR_LOCK = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取共享线程池，线程数为NETWORK_AND_CONCURRENCY.thread_pool_workers"""
+    global _EXECUTOR, _EXECUTOR_WORKERS
+    
+    workers = NETWORK_AND_CONCURRENCY.thread_pool_workers
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or _EXECUTOR_WORKERS != workers:
+            if _EXECUTOR is not None:
+                # 旧线程池中已提交的任务继续执行完毕，新任务提交到新线程池
+                _EXECUTOR.shutdown(wait=False)
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cbl-test')
+            _EXECUTOR_WORKERS = workers
+        return _EXECUTOR
+
+# 进程内共享的HTTP会话：连接池大小与重试次数取自NETWORK_AND_CONCURRENCY，
+# 所有工作线程复用keep-alive连接；并发数或重试次数变化时才重建
+_HTTP_SESSION = None
+_HTTP_SESSION_KEY: Tuple[int, int] = (0, 0)
+_HTTP_SESSION_LOCK = threading.Lock()
+
+def get_http_session():
+    """获取共享的requests.Session（请求时应传入timeout=NETWORK_AND_CONCURRENCY.connection_timeout）"""
+    global _HTTP_SESSION, _HTTP_SESSION_KEY
+    
+    config = NETWORK_AND_CONCURRENCY
+    key = (config.max_concurrent_requests, config.retry_count)
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None or _HTTP_SESSION_KEY != key:
+            # requests只在真正需要发起请求时导入，保持配置模块本身导入轻量
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            session = requests.Session()
+            session.headers.update({'Connection': 'keep-alive'})
+            retry = Retry(total=config.retry_count, backoff_factor=0.3,
+                          status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=config.max_concurrent_requests,
+                                  pool_maxsize=config.max_concurrent_requests,
+                                  max_retries=retry)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # 关闭旧会话释放其连接池中的空闲连接；其他线程上进行中的请求完成后，连接归还到已关闭的池时随即关闭
+            if _HTTP_SESSION is not None:
+                _HTTP_SESSION.close()
+            _HTTP_SESSION = session
+            _HTTP_SESSION_KEY = key
+        return _HTTP_SESSION
+
+# 派生阈值（百分比与0-1比例之间的换算），模块加载和应用预设后统一计算
+_DERIVED: Dict[str, Any] = {}
+
+def _compute_derived():
+    """按当前配置重新计算派生阈值"""
+    _DERIVED['target_coverage_ratio'] = CORE_STRATEGY.target_coverage / 100.0
+
+def get_derived(key: str) -> Any:
+    """获取派生阈值"""
+    return _DERIVED[key]
+
+_compute_derived()
+
+# 已通过验证的配置组合缓存，键为参与验证的配置值；配置未变化时重复验证直接返回
+_VALIDATION_CACHE: Dict[Tuple, bool] = {}
 
 # 配置验证函数
 def validate_50_percent_config():
-    """验证50%批量测试配置的有效性"""
+    """验证50%批量测试配置的有效性（同一组配置只完整验证一次）"""
+    key = (CORE_STRATEGY,
+           POINT_SELECTION_STRATEGY['unknown_relation_weight'],
+           POINT_SELECTION_STRATEGY['redundancy_penalty_weight'],
+           tuple(sorted(ADAPTIVE_BATCH_SIZING['adjustment_rules'].items())))
+    if key in _VALIDATION_CACHE:
+        return _VALIDATION_CACHE[key]
+    
     print("验证50%批量测试配置...")
     
     # 验证批量大小配置
-    if CORE_STRATEGY['min_batch_size'] > CORE_STRATEGY['max_batch_size']:
+    if CORE_STRATEGY.min_batch_size > CORE_STRATEGY.max_batch_size:
         raise ValueError("最小批量大小不能大于最大批量大小")
     
-    if CORE_STRATEGY['default_batch_size'] < CORE_STRATEGY['min_batch_size']:
+    if CORE_STRATEGY.default_batch_size < CORE_STRATEGY.min_batch_size:
         raise ValueError("默认批量大小不能小于最小批量大小")
     
-    if CORE_STRATEGY['default_batch_size'] > CORE_STRATEGY['max_batch_size']:
+    if CORE_STRATEGY.default_batch_size > CORE_STRATEGY.max_batch_size:
         raise ValueError("默认批量大小不能大于最大批量大小")
     
     # 验证权重配置
-    if POINT_SELECTION_STRATEGY['unknown_relation_weight'] + POINT_SELECTION_STRATEGY['redundancy_penalty_weight'] != 1.0:
+    weight_sum = POINT_SELECTION_STRATEGY['unknown_relation_weight'] + POINT_SELECTION_STRATEGY['redundancy_penalty_weight']
+    if not math.isclose(weight_sum, 1.0, abs_tol=1e-9):
         raise ValueError("点位选择权重之和必须等于1.0")
     
     # 验证阈值配置
-    if ADAPTIVE_BATCH_SIZING['adjustment_rules']['max_batch_size_limit'] != CORE_STRATEGY['max_batch_size']:
+    if ADAPTIVE_BATCH_SIZING['adjustment_rules']['max_batch_size_limit'] != CORE_STRATEGY.max_batch_size:
         raise ValueError("自适应批量大小限制必须与最大批量大小一致")
     
+    # 验证滞回配置：滞回带必须小于相邻检测率阈值之间的最小间隔，否则某些档位永远无法进入
+    rules = ADAPTIVE_BATCH_SIZING['adjustment_rules']
+    min_threshold_gap = min(rules['medium_rate_threshold'] - rules['low_rate_threshold'],
+                            rules['high_rate_threshold'] - rules['medium_rate_threshold'])
+    if not 0 <= rules['hysteresis_band'] < min_threshold_gap:
+        raise ValueError("滞回带宽度必须非负且小于相邻检测率阈值的最小间隔")
+    
+    if rules['min_rounds_between_changes'] < 1:
+        raise ValueError("两次批量大小调整之间的最少轮数必须至少为1")
+    
+    if rules['min_improvement_to_change_pct'] < 0:
+        raise ValueError("调整批量大小所需的最小预计提升百分比不能为负")
+    
     print("50%批量测试配置验证通过")
+    _VALIDATION_CACHE[key] = True
     return True
 
-# 配置预设
-OPTIMIZED_PRESETS = {
-    'balanced_50_percent': {
-        'description': '平衡50%配置 - 平衡覆盖率和效率',
-        'batch_size': 40,
-        'max_targets_per_batch': 25,
-        'max_concurrent_requests': 15,
-        'target_coverage': 50.0,
-    },
-    'efficient_50_percent': {
-        'description': '高效50%配置 - 优先效率',
-        'batch_size': 35,
-        'max_targets_per_batch': 20,
-        'max_concurrent_requests': 12,
-        'target_coverage': 45.0,
-    },
-    'thorough_50_percent': {
-        'description': '全面50%配置 - 优先覆盖率',
-        'batch_size': 50,
-        'max_targets_per_batch': 30,
-        'max_concurrent_requests': 18,
-        'target_coverage': 55.0,
-    }
-}
+# 配置预设（只读，首次使用时构建）
+@lru_cache(maxsize=1)
+def _presets():
+    """50%批量测试预设配置"""
+    return freeze_presets({
+        'balanced_50_percent': {
+            'description': '平衡50%配置 - 平衡覆盖率和效率',
+            'batch_size': 40,
+            'max_targets_per_batch': 25,
+            'max_concurrent_requests': 15,
+            'target_coverage': 50.0,
+        },
+        'efficient_50_percent': {
+            'description': '高效50%配置 - 优先效率',
+            'batch_size': 35,
+            'max_targets_per_batch': 20,
+            'max_concurrent_requests': 12,
+            'target_coverage': 45.0,
+        },
+        'thorough_50_percent': {
+            'description': '全面50%配置 - 优先覆盖率',
+            'batch_size': 50,
+            'max_targets_per_batch': 30,
+            'max_concurrent_requests': 18,
+            'target_coverage': 55.0,
+        }
+    })
+
+def __getattr__(name: str):
+    # 兼容旧的模块级名称：预设映射改为首次访问时构建
+    if name == 'OPTIMIZED_PRESETS':
+        return _presets()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@lru_cache(maxsize=1)
+def _preset_arrays():
+    return build_preset_arrays(_presets(), ('target_coverage', 'batch_size', 'max_concurrent_requests'))
+
+def best_preset(target_coverage: float, target_batch: float, target_concurrency: float,
+                weights: Tuple[float, float, float] = (1.0, 0.1, 0.5)) -> str:
+    """返回与目标(覆盖率, 批次大小, 并发数)最接近的优化预设名称"""
+    return nearest_preset(_preset_arrays(), target_coverage, target_batch, target_concurrency, weights)
 
 def apply_optimized_preset(preset_name: str):
-    """应用优化预设配置"""
-    if preset_name not in OPTIMIZED_PRESETS:
+    """应用优化预设配置（应用后立即验证，验证失败时恢复原配置并抛出ValueError）"""
+    global CORE_STRATEGY, DEDUPLICATION_CONFIG, NETWORK_AND_CONCURRENCY
+    
+    if preset_name not in _presets():
         print(f"未知的优化预设配置: {preset_name}")
         return False
     
-    preset = OPTIMIZED_PRESETS[preset_name]
+    preset = _presets()[preset_name]
     print(f"应用优化预设配置: {preset['description']}")
     
-    # 应用配置
-    CORE_STRATEGY['default_batch_size'] = preset['batch_size']
-    DEDUPLICATION_CONFIG['max_targets_per_batch'] = preset['max_targets_per_batch']
-    NETWORK_AND_CONCURRENCY['max_concurrent_requests'] = preset['max_concurrent_requests']
-    CORE_STRATEGY['target_coverage'] = preset['target_coverage']
+    with CONFIG_LOCK:
+        # 配置对象不可变，保留原对象即可在验证失败时整体回滚
+        snapshot = (CORE_STRATEGY, DEDUPLICATION_CONFIG, NETWORK_AND_CONCURRENCY)
+        
+        # 应用配置：每个配置对象各自一次性替换
+        CORE_STRATEGY = replace(CORE_STRATEGY,
+                                default_batch_size=preset['batch_size'],
+                                target_coverage=preset['target_coverage'])
+        DEDUPLICATION_CONFIG = replace(DEDUPLICATION_CONFIG, max_targets_per_batch=preset['max_targets_per_batch'])
+        NETWORK_AND_CONCURRENCY = replace(NETWORK_AND_CONCURRENCY, max_concurrent_requests=preset['max_concurrent_requests'])
+        
+        # 配置已变化，之前的验证结果作废
+        _VALIDATION_CACHE.clear()
+        try:
+            validate_50_percent_config()
+        except ValueError:
+            CORE_STRATEGY, DEDUPLICATION_CONFIG, NETWORK_AND_CONCURRENCY = snapshot
+            print("优化预设配置验证失败，已恢复原配置")
+            raise
+        _compute_derived()
     
     print("优化预设配置应用完成")
     return True
 
 # 配置信息打印
 def print_optimized_config_summary():
-    """打印优化配置摘要"""
-    print("\n=== 50%批量测试优化配置摘要 ===")
-    print(f"策略: {CORE_STRATEGY['strategy_name']}")
-    print(f"描述: {CORE_STRATEGY['description']}")
-    print(f"目标覆盖率: {CORE_STRATEGY['target_coverage']}%")
-    print(f"批量大小: {CORE_STRATEGY['default_batch_size']} (范围: {CORE_STRATEGY['min_batch_size']}-{CORE_STRATEGY['max_batch_size']})")
-    print(f"智能去重: {'启用' if DEDUPLICATION_CONFIG['enabled'] else '禁用'}")
-    print(f"避免已知关系: {'启用' if DEDUPLICATION_CONFIG['avoid_known_relations'] else '禁用'}")
-    print(f"每批最大目标数: {DEDUPLICATION_CONFIG['max_targets_per_batch']}")
-    print(f"最大并发请求: {NETWORK_AND_CONCURRENCY['max_concurrent_requests']}")
+    """打印优化配置摘要（整体拼接后一次输出）"""
+    lines = [
+        "\n=== 50%批量测试优化配置摘要 ===",
+        f"策略: {CORE_STRATEGY.strategy_name}",
+        f"描述: {CORE_STRATEGY.description}",
+        f"目标覆盖率: {CORE_STRATEGY.target_coverage}%",
+        f"批量大小: {CORE_STRATEGY.default_batch_size} (范围: {CORE_STRATEGY.min_batch_size}-{CORE_STRATEGY.max_batch_size})",
+        f"智能去重: {'启用' if DEDUPLICATION_CONFIG.enabled else '禁用'}",
+        f"避免已知关系: {'启用' if DEDUPLICATION_CONFIG.avoid_known_relations else '禁用'}",
+        f"每批最大目标数: {DEDUPLICATION_CONFIG.max_targets_per_batch}",
+        f"最大并发请求: {NETWORK_AND_CONCURRENCY.max_concurrent_requests}",
+    ]
+    print("\n".join(lines))
 
 if __name__ == "__main__":
     # 验证配置
@@ -168,7 +386,7 @@ if __name__ == "__main__":
     print_optimized_config_summary()
     
     # 显示可用预设
-    print(f"\n可用优化预设配置: {list(OPTIMIZED_PRESETS.keys())}")
+    print(f"\n可用优化预设配置: {list(_presets().keys())}")
     
     # 显示配置优势
     print("\n=== 配置优势 ===")
@@ -8,7 +8,6 @@ import sys
 import os
 import argparse
 from adaptive_grouping_config import get_config, print_config_summary
-from adaptive_grouping_test import AdaptiveGroupingTester
 
 def main():
     """主函数"""
@@ -38,6 +37,9 @@ def main():
     if args.show_config:
         return
     
+    # 测试器依赖requests等较重的模块，仅在真正运行测试时才导入
+    from adaptive_grouping_test import AdaptiveGroupingTester
+    
     # 应用命令行参数
     if args.max_tests:
         config['test_execution']['max_total_tests'] = args.max_tests
@@ -55,6 +57,8 @@ def main():
     except Exception as e:
         print(f"\n❌ 测试过程中发生错误: {str(e)}")
         tester.print_current_status()
+    finally:
+        tester.close()
 
 if __name__ == "__main__":
     main()
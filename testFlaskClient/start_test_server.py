@@ -7,12 +7,20 @@
 import sys
 import os
 
-# 添加当前目录到Python路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# waitress参数：工作线程数随CPU核数增长（上限32），以支撑多个并发测试客户端
+TEST_SERVER_HOST = os.environ.get('TEST_SERVER_HOST', '127.0.0.1')
+TEST_SERVER_PORT = 5001
+WAITRESS_THREADS = min(32, (os.cpu_count() or 4) * 4)
+WAITRESS_CONNECTION_LIMIT = 1024
+WAITRESS_CHANNEL_TIMEOUT = 60
 
-from test_server import app
-
-if __name__ == '__main__':
+def main():
+    """启动测试端服务器（导入本模块不会加载test_server，也不会修改sys.path）"""
+    # 添加当前目录到Python路径
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    
+    from test_server import app
+    
     print("🚀 启动测试端服务器...")
     print("=" * 50)
     print("测试端配置界面: http://localhost:5001")
@@ -24,8 +32,15 @@ if __name__ == '__main__':
     try:
         # 使用高性能waitress服务器替代Flask开发服务器
         from waitress import serve
-        serve(app, host='127.0.0.1', port=5001, threads=6)
+        serve(app, host=TEST_SERVER_HOST, port=TEST_SERVER_PORT,
+              threads=WAITRESS_THREADS,
+              connection_limit=WAITRESS_CONNECTION_LIMIT,
+              channel_timeout=WAITRESS_CHANNEL_TIMEOUT,
+              asyncore_use_poll=True)
     except KeyboardInterrupt:
         print("\n⚠️  服务器已停止")
     except Exception as e:
         print(f"\n❌ 服务器启动失败: {e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+线缆测试系统的增量状态测试：与按完整状态重新计算的结果对照
+"""
+
+import copy
+import logging
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from core.cable_test_system import CableTestSystem, RelayState, RelayStateManager
+
+# 每次矩阵更新都会输出INFO日志，测试中只保留警告及以上
+logging.getLogger('core.cable_test_system').setLevel(logging.WARNING)
+
+class MatrixChangeLogTest(unittest.TestCase):
+    """检测矩阵写入日志：任一仍有效的同步令牌加上日志中的变化都能还原当前矩阵"""
+    
+    def setUp(self):
+        self.rng = random.Random(20261016)
+        self.system = CableTestSystem(total_points=8)
+        self.snapshots = []
+        self.snapshot()
+    
+    def snapshot(self):
+        self.snapshots.append((self.system.matrix_change_token(), copy.deepcopy(self.system.relationship_matrix)))
+    
+    def random_update(self):
+        """随机执行一次1对1或1对多的矩阵更新（检测结果随机，已知关系会被翻转）"""
+        points = list(range(self.system.total_points))
+        power_source = self.rng.choice(points)
+        others = [p for p in points if p != power_source]
+        targets = self.rng.sample(others, self.rng.choice((1, 1, 3)))
+        detected = [object()] if self.rng.random() < 0.4 else []
+        self.system._update_relationship_matrix(power_source, [power_source] + targets, detected)
+    
+    def assert_snapshots_replay(self):
+        system = self.system
+        for token, matrix in self.snapshots:
+            changes = system.get_relationship_matrix_changes(token)
+            version = int(token.rpartition('-')[2])
+            if version < system._matrix_change_base:
+                self.assertIsNone(changes, token)
+                continue
+            self.assertIsNotNone(changes, token)
+            replayed = copy.deepcopy(matrix)
+            for row, col, value in changes:
+                replayed[row][col] = value
+            self.assertEqual(replayed, system.relationship_matrix, token)
+    
+    def test_replay_across_trims(self):
+        limit = self.system._matrix_change_limit
+        for _ in range(300):
+            self.random_update()
+            self.snapshot()
+            self.assertLessEqual(len(self.system._matrix_changes), limit)
+            self.assert_snapshots_replay()
+        # 日志确实被截断过，最早的令牌已失效
+        self.assertGreater(self.system._matrix_change_base, 0)
+        self.assertIsNone(self.system.get_relationship_matrix_changes(self.snapshots[0][0]))
+    
+    def test_log_versions_stay_sorted(self):
+        for _ in range(200):
+            self.random_update()
+        versions = self.system._matrix_change_versions
+        self.assertEqual(versions, sorted(versions))
+        self.assertEqual(len(versions), len(self.system._matrix_changes))
+        self.assertTrue(all(v > self.system._matrix_change_base for v in versions))
+    
+    def test_unchanged_write_is_not_logged(self):
+        self.system._update_relationship_matrix(0, [0, 1], [])
+        logged = len(self.system._matrix_changes)
+        self.system._update_relationship_matrix(0, [0, 1], [])
+        self.assertEqual(len(self.system._matrix_changes), logged)
+    
+    def test_foreign_and_future_tokens(self):
+        self.random_update()
+        epoch, _, version = self.system.matrix_change_token().rpartition('-')
+        self.assertIsNone(self.system.get_relationship_matrix_changes(f"other-{version}"))
+        self.assertIsNone(self.system.get_relationship_matrix_changes(f"{epoch}-{int(version) + 1}"))
+        self.assertEqual(self.system.get_relationship_matrix_changes(f"{epoch}-{version}"), [])
+
+class StateVersionTest(unittest.TestCase):
+    """状态版本在写入完成后才推进：生成中途读取到的ETag仍是生成前的版本"""
+    
+    def setUp(self):
+        self.system = CableTestSystem(total_points=8)
+        self.seen = []
+        finalize = self.system._finalize_true_relationship_matrix
+        
+        def finalize_and_record():
+            self.seen.append((self.system.state_etag(), self.system.matrix_change_token()))
+            finalize()
+        self.system._finalize_true_relationship_matrix = finalize_and_record
+    
+    def assert_bumped_after_generation(self, generate):
+        before = (self.system.state_etag(), self.system.matrix_change_token())
+        generate()
+        self.assertEqual(self.seen, [before])
+        self.assertNotEqual(self.system.state_etag(), before[0])
+        self.assertNotEqual(self.system.matrix_change_token(), before[1])
+        self.assertEqual(self.system.get_relationship_matrix_changes(self.system.matrix_change_token()), [])
+    
+    def test_default_distribution(self):
+        self.assert_bumped_after_generation(self.system._generate_random_connections)
+    
+    def test_custom_distribution(self):
+        self.assert_bumped_after_generation(
+            lambda: self.system._generate_random_connections_with_custom_distribution({1: 6, 2: 2}))
+
+class RelayStateManagerTest(unittest.TestCase):
+    """继电器状态位图：操作计数与逐点位比较前后状态字典得到的切换数一致"""
+    
+    def setUp(self):
+        self.rng = random.Random(20261016)
+        self.manager = RelayStateManager(40)
+    
+    def on_points(self):
+        return {i for i, state in self.manager.relay_states.items() if state == RelayState.ON}
+    
+    def assert_views_consistent(self):
+        on = self.on_points()
+        self.assertEqual(self.manager.get_on_points(), sorted(on))
+        for i in range(self.manager.total_points):
+            self.assertEqual(self.manager.get_relay_state(i) == RelayState.ON, i in on)
+    
+    def run_operation(self):
+        """随机执行一次切换电源点、激活测试点或重置，返回(操作名, 操作次数, 执行前的激活测试点, 本次测试点)"""
+        manager = self.manager
+        points = range(manager.total_points)
+        choice = self.rng.random()
+        active_before = set(manager.active_test_points)
+        if choice < 0.3:
+            source = self.rng.choice([None] + list(points))
+            return 'switch', manager.switch_power_source(source), active_before, None
+        if choice < 0.95:
+            test_points = self.rng.sample(points, self.rng.randint(0, 12))
+            return 'activate', manager.activate_test_points(test_points), active_before, set(test_points)
+        return 'reset', manager.reset_states(), active_before, None
+    
+    def test_operation_counts_match_state_diff(self):
+        for _ in range(500):
+            before = self.on_points()
+            operations_before = self.manager.relay_operation_count
+            power_on_before = self.manager.power_on_count
+            
+            name, operations, active_before, test_points = self.run_operation()
+            after = self.on_points()
+            
+            self.assertEqual(operations, len(before ^ after), name)
+            self.assertEqual(self.manager.relay_operation_count - operations_before, operations)
+            self.assertEqual(self.manager.power_on_count - power_on_before, len(after - before))
+            if name == 'activate' and operations:
+                # 关闭不再需要的测试点、开启新的测试点，其余继电器保持不变
+                self.assertEqual(after, (before - (active_before - test_points)) | (test_points - active_before))
+            if name == 'reset':
+                self.assertEqual(after, set())
+                self.assertEqual(self.manager.active_test_points, set())
+            self.assert_views_consistent()
+    
+    def test_unknown_point_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            self.manager.switch_power_source(self.manager.total_points)
+        with self.assertRaises(KeyError):
+            self.manager.activate_test_points([0, self.manager.total_points])
+        self.assertEqual(self.manager.get_relay_state(self.manager.total_points), RelayState.OFF)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试端配置共用辅助定义测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(_ROOT, 'testFlaskClient'))
+sys.path.insert(0, os.path.join(_ROOT, 'src'))
+
+from config_common import (StrategyName, build_preset_arrays, freeze_presets, load_preset,
+                           nearest_preset, save_preset)
+from optimized_50_percent_config import CoreStrategy
+
+PRESETS = freeze_presets({
+    'low': {'coverage': 40.0, 'batch': 20, 'concurrency': 8},
+    'mid': {'coverage': 50.0, 'batch': 30, 'concurrency': 12},
+    'high': {'coverage': 60.0, 'batch': 40, 'concurrency': 16},
+})
+KEYS = ('coverage', 'batch', 'concurrency')
+
+class NearestPresetTest(unittest.TestCase):
+    """按目标参数挑选最接近的预设"""
+    
+    def setUp(self):
+        self.arrays = build_preset_arrays(PRESETS, KEYS)
+    
+    def test_columns_follow_preset_order(self):
+        names, coverages, batch_sizes, concurrencies = self.arrays
+        self.assertEqual(names, ('low', 'mid', 'high'))
+        self.assertEqual(coverages.tolist(), [40.0, 50.0, 60.0])
+        self.assertEqual(batch_sizes.tolist(), [20.0, 30.0, 40.0])
+        self.assertEqual(concurrencies.tolist(), [8.0, 12.0, 16.0])
+    
+    def test_matches_brute_force(self):
+        weights = (1.0, 0.1, 0.5)
+        for target in [(40, 20, 8), (47, 22, 16), (55, 40, 8), (58, 10, 10), (45, 35, 14)]:
+            expected = min(PRESETS, key=lambda name: sum(
+                w * (PRESETS[name][key] - t) ** 2 for w, key, t in zip(weights, KEYS, target)))
+            self.assertEqual(nearest_preset(self.arrays, *target, weights), expected, target)
+    
+    def test_weights_change_the_choice(self):
+        # 只看覆盖率时选mid，只看并发数时选high
+        self.assertEqual(nearest_preset(self.arrays, 50.0, 40.0, 16.0, (1.0, 0.0, 0.0)), 'mid')
+        self.assertEqual(nearest_preset(self.arrays, 50.0, 40.0, 16.0, (0.0, 0.0, 1.0)), 'high')
+
+class PresetPersistenceTest(unittest.TestCase):
+    """预设配置的JSON保存与读取"""
+    
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'preset.json')
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def test_dict_round_trip(self):
+        preset = {'description': '平衡50%配置', 'batch_size': 40, 'target_coverage': 50.0, 'enabled': True}
+        save_preset(self.path, preset)
+        self.assertEqual(load_preset(self.path), preset)
+    
+    def test_read_only_preset_round_trip(self):
+        save_preset(self.path, PRESETS['mid'])
+        self.assertEqual(load_preset(self.path), dict(PRESETS['mid']))
+    
+    def test_dataclass_round_trip(self):
+        core = CoreStrategy(target_coverage=55.0, default_batch_size=45)
+        save_preset(self.path, core)
+        loaded = load_preset(self.path)
+        self.assertEqual(loaded['strategy_name'], StrategyName.OPTIMIZED_50_PERCENT)
+        self.assertEqual(CoreStrategy(**{**loaded, 'strategy_name': StrategyName(loaded['strategy_name'])}), core)
+    
+    def test_saved_file_is_readable_text(self):
+        save_preset(self.path, {'description': '全面配置'})
+        with open(self.path, encoding='utf-8') as f:
+            self.assertIn('全面配置', f.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+高效批量测试客户端的增量矩阵状态测试：每次更新后与按整个矩阵重新计算的结果对照
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'testFlaskClient'))
+
+from efficient_batch_test import DIAGONAL_SENTINEL, MAX_INCREMENTAL_ROW_FRACTION, EfficientBatchTestClient
+
+def random_matrix(rng, n, probabilities=(0.2, 0.6, 0.2)):
+    """对称的随机关系矩阵（-1不导通，0未知，1导通），对角线为哨兵值"""
+    upper = np.triu(rng.choice(np.array([-1, 0, 1], dtype=np.int8), size=(n, n), p=probabilities), 1)
+    matrix = upper + upper.T
+    np.fill_diagonal(matrix, DIAGONAL_SENTINEL)
+    return matrix
+
+def brute_force_common_counts(matrix):
+    """重新计算共同已知邻居数与共同导通邻居数（排除点位自身）"""
+    known = (matrix != 0).astype(np.int64)
+    conductive = (matrix == 1).astype(np.int64)
+    np.fill_diagonal(known, 0)
+    np.fill_diagonal(conductive, 0)
+    return known @ known.T, conductive @ conductive.T
+
+def make_test_result(connections):
+    """构造update_relationship_from_test接受的成功测试结果"""
+    return {'success': True, 'data': {'test_result': {'connections': connections}}}
+
+class MatrixStateTestCase(unittest.TestCase):
+    """以随机关系矩阵初始化客户端，测试结束时关闭线程池和会话"""
+    
+    n = 24
+    
+    def setUp(self):
+        self.rng = np.random.default_rng(20261016)
+        self.client = EfficientBatchTestClient()
+        self.client.total_points = self.n
+        self.client.tested_pairs = np.zeros((self.n, (self.n + 7) // 8), dtype=np.uint8)
+        self.client._reset_matrix_state(random_matrix(self.rng, self.n))
+    
+    def tearDown(self):
+        self.client.close()
+    
+    def random_test(self, max_targets=6):
+        """对随机电源点与一组目标点执行一次update_relationship_from_test"""
+        power_source = int(self.rng.integers(self.n))
+        others = np.delete(np.arange(self.n), power_source)
+        targets = self.rng.choice(others, size=int(self.rng.integers(1, max_targets + 1)), replace=False)
+        detected = [{'point_id': int(t)} for t in targets if self.rng.random() < 0.3]
+        self.client.update_relationship_from_test(power_source, targets.tolist(), make_test_result(detected))
+    
+    def assert_common_counts_match(self):
+        common, common_conductive = brute_force_common_counts(self.client.relationship_matrix)
+        np.testing.assert_array_equal(self.client._common_neighbors, common)
+        np.testing.assert_array_equal(self.client._common_conductive, common_conductive)
+
+class CommonNeighborCountsTest(MatrixStateTestCase):
+    """共同邻居计数的增量维护"""
+    
+    def test_counts_follow_test_updates(self):
+        self.client._compute_probability_matrix()
+        self.assert_common_counts_match()
+        for _ in range(60):
+            self.random_test()
+            self.assert_common_counts_match()
+    
+    def test_probability_matrix_matches_pairwise_estimate(self):
+        self.client._compute_probability_matrix()
+        for _ in range(20):
+            self.random_test()
+        probability = self.client._compute_probability_matrix()
+        for i in range(self.n):
+            for j in range(self.n):
+                if i != j:
+                    self.assertAlmostEqual(probability[i, j], self.client.estimate_conductivity_probability(i, j),
+                                           msg=(i, j))
+    
+    def test_counts_follow_overwrites_and_resets_to_unknown(self):
+        # 行/列限定的修正须覆盖已知关系翻转、恢复为未知以及整行改写
+        self.client._compute_probability_matrix()
+        self.assertEqual(self.client._common_neighbors.dtype, np.int32)
+        self.assertEqual(self.client._common_conductive.dtype, np.int32)
+        for step in range(60):
+            power_source = int(self.rng.integers(self.n))
+            others = np.delete(np.arange(self.n), power_source)
+            size = self.n - 1 if step % 10 == 0 else int(self.rng.integers(1, 6))
+            targets = np.sort(self.rng.choice(others, size=size, replace=False))
+            values = self.rng.choice(np.array([-1, 0, 1], dtype=np.int8), size=size)
+            self.client._write_relations(power_source, targets, values)
+            self.assert_common_counts_match()
+        self.assertEqual(self.client._common_neighbors.dtype, np.int32)
+
+class RelationCountsTest(MatrixStateTestCase):
+    """每行未知关系数与全局关系计数的增量维护，以及服务器矩阵差异的增量应用"""
+    
+    n = 48  # 增量应用的变化行数上限按点位数的比例计算，点位数较大时每次可改写多个单元
+    
+    def assert_relation_counts_match(self):
+        matrix = self.client.relationship_matrix
+        np.testing.assert_array_equal(self.client._unknown_per_row, (matrix == 0).sum(axis=1))
+        self.assertEqual(self.client._known_count, int(np.count_nonzero(matrix)) - self.n)
+        self.assertEqual(self.client._conductive_count, int(np.count_nonzero(matrix == 1)))
+    
+    def changed_copy(self, cells):
+        """复制当前矩阵并对称改写随机选取的若干单元"""
+        matrix = self.client.relationship_matrix.copy()
+        for _ in range(cells):
+            i, j = self.rng.choice(self.n, size=2, replace=False)
+            matrix[i, j] = matrix[j, i] = self.rng.choice(np.array([-1, 0, 1], dtype=np.int8))
+        return matrix
+    
+    def test_counts_follow_test_updates(self):
+        self.assert_relation_counts_match()
+        for _ in range(60):
+            self.random_test()
+            self.assert_relation_counts_match()
+    
+    def test_apply_matrix_changes_matches_reset(self):
+        self.client._compute_probability_matrix()
+        max_cells = int(self.n * MAX_INCREMENTAL_ROW_FRACTION) // 2
+        for _ in range(30):
+            matrix = self.changed_copy(int(self.rng.integers(1, max_cells + 1)))
+            self.assertTrue(self.client._apply_matrix_changes(matrix))
+            np.testing.assert_array_equal(self.client.relationship_matrix, matrix)
+            self.assert_relation_counts_match()
+            self.assert_common_counts_match()
+    
+    def test_unchanged_matrix_keeps_version(self):
+        version = self.client._matrix_version
+        self.assertTrue(self.client._apply_matrix_changes(self.client.relationship_matrix.copy()))
+        self.assertEqual(self.client._matrix_version, version)
+    
+    def test_rejects_changes_needing_full_rebuild(self):
+        # 变化行数超出比例上限
+        matrix = self.client.relationship_matrix.copy()
+        rows = int(self.n * MAX_INCREMENTAL_ROW_FRACTION) + 1
+        matrix[:rows, rows:] = np.where(matrix[:rows, rows:] == 1, -1, 1)
+        matrix[rows:, :rows] = matrix[:rows, rows:].T
+        self.assertFalse(self.client._apply_matrix_changes(matrix))
+        
+        # 不对称矩阵按行写入后与服务器矩阵不一致
+        self.client._reset_matrix_state(random_matrix(self.rng, self.n))
+        matrix = self.client.relationship_matrix.copy()
+        matrix[0, 1] = 1
+        matrix[1, 0] = -1
+        self.assertFalse(self.client._apply_matrix_changes(matrix))
+
+if __name__ == '__main__':
+    unittest.main()
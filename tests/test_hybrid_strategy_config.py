@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+混合策略配置测试：分块阶段到二分法阶段的自适应切换
+"""
+
+import os
+import sys
+import unittest
+from dataclasses import replace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'testFlaskClient'))
+
+import hybrid_strategy_config as hybrid
+from hybrid_strategy_config import PhaseSwitchConfig, estimate_remaining_block_gain, should_switch_to_binary
+
+def first_switch_round(rates, config):
+    """逐轮把检测率交给should_switch_to_binary，返回首次切换时已完成的分块轮数（未切换返回None）"""
+    for end in range(1, len(rates) + 1):
+        if should_switch_to_binary(rates[:end], config):
+            return end - 1
+    return None
+
+def saturating_curve(start, gain, decay, rounds):
+    """增益按固定比例衰减的检测率曲线"""
+    rates = [start]
+    for _ in range(rounds):
+        rates.append(rates[-1] + gain)
+        gain *= decay
+    return rates
+
+class EstimateRemainingBlockGainTest(unittest.TestCase):
+    """分块策略剩余增益外推"""
+    
+    def test_geometric_gains(self):
+        # 增益25、15、9：衰减比0.6，剩余增益 9*0.6/0.4
+        remaining = estimate_remaining_block_gain([20.0, 45.0, 60.0, 69.0], alpha=0.2)
+        self.assertAlmostEqual(remaining, 13.5)
+    
+    def test_flat_last_round(self):
+        self.assertEqual(estimate_remaining_block_gain([40.0, 55.0, 59.2, 59.2], alpha=0.2), 0.0)
+    
+    def test_not_enough_rounds(self):
+        self.assertIsNone(estimate_remaining_block_gain([20.0], alpha=0.2))
+        self.assertIsNone(estimate_remaining_block_gain([20.0, 45.0], alpha=0.2))
+
+class ShouldSwitchToBinaryTest(unittest.TestCase):
+    """分块阶段到二分法阶段的切换判断"""
+    
+    def setUp(self):
+        self.config = PhaseSwitchConfig()
+    
+    def test_curve_levelling_off_below_static_threshold_switches(self):
+        # 检测率在59.2%处走平（低于静态阈值70%和二分法回切阈值60%）时也必须切换
+        rates = [20.0, 45.0, 55.0, 59.2] + [59.2] * 25
+        switch_round = first_switch_round(rates, self.config)
+        self.assertIsNotNone(switch_round)
+        self.assertLessEqual(switch_round, self.config.min_phase_duration + self.config.phase_switch_check_interval)
+    
+    def test_saturating_curve_switches_before_static_threshold(self):
+        # 20%起步、增益25按0.6衰减，饱和于82.5%
+        rates = saturating_curve(20.0, 25.0, 0.6, 20)
+        switch_round = first_switch_round(rates, self.config)
+        self.assertIsNotNone(switch_round)
+        self.assertLess(rates[switch_round], 85.0)
+    
+    def test_low_saturating_curve_switches(self):
+        # 饱和于45%的曲线
+        rates = saturating_curve(10.0, 14.0, 0.6, 20)
+        self.assertLess(rates[-1], 45.0)
+        self.assertIsNotNone(first_switch_round(rates, self.config))
+    
+    def test_steady_growth_does_not_switch(self):
+        rates = [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
+        self.assertIsNone(first_switch_round(rates, self.config))
+    
+    def test_forced_switch_rate_ignores_min_phase_duration(self):
+        self.assertTrue(should_switch_to_binary([hybrid.ADAPTIVE_FORCED_SWITCH_RATE], self.config))
+    
+    def test_min_phase_duration(self):
+        config = replace(self.config, min_phase_duration=4, phase_switch_check_interval=1)
+        flat = [59.2] * 10
+        self.assertEqual(first_switch_round(flat, config), 4)
+    
+    def test_check_interval(self):
+        config = replace(self.config, min_phase_duration=3, phase_switch_check_interval=2)
+        # 第3轮时仍有增益，第4轮走平但不在检查轮，第5轮切换
+        rates = [20.0, 45.0, 60.0, 69.0, 69.0, 69.0]
+        self.assertFalse(should_switch_to_binary(rates[:4], config))
+        self.assertFalse(should_switch_to_binary(rates[:5], config))
+        self.assertTrue(should_switch_to_binary(rates[:6], config))
+    
+    def test_static_threshold_without_adaptive(self):
+        config = replace(self.config, adaptive_threshold=False, phase_switch_check_interval=1)
+        self.assertFalse(should_switch_to_binary([59.2] * 10, config))
+        self.assertTrue(should_switch_to_binary([40.0, 50.0, 60.0, 70.0], config))
+
+class BestPresetTest(unittest.TestCase):
+    """按目标参数挑选混合策略预设"""
+    
+    def test_exact_targets_select_their_preset(self):
+        for name, preset in hybrid.HYBRID_STRATEGY_PRESETS.items():
+            target = (preset['block_coverage'], preset['binary_batch_size'], preset['max_concurrent_requests'])
+            self.assertEqual(hybrid.best_preset(*target), name)
+    
+    def test_nearest_preset(self):
+        self.assertEqual(hybrid.best_preset(46.0, 30.0, 19.0), 'efficient_hybrid')
+        self.assertEqual(hybrid.best_preset(56.0, 12.0, 9.0), 'precise_hybrid')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+50%批量测试配置测试：运行时调优、共享资源与预设工具
+"""
+
+import os
+import sys
+import unittest
+from dataclasses import replace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'testFlaskClient'))
+
+import optimized_50_percent_config as config
+
+class ConfigTestCase(unittest.TestCase):
+    """测试前后保存并恢复模块级配置对象"""
+    
+    def setUp(self):
+        self._saved = (config.CORE_STRATEGY, config.DEDUPLICATION_CONFIG, config.NETWORK_AND_CONCURRENCY)
+    
+    def tearDown(self):
+        config.CORE_STRATEGY, config.DEDUPLICATION_CONFIG, config.NETWORK_AND_CONCURRENCY = self._saved
+
+class ShouldChangeBatchSizeTest(unittest.TestCase):
+    """批量大小调整的滞回与最少间隔轮数"""
+    
+    def setUp(self):
+        self.rules = config.ADAPTIVE_BATCH_SIZING['adjustment_rules']
+    
+    def test_too_soon_after_last_change(self):
+        rounds = self.rules['min_rounds_between_changes'] - 1
+        self.assertFalse(config.should_change_batch_size(90.0, 40.0, rounds))
+    
+    def test_change_within_hysteresis_band(self):
+        rounds = self.rules['min_rounds_between_changes']
+        self.assertFalse(config.should_change_batch_size(50.0 + self.rules['hysteresis_band'], 50.0, rounds))
+    
+    def test_change_beyond_hysteresis_band(self):
+        rounds = self.rules['min_rounds_between_changes']
+        band = self.rules['hysteresis_band']
+        self.assertTrue(config.should_change_batch_size(50.0 + band + 0.1, 50.0, rounds))
+        self.assertTrue(config.should_change_batch_size(50.0 - band - 0.1, 50.0, rounds))
+    
+    def test_predicted_improvement_threshold(self):
+        rounds = self.rules['min_rounds_between_changes']
+        current = 50.0 + self.rules['hysteresis_band'] + 0.1
+        threshold = self.rules['min_improvement_to_change_pct']
+        self.assertFalse(config.should_change_batch_size(current, 50.0, rounds, threshold - 0.1))
+        self.assertTrue(config.should_change_batch_size(current, 50.0, rounds, threshold))
+
+class TuneConcurrencyTest(ConfigTestCase):
+    """按p95延迟微调并发数"""
+    
+    def set_concurrency(self, value, auto_tune=True):
+        config.NETWORK_AND_CONCURRENCY = replace(config.NETWORK_AND_CONCURRENCY,
+                                                 max_concurrent_requests=value, auto_tune_concurrency=auto_tune)
+    
+    def test_slow_requests_decrease(self):
+        self.set_concurrency(10)
+        self.assertEqual(config.tune_concurrency(500.0), 9)
+        self.assertEqual(config.get_network_and_concurrency().max_concurrent_requests, 9)
+    
+    def test_fast_requests_increase(self):
+        self.set_concurrency(10)
+        self.assertEqual(config.tune_concurrency(50.0), 11)
+    
+    def test_latency_in_band_keeps_config_object(self):
+        self.set_concurrency(10)
+        before = config.NETWORK_AND_CONCURRENCY
+        self.assertEqual(config.tune_concurrency(150.0), 10)
+        self.assertIs(config.NETWORK_AND_CONCURRENCY, before)
+    
+    def test_bounds(self):
+        self.set_concurrency(1)
+        self.assertEqual(config.tune_concurrency(500.0), 1)
+        self.set_concurrency(config.MAX_CONCURRENT_REQUESTS_LIMIT)
+        self.assertEqual(config.tune_concurrency(50.0), config.MAX_CONCURRENT_REQUESTS_LIMIT)
+    
+    def test_disabled(self):
+        self.set_concurrency(10, auto_tune=False)
+        self.assertEqual(config.tune_concurrency(500.0), 10)
+        self.assertEqual(config.NETWORK_AND_CONCURRENCY.max_concurrent_requests, 10)
+
+class ExecutorTest(ConfigTestCase):
+    """共享线程池"""
+    
+    def test_reused_and_runs_tasks(self):
+        executor = config.get_executor()
+        self.assertIs(config.get_executor(), executor)
+        self.assertEqual(list(executor.map(lambda x: x * x, range(5))), [0, 1, 4, 9, 16])
+    
+    def test_rebuilt_when_worker_count_changes(self):
+        old = config.get_executor()
+        pending = old.submit(lambda: 'done')
+        workers = config.NETWORK_AND_CONCURRENCY.thread_pool_workers + 1
+        config.NETWORK_AND_CONCURRENCY = replace(config.NETWORK_AND_CONCURRENCY, thread_pool_workers=workers)
+        new = config.get_executor()
+        self.assertIsNot(new, old)
+        self.assertEqual(new._max_workers, workers)
+        # 旧线程池不再接受新任务，已提交的任务照常完成
+        self.assertEqual(pending.result(timeout=5), 'done')
+        with self.assertRaises(RuntimeError):
+            old.submit(lambda: None)
+
+class BestPresetTest(unittest.TestCase):
+    """按目标参数挑选优化预设"""
+    
+    def test_exact_targets_select_their_preset(self):
+        for name, preset in config.OPTIMIZED_PRESETS.items():
+            target = (preset['target_coverage'], preset['batch_size'], preset['max_concurrent_requests'])
+            self.assertEqual(config.best_preset(*target), name)
+    
+    def test_nearest_preset(self):
+        self.assertEqual(config.best_preset(56.0, 48.0, 17.0), 'thorough_50_percent')
+        self.assertEqual(config.best_preset(44.0, 30.0, 10.0), 'efficient_50_percent')
+
+class HttpSessionTest(ConfigTestCase):
+    """共享HTTP会话"""
+    
+    def test_reused_while_config_unchanged(self):
+        self.assertIs(config.get_http_session(), config.get_http_session())
+    
+    def test_rebuilt_and_old_session_closed_when_config_changes(self):
+        old = config.get_http_session()
+        closed = []
+        old.close = lambda: closed.append(True)
+        config.NETWORK_AND_CONCURRENCY = replace(config.NETWORK_AND_CONCURRENCY,
+                                                 retry_count=config.NETWORK_AND_CONCURRENCY.retry_count + 1)
+        new = config.get_http_session()
+        self.assertIsNot(new, old)
+        self.assertEqual(closed, [True])
+        self.assertEqual(new.get_adapter('http://localhost').max_retries.total,
+                         config.NETWORK_AND_CONCURRENCY.retry_count)
+
+if __name__ == '__main__':
+    unittest.main()
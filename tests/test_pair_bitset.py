@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PairBitset测试：与按(min, max)元组存储的集合逐步对照
+"""
+
+import itertools
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'testFlaskClient'))
+
+from adaptive_grouping_test import PairBitset
+
+def pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+class PairBitsetTest(unittest.TestCase):
+    """位图成员、计数与集合参照一致"""
+    
+    def assert_matches(self, bitset, reference, points):
+        self.assertEqual(len(bitset), len(reference))
+        for a, b in itertools.combinations(points, 2):
+            expected = (a, b) in reference
+            self.assertEqual(bitset.contains(a, b), expected, (a, b))
+            self.assertEqual((b, a) in bitset, expected, (b, a))
+    
+    def test_fill_covers_every_pair(self):
+        # 点对总数覆盖末字节恰好填满与未填满两种情况
+        for n in (2, 5, 8, 17):
+            points = range(1, n + 1)
+            bitset = PairBitset(n, base=1, fill=True)
+            self.assert_matches(bitset, set(itertools.combinations(points, 2)), points)
+            self.assertEqual(sum(bin(byte).count('1') for byte in bitset.bits), n * (n - 1) // 2)
+    
+    def test_random_operations_match_set(self):
+        rng = random.Random(20261016)
+        for n, base, fill in ((13, 1, False), (13, 1, True), (20, 0, False), (9, 5, True)):
+            points = list(range(base, base + n))
+            bitset = PairBitset(n, base=base, fill=fill)
+            reference = set(itertools.combinations(points, 2)) if fill else set()
+            for _ in range(400):
+                a = rng.choice(points)
+                others = [b for b in rng.sample(points, rng.randint(1, n)) if b != a]
+                b = rng.choice([p for p in points if p != a])
+                op = rng.randrange(4)
+                if op == 0:
+                    bitset.add(a, b)
+                    reference.add(pair(a, b))
+                elif op == 1:
+                    bitset.discard(a, b)
+                    reference.discard(pair(a, b))
+                elif op == 2:
+                    bitset.add_many(a, others)
+                    reference.update(pair(a, b) for b in others)
+                else:
+                    bitset.discard_many(a, others)
+                    reference.difference_update(pair(a, b) for b in others)
+                self.assertEqual(len(bitset), len(reference))
+            self.assert_matches(bitset, reference, points)
+    
+    def test_row_indices_match_single_index(self):
+        bitset = PairBitset(11, base=1)
+        for a in range(1, 12):
+            others = [b for b in range(1, 12) if b != a]
+            self.assertEqual(bitset._row_indices(a, others), [bitset._index(a, b) for b in others])
+
+if __name__ == '__main__':
+    unittest.main()